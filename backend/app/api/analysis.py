@@ -1,33 +1,49 @@
 """
 分析 API 路由
 """
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
+import asyncio
 import uuid
 
-from app.models import AnalysisRequest, AnalysisResponse, AnalysisStatus
-from app.services.dxf_parser import DXFParserService
-from app.services.compliance_checker import ComplianceCheckerService
+from app.models import (
+    AnalysisRequest,
+    AnalysisResponse,
+    AnalysisStatus,
+    AnalysisStage,
+    AnalysisProgress,
+    CheckRuleInfo
+)
+from app.services.compliance_checker import ANALYSIS_CODE_TAG, check_rules
+from app.services.deadline import AnalysisTimeout
 from app.services.dwg_converter import dwg_converter
+from app.services.worker_pool import run_analysis
+from app.services.job_store import TERMINAL_STATUSES, job_store
+from app.services.progress import stage_percent
+from app.services.progress_bus import progress_bus
+from app.services.result_cache import ResultCache, result_cache
+from app.services.conversion_cache import conversion_cache
+from app.services.rule_set import get_rule_set, rule_sets
+from app.utils.file_hash import load_content_hash
 from app.config import settings
 
 router = APIRouter()
 
-# 内存存储（Phase 1 简化实现，Phase 2 应使用数据库）
-analysis_results = {}
+# 正在执行的分析任务（用于取消被放弃的分析）
+running_tasks: Dict[str, asyncio.Task] = {}
 
 
 @router.post("/analyze", response_model=AnalysisResponse)
-async def start_analysis(
-    request: AnalysisRequest,
-    background_tasks: BackgroundTasks
-):
+async def start_analysis(request: AnalysisRequest):
     """
     启动 CAD 文件分析
     
     - **file_id**: 已上传文件的ID
     - **standard**: 检查标准（默认 GB/T 14665-2012）
+    - **rules**: 只执行指定的检查规则（可选，规则名见 GET /rules）
     """
     # 验证文件是否存在
     file_path = None
@@ -43,27 +59,79 @@ async def start_analysis(
             detail="文件不存在"
         )
     
+    # 校验检查标准和检查规则（规则集在进程内缓存）
+    try:
+        rule_set = get_rule_set(request.standard)
+        check_rules.enabled_for(rule_set, request.rules)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
     # 生成分析任务ID
     analysis_id = str(uuid.uuid4())
     
     # 初始化分析状态
-    analysis_results[analysis_id] = {
-        "status": AnalysisStatus.PENDING,
-        "file_id": request.file_id,
-        "file_path": str(file_path),
-        "standard": request.standard,
-        "started_at": datetime.now(),
-        "report": None,
-        "error": None
-    }
+    job_store.create(analysis_id, request.file_id, str(file_path), request.standard)
+    progress_bus.publish(
+        analysis_id,
+        AnalysisStatus.PENDING,
+        AnalysisStage.UPLOAD,
+        stage_percent(AnalysisStage.UPLOAD, 1.0),
+        "文件已上传，等待分析"
+    )
+    
+    # 是否合并同类违规项（请求未指定时使用服务端配置）
+    aggregate = settings.violation_aggregation if request.aggregate is None else request.aggregate
+    options = (
+        f"agg{settings.violation_group_min_size}-{settings.violation_sample_size}"
+        if aggregate else "full"
+    )
+    if request.rules is not None:
+        options += ":rules=" + ",".join(sorted(set(request.rules)))
+    
+    # 相同内容、标准、规则版本和检查选项的图纸直接返回缓存的报告
+    # 旧上传没有哈希记录时需要读取整个文件计算，放到线程中执行
+    content_hash = await asyncio.to_thread(load_content_hash, request.file_id, file_path)
+    cache_key = ResultCache.make_key(
+        content_hash, request.standard, rule_set.version, ANALYSIS_CODE_TAG, options
+    )
+    # 报告的解压、反序列化和序列化、压缩都是 CPU 开销，放到线程中执行，不阻塞事件循环
+    cached_report = await asyncio.to_thread(result_cache.get, cache_key)
+    if cached_report:
+        report = cached_report.model_copy(update={
+            "analysis_id": analysis_id,
+            "file_id": request.file_id,
+            "filename": file_path.name,
+            "analysis_time": datetime.now()
+        })
+        await asyncio.to_thread(job_store.save_report, analysis_id, report)
+        progress_bus.publish(
+            analysis_id,
+            AnalysisStatus.COMPLETED,
+            AnalysisStage.REPORT,
+            message="分析完成（命中缓存）"
+        )
+        return AnalysisResponse(
+            analysis_id=analysis_id,
+            file_id=request.file_id,
+            status=AnalysisStatus.COMPLETED,
+            message="分析完成（命中缓存）"
+        )
     
     # 在后台执行分析
-    background_tasks.add_task(
-        perform_analysis,
+    task = asyncio.create_task(perform_analysis(
         analysis_id,
         str(file_path),
-        request.standard
-    )
+        request.standard,
+        aggregate,
+        request.rules,
+        content_hash,
+        cache_key
+    ))
+    running_tasks[analysis_id] = task
+    task.add_done_callback(lambda _: running_tasks.pop(analysis_id, None))
     
     return AnalysisResponse(
         analysis_id=analysis_id,
@@ -73,17 +141,43 @@ async def start_analysis(
     )
 
 
+@router.get("/standards", response_model=List[str])
+async def list_standards():
+    """可用的检查标准（对应 config/ 下的规则文件）"""
+    return rule_sets.standards()
+
+
+@router.get("/rules", response_model=List[CheckRuleInfo])
+async def list_rules(standard: str = "GB/T 14665-2012"):
+    """已注册的检查规则及其对指定标准是否启用"""
+    try:
+        rule_set = get_rule_set(standard)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return [
+        CheckRuleInfo(
+            name=rule.name,
+            description=rule.description,
+            cost=rule.cost.value,
+            enabled=rule.enabled_for(rule_set)
+        )
+        for rule in check_rules.all()
+    ]
+
+
 @router.get("/analyze/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis_status(analysis_id: str):
     """查询分析任务状态"""
-    if analysis_id not in analysis_results:
+    result = job_store.get(analysis_id)
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="分析任务不存在"
         )
     
-    result = analysis_results[analysis_id]
-    
     return AnalysisResponse(
         analysis_id=analysis_id,
         file_id=result["file_id"],
@@ -92,22 +186,137 @@ async def get_analysis_status(analysis_id: str):
     )
 
 
+@router.get("/analyze/{analysis_id}/events")
+async def stream_analysis_events(
+    analysis_id: str,
+    request: Request,
+    after: int = Query(0, ge=0, description="已收到的最后一个事件序号")
+):
+    """
+    分析进度事件流（Server-Sent Events）
+    
+    推送阶段切换（upload / convert / parse / check / report）和进度百分比，
+    分析结束（completed / failed / timed_out）后关闭连接；
+    断线重连时浏览器通过 Last-Event-ID 请求头从上次收到的事件继续。
+    """
+    if not job_store.get(analysis_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="分析任务不存在"
+        )
+    
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+    
+    async def stream():
+        seq = after
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            events = await progress_bus.next_events(analysis_id, seq, settings.progress_keepalive)
+            if not events:
+                # 心跳（注释行），避免代理关闭空闲连接
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                seq = event.seq
+                yield f"id: {event.seq}\nevent: progress\ndata: {event.model_dump_json()}\n\n"
+                if event.status in TERMINAL_STATUSES:
+                    return
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # 禁用 Nginx 缓冲，事件立即送达
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.get("/analyze/{analysis_id}/progress", response_model=AnalysisProgress)
+async def poll_analysis_progress(
+    analysis_id: str,
+    after: int = Query(0, ge=0, description="已收到的最后一个事件序号"),
+    timeout: float = Query(25, ge=0, description="最长等待秒数")
+):
+    """
+    长轮询分析进度（不支持 SSE 的客户端使用）
+    
+    有序号大于 after 的事件时立即返回最新一条，否则最多等待 timeout 秒后返回当前进度
+    """
+    if not job_store.get(analysis_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="分析任务不存在"
+        )
+    
+    events = await progress_bus.next_events(
+        analysis_id,
+        after,
+        min(timeout, settings.progress_long_poll_timeout)
+    )
+    return events[-1] if events else progress_bus.latest(analysis_id)
+
+
+@router.delete("/analyze/{analysis_id}", response_model=AnalysisResponse)
+async def cancel_analysis(analysis_id: str):
+    """取消正在执行的分析任务（同时终止正在运行的 DWG 转换进程）"""
+    result = job_store.get(analysis_id)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="分析任务不存在"
+        )
+    
+    task = running_tasks.get(analysis_id)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="分析任务已结束，无法取消"
+        )
+    
+    task.cancel()
+    return AnalysisResponse(
+        analysis_id=analysis_id,
+        file_id=result["file_id"],
+        status=AnalysisStatus.FAILED,
+        message="分析任务已取消"
+    )
+
+
 async def perform_analysis(
     analysis_id: str,
     file_path: str,
-    standard: str
+    standard: str,
+    aggregate: bool,
+    rules: Optional[List[str]],
+    content_hash: str,
+    cache_key: str
 ):
     """执行实际的分析任务（后台任务）"""
-    converted_file = None
     try:
         # 更新状态为处理中
-        analysis_results[analysis_id]["status"] = AnalysisStatus.PROCESSING
+        job_store.update_status(analysis_id, AnalysisStatus.PROCESSING)
+        progress_bus.publish(analysis_id, message="分析开始")
+        
+        # 上传的 DXF 的内容哈希即解析缓存的键；DWG 转换得到的 DXF 由工作进程计算哈希
+        dxf_hash = content_hash
+        upload_path = Path(file_path)
         
         # Step 1: 如果是 DWG 文件，先转换为 DXF
         if file_path.lower().endswith('.dwg'):
+            dxf_hash = None
+            progress_bus.publish(
+                analysis_id,
+                stage=AnalysisStage.CONVERT,
+                percent=stage_percent(AnalysisStage.CONVERT),
+                message="正在将 DWG 转换为 DXF"
+            )
             try:
-                converted_file = await dwg_converter.convert_to_dxf(file_path)
-                file_path = converted_file
+                # 转换结果按内容哈希缓存，重复分析同一 DWG 时跳过转换
+                file_path = await dwg_converter.convert_to_dxf(file_path, content_hash)
             except Exception as e:
                 # 提供更友好的错误信息
                 error_msg = (
@@ -120,33 +329,62 @@ async def perform_analysis(
                     f"技术详情: {str(e)}"
                 )
                 raise ValueError(error_msg)
+            progress_bus.publish(
+                analysis_id,
+                stage=AnalysisStage.CONVERT,
+                percent=stage_percent(AnalysisStage.CONVERT, 1.0),
+                message="DWG 转换完成"
+            )
+
+        # Step 2-3: 在工作进程池中解析 DXF 并执行合规检查（不阻塞事件循环）
+        try:
+            report = await run_analysis(file_path, analysis_id, standard, aggregate, rules, dxf_hash)
+        finally:
+            if file_path != str(upload_path):
+                # 转换缓存中的 DXF 使用完毕，允许淘汰
+                conversion_cache.release(file_path)
+        if file_path != str(upload_path):
+            # DWG 的报告由转换缓存中的 DXF 生成，文件标识和文件名改回上传的文件（与命中缓存时一致）
+            report = report.model_copy(update={
+                "file_id": upload_path.stem,
+                "filename": upload_path.name
+            })
         
-        # Step 2: 解析 DXF 文件
-        parser = DXFParserService()
-        dxf_data = await parser.parse(file_path)
-        
-        # Step 3: 执行合规检查
-        checker = ComplianceCheckerService(standard)
-        report = await checker.check(dxf_data, analysis_id, file_path)
+        # 超时的部分报告只保存到任务，不写入结果缓存
+        if report.partial:
+            await asyncio.to_thread(job_store.save_report, analysis_id, report, AnalysisStatus.TIMED_OUT)
+            _publish_result(analysis_id, AnalysisStatus.TIMED_OUT)
+            return
         
-        # 保存结果
-        analysis_results[analysis_id]["status"] = AnalysisStatus.COMPLETED
-        analysis_results[analysis_id]["report"] = report
-        analysis_results[analysis_id]["completed_at"] = datetime.now()
+        # 保存结果（序列化和压缩在线程中执行）
+        await asyncio.to_thread(job_store.save_report, analysis_id, report)
+        await asyncio.to_thread(result_cache.put, cache_key, report)
+        _publish_result(analysis_id, AnalysisStatus.COMPLETED)
         
+    except AnalysisTimeout as e:
+        # 工作进程未能按时退出，已被强制终止（没有部分报告）
+        job_store.update_status(analysis_id, AnalysisStatus.TIMED_OUT, str(e))
+        _publish_result(analysis_id, AnalysisStatus.TIMED_OUT, str(e))
+    
+    except asyncio.CancelledError:
+        job_store.update_status(analysis_id, AnalysisStatus.FAILED, "分析任务已取消")
+        _publish_result(analysis_id, AnalysisStatus.FAILED, "分析任务已取消")
+        raise
+    
     except Exception as e:
         # 记录错误
-        analysis_results[analysis_id]["status"] = AnalysisStatus.FAILED
-        analysis_results[analysis_id]["error"] = str(e)
-        analysis_results[analysis_id]["completed_at"] = datetime.now()
-    
-    finally:
-        # 清理转换后的临时 DXF 文件
-        if converted_file and Path(converted_file).exists():
-            try:
-                Path(converted_file).unlink()
-            except:
-                pass
+        job_store.update_status(analysis_id, AnalysisStatus.FAILED, str(e))
+        _publish_result(analysis_id, AnalysisStatus.FAILED, str(e))
+
+
+def _publish_result(analysis_id: str, status: AnalysisStatus, error: str = None):
+    """发布分析结束事件（订阅者收到后关闭事件流）"""
+    progress_bus.publish(
+        analysis_id,
+        status,
+        AnalysisStage.REPORT if status != AnalysisStatus.FAILED else None,
+        message=_get_status_message(status, error)
+    )
 
 
 def _get_status_message(status: AnalysisStatus, error: str = None) -> str:
@@ -155,7 +393,8 @@ def _get_status_message(status: AnalysisStatus, error: str = None) -> str:
         AnalysisStatus.PENDING: "分析任务排队中",
         AnalysisStatus.PROCESSING: "正在分析文件...",
         AnalysisStatus.COMPLETED: "分析完成",
-        AnalysisStatus.FAILED: f"分析失败: {error}" if error else "分析失败"
+        AnalysisStatus.FAILED: f"分析失败: {error}" if error else "分析失败",
+        AnalysisStatus.TIMED_OUT: f"分析超时: {error}" if error else "分析超时，报告仅包含已完成的检查规则"
     }
     return messages.get(status, "未知状态")
 
@@ -163,4 +402,4 @@ def _get_status_message(status: AnalysisStatus, error: str = None) -> str:
 # 导出结果存储供 report.py 使用
 def get_analysis_result(analysis_id: str):
     """获取分析结果（内部使用）"""
-    return analysis_results.get(analysis_id)
+    return job_store.get(analysis_id)
@@ -1,15 +1,19 @@
 """
 报告 API 路由
 """
-from fastapi import APIRouter, HTTPException, status, Response
+from fastapi import APIRouter, HTTPException, status, Response, Query
 from fastapi.responses import JSONResponse
 import json
 
-from app.models import ComplianceReport, ReportExportFormat, AnalysisStatus
+from app.models import ComplianceReport, ReportExportFormat, AnalysisStatus, ViolationHandles
 from app.api.analysis import get_analysis_result
+from app.services.violation_groups import find_violation, violation_handles
 
 router = APIRouter()
 
+# 可以读取报告的任务状态（超时任务可能带有部分报告）
+REPORT_STATUSES = {AnalysisStatus.COMPLETED, AnalysisStatus.TIMED_OUT}
+
 
 @router.get("/report/{analysis_id}", response_model=ComplianceReport)
 async def get_report(analysis_id: str):
@@ -44,6 +48,12 @@ async def get_report(analysis_id: str):
             detail=f"分析失败: {result.get('error', '未知错误')}"
         )
     
+    if result["status"] == AnalysisStatus.TIMED_OUT and not result.get("report"):
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"分析超时: {result.get('error') or '未生成报告'}"
+        )
+    
     # 返回报告
     report = result.get("report")
     if not report:
@@ -55,6 +65,43 @@ async def get_report(analysis_id: str):
     return report
 
 
+@router.get("/report/{analysis_id}/violations/{violation_id}/handles", response_model=ViolationHandles)
+async def get_violation_handles(
+    analysis_id: str,
+    violation_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=100000)
+):
+    """
+    展开违规项涉及的图元句柄（聚合模式下合并的违规可按页取回完整列表）
+    
+    - **analysis_id**: 分析任务ID
+    - **violation_id**: 违规项ID
+    """
+    result = get_analysis_result(analysis_id)
+    
+    if not result or result["status"] not in REPORT_STATUSES or not result.get("report"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="报告尚未完成或不存在"
+        )
+    
+    violation = find_violation(result["report"].violations, violation_id)
+    if violation is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="违规项不存在"
+        )
+    
+    handles = violation_handles(violation)
+    return ViolationHandles(
+        violation_id=violation_id,
+        count=len(handles),
+        offset=offset,
+        handles=handles[offset:offset + limit]
+    )
+
+
 @router.get("/report/{analysis_id}/export")
 async def export_report(
     analysis_id: str,
@@ -69,7 +116,7 @@ async def export_report(
     # 获取报告
     result = get_analysis_result(analysis_id)
     
-    if not result or result["status"] != AnalysisStatus.COMPLETED:
+    if not result or result["status"] not in REPORT_STATUSES or not result.get("report"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="报告尚未完成或不存在"
@@ -120,6 +167,8 @@ def _generate_html_report(report: ComplianceReport) -> str:
         if getattr(v, 'entity_details', None):
             items = ''.join([f"<li><strong>{k}:</strong> {v_}</li>" for k, v_ in v.entity_details.items()])
             details_html = f"<ul style=\"margin:8px 0 0 16px;color:#555;\">{items}</ul>"
+        if v.count > 1 and v.sample_handles:
+            details_html += f"<div style=\"margin-top:8px;color:#555;\">示例句柄: {', '.join(v.sample_handles)}</div>"
         violations_html += f"""
         <tr>
             <td>{v.type.value}</td>
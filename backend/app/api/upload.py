@@ -4,11 +4,16 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, status
 from datetime import datetime
 from pathlib import Path
+import hashlib
+import os
 import uuid
 import aiofiles
 
 from app.models import FileUploadResponse
 from app.config import settings
+from app.utils.file_hash import CHUNK_SIZE, save_content_hash, content_hash_path
+from app.utils.cad_format import SNIFF_SIZE, sniff_cad_format
+from app.utils.body_limit import too_large_detail
 
 router = APIRouter()
 
@@ -33,21 +38,49 @@ async def upload_file(file: UploadFile = File(...)):
     safe_filename = f"{file_id}.{file_ext}"
     file_path = settings.upload_dir / safe_filename
     
-    # 读取文件内容并验证大小
-    content = await file.read()
-    file_size = len(content)
-    
-    if file_size > settings.max_upload_size:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"文件过大。最大允许大小: {settings.max_upload_size / (1024*1024):.1f}MB"
-        )
+    # 请求体总大小已由 BodySizeLimitMiddleware 在接收时限制，这里按文件内容的实际字节数精确校验
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=too_large_detail()
+    )
+    if file.size is not None and file.size > settings.max_upload_size:
+        raise too_large
     
-    # 保存文件
+    # 分块流式写入临时文件，同一遍完成大小校验、内容哈希和格式识别
+    tmp_path = settings.upload_dir / f".{safe_filename}.part"
+    hasher = hashlib.sha256()
+    file_size = 0
+    head = b""
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            while chunk := await file.read(CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > settings.max_upload_size:
+                    raise too_large
+                if len(head) < SNIFF_SIZE:
+                    head += chunk[:SNIFF_SIZE - len(head)]
+                hasher.update(chunk)
+                await f.write(chunk)
+        
+        detected_format = sniff_cad_format(head)
+        if detected_format != file_ext:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"文件内容与扩展名不符，不是有效的 {file_ext.upper()} 文件"
+            )
+        
+        content_hash = hasher.hexdigest()
+        # 原子重命名，分析任务不会读到写了一半的文件；哈希记录在文件就位后再写，不会留下孤立的记录
+        os.replace(tmp_path, file_path)
+        save_content_hash(file_id, content_hash)
+    except HTTPException:
+        tmp_path.unlink(missing_ok=True)
+        raise
     except Exception as e:
+        # 上传失败时客户端拿不到 file_id，已就位的文件和哈希记录一并删除
+        tmp_path.unlink(missing_ok=True)
+        file_path.unlink(missing_ok=True)
+        content_hash_path(file_id).unlink(missing_ok=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"文件保存失败: {str(e)}"
@@ -57,6 +90,7 @@ async def upload_file(file: UploadFile = File(...)):
         file_id=file_id,
         filename=file.filename,
         size=file_size,
+        content_hash=content_hash,
         upload_time=datetime.now()
     )
 
@@ -81,6 +115,7 @@ async def delete_file(file_id: str):
     # 删除文件
     try:
         file_path.unlink()
+        content_hash_path(file_id).unlink(missing_ok=True)
         return {"message": "文件删除成功", "file_id": file_id}
     except Exception as e:
         raise HTTPException(
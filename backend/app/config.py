@@ -25,9 +25,53 @@ class Settings(BaseSettings):
     # DWG 转换配置
     oda_converter_path: str = ""  # ODA File Converter 路径（可选）
     temp_dir: Path = Path("./temp")  # 临时转换目录
+    oda_batch_window: float = 0.2  # 等待合并批次的时间窗口（秒）
+    oda_batch_size: int = 8  # 单次 ODA 调用最多转换的文件数
+    converter_pool_size: int = 2  # 同时运行的转换器进程数上限
+    converter_timeout: int = 60  # 单个文件的转换超时（秒）
+    conversion_cache_dir: Path = Path("./data/dxf_cache")  # DWG 转换结果缓存目录
+    conversion_cache_max_bytes: int = 1024 * 1024 * 1024  # 1GB 磁盘配额
     
     # 分析配置
-    analysis_timeout: int = 30
+    analysis_timeout: int = 30  # 单个分析（解析 + 检查）的时间限制（秒），超时返回部分报告，0 表示不限制
+    analysis_kill_grace: int = 10  # 超时后等待工作进程协作退出的宽限时间（秒），仍未退出则强制终止
+    streaming_parse_threshold: int = 50 * 1024 * 1024  # DXF 达到该大小（字节）且启用规则只需逐图元数据时流式解析，0 表示不使用
+    max_block_depth: int = 4  # 块参照最多展开的嵌套层数，0 表示不展开（块内图元不参与检查）
+    
+    # 分析工作进程池配置
+    worker_pool_size: int = 0  # 0 表示使用 CPU 核心数
+    worker_max_tasks_per_child: int = 20  # 每个工作进程处理多少任务后重启（释放内存），0 表示不限制
+    
+    # 任务存储配置
+    job_store_backend: str = "sqlite"  # sqlite | memory
+    job_store_path: Path = Path("./data/jobs.db")
+    job_store_ttl: int = 7 * 24 * 3600  # 任务记录保留时间（秒），按最近访问时间计算
+    job_store_max_entries: int = 10000  # 最多保留的任务数，超出按 LRU 淘汰
+    job_store_cache_size: int = 32  # 进程内热缓存的报告数量
+    job_heartbeat_interval: int = 15  # 服务实例更新心跳、清理中断任务的间隔（秒）
+    job_owner_timeout: int = 60  # 实例超过该时间未更新心跳即视为已停止，其未结束的任务标记为失败
+    
+    # 结果缓存配置
+    result_cache_path: Path = Path("./data/result_cache.db")
+    result_cache_max_bytes: int = 256 * 1024 * 1024  # 256MB（压缩后的报告总大小）
+    
+    # 解析缓存配置
+    parse_cache_dir: Path = Path("./data/parse_cache")  # DXF 解析结果缓存目录
+    parse_cache_max_bytes: int = 1024 * 1024 * 1024  # 1GB 磁盘配额，0 表示不缓存
+    
+    # 违规项聚合配置
+    violation_aggregation: bool = False  # 同类违规项合并为一条（前端尚不展示合并项，默认关闭；请求参数 aggregate 可覆盖）
+    violation_group_min_size: int = 20  # 同类违规达到该数量才合并
+    violation_sample_size: int = 10  # 合并后保留的示例句柄数量
+    
+    # 检查规则执行配置
+    check_rule_workers: int = 4  # 每个分析并发执行检查规则的线程数，1 表示顺序执行
+    
+    # 分析进度推送配置
+    progress_interval: float = 0.25  # 工作进程上报解析进度的最小间隔（秒）
+    progress_store_interval: float = 1.0  # 同一阶段内进度写入任务存储的最小间隔（秒）
+    progress_keepalive: int = 15  # SSE 心跳间隔（秒）
+    progress_long_poll_timeout: int = 25  # 长轮询最长等待时间（秒）
     
     # 日志配置
     log_level: str = "INFO"
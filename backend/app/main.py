@@ -1,9 +1,26 @@
 """
 CAD 规范符合性检查器 - FastAPI 主应用
 """
+import asyncio
+import logging
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import upload, analysis, report
+from app.services.worker_pool import shutdown_worker_pool
+from app.services.job_store import job_store
+from app.services.result_cache import result_cache
+from app.services.conversion_cache import conversion_cache
+from app.services.parse_cache import parse_cache
+from app.services.dwg_converter import dwg_converter
+from app.config import settings
+from app.utils.body_limit import MULTIPART_OVERHEAD, BodySizeLimitMiddleware
+
+logger = logging.getLogger(__name__)
+
+# 定期更新本实例心跳的后台任务
+_heartbeat_task: Optional[asyncio.Task] = None
 
 app = FastAPI(
     title="CAD Compliance Checker API",
@@ -25,12 +42,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 上传请求体大小限制：超过上限时在接收过程中返回 413，不等整个请求体传输并缓存完毕
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=settings.max_upload_size + MULTIPART_OVERHEAD,
+    paths={"/api/v1/upload"}
+)
+
 # 注册路由
 app.include_router(upload.router, prefix="/api/v1", tags=["上传"])
 app.include_router(analysis.router, prefix="/api/v1", tags=["分析"])
 app.include_router(report.router, prefix="/api/v1", tags=["报告"])
 
 
+async def _heartbeat_loop():
+    """定期更新本实例的心跳，并结束执行者已停止的分析任务"""
+    while True:
+        await asyncio.sleep(settings.job_heartbeat_interval)
+        try:
+            await asyncio.to_thread(job_store.heartbeat)
+            await asyncio.to_thread(job_store.fail_unfinished, "分析所在的服务实例已停止，分析中断")
+        except Exception:
+            logger.exception("更新任务心跳失败")
+
+
+@app.on_event("startup")
+async def startup():
+    """应用启动时结束已中断的分析任务，并探测可用的 DWG 转换器"""
+    global _heartbeat_task
+    # 执行者已停止的任务，其状态查询和进度订阅永远不会结束；
+    # 共享任务存储的其他实例仍在心跳，它们的任务不受影响
+    await asyncio.to_thread(job_store.heartbeat)
+    await asyncio.to_thread(job_store.fail_unfinished, "服务重启，分析中断")
+    _heartbeat_task = asyncio.create_task(_heartbeat_loop())
+    await dwg_converter.probe_converters()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """应用退出时停止心跳、取消未完成的分析并关闭工作进程池"""
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
+    for task in list(analysis.running_tasks.values()):
+        task.cancel()
+    shutdown_worker_pool()
+
+
 @app.get("/")
 async def root():
     """健康检查端点"""
@@ -49,5 +106,10 @@ async def health_check():
         "services": {
             "api": "running",
             "parser": "ready"
-        }
+        },
+        "converters": dwg_converter.registry.snapshot(),
+        "result_cache": result_cache.stats(),
+        # 统计需要扫描缓存目录，放到线程中执行
+        "conversion_cache": await asyncio.to_thread(conversion_cache.stats),
+        "parse_cache": parse_cache.stats()
     }
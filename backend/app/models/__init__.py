@@ -6,10 +6,14 @@ from .schemas import (
     ViolationType,
     SeverityLevel,
     AnalysisStatus,
+    AnalysisStage,
+    AnalysisProgress,
     FileUploadResponse,
     AnalysisRequest,
     AnalysisResponse,
     ComplianceReport,
+    CheckRuleInfo,
+    ViolationHandles,
     ReportExportFormat
 )
 
@@ -18,9 +22,13 @@ __all__ = [
     "ViolationType",
     "SeverityLevel",
     "AnalysisStatus",
+    "AnalysisStage",
+    "AnalysisProgress",
     "FileUploadResponse",
     "AnalysisRequest",
     "AnalysisResponse",
     "ComplianceReport",
+    "CheckRuleInfo",
+    "ViolationHandles",
     "ReportExportFormat"
 ]
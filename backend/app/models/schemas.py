@@ -2,7 +2,7 @@
 Pydantic 数据模型定义
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -37,6 +37,11 @@ class Violation(BaseModel):
     location: Optional[dict] = Field(None, description="位置信息")
     entity_details: Optional[dict] = Field(None, description="实体具体信息（如尺寸值、文字内容等）")
     suggestion: Optional[str] = Field(None, description="修复建议")
+    
+    # 聚合模式：同类违规合并为一条
+    count: int = Field(1, description="合并的违规数量")
+    sample_handles: Optional[List[str]] = Field(None, description="合并违规的示例句柄")
+    packed_handles: Optional[str] = Field(None, description="合并违规的完整句柄列表（压缩编码，可通过 API 展开）")
 
 
 class AnalysisStatus(str, Enum):
@@ -45,6 +50,29 @@ class AnalysisStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    TIMED_OUT = "timed_out"  # 超过 analysis_timeout，可能带有部分报告
+
+
+class AnalysisStage(str, Enum):
+    """分析阶段"""
+    UPLOAD = "upload"
+    CONVERT = "convert"
+    PARSE = "parse"
+    CHECK = "check"
+    REPORT = "report"
+
+
+class AnalysisProgress(BaseModel):
+    """分析进度事件"""
+    analysis_id: str = Field(..., description="分析任务标识")
+    seq: int = Field(..., description="事件序号（同一任务内递增）")
+    status: AnalysisStatus = Field(..., description="分析状态")
+    stage: Optional[AnalysisStage] = Field(None, description="当前阶段")
+    percent: float = Field(0, ge=0, le=100, description="整体进度百分比")
+    message: str = Field("", description="进度消息")
+    current: Optional[int] = Field(None, description="阶段内已完成数量（如已解析图元数、已完成规则数）")
+    total: Optional[int] = Field(None, description="阶段内总数量")
+    rule: Optional[str] = Field(None, description="刚完成的检查规则")
 
 
 class FileUploadResponse(BaseModel):
@@ -52,6 +80,7 @@ class FileUploadResponse(BaseModel):
     file_id: str = Field(..., description="文件唯一标识")
     filename: str = Field(..., description="文件名")
     size: int = Field(..., description="文件大小(字节)")
+    content_hash: Optional[str] = Field(None, description="文件内容 SHA-256")
     upload_time: datetime = Field(..., description="上传时间")
     message: str = Field(default="文件上传成功")
 
@@ -60,6 +89,8 @@ class AnalysisRequest(BaseModel):
     """分析请求"""
     file_id: str = Field(..., description="文件标识")
     standard: str = Field(default="GB/T 14665-2012", description="检查标准")
+    aggregate: Optional[bool] = Field(None, description="是否合并同类违规项（不指定时使用服务端配置）")
+    rules: Optional[List[str]] = Field(None, description="只执行指定的检查规则（不指定时执行该标准启用的全部规则）")
 
 
 class AnalysisResponse(BaseModel):
@@ -90,6 +121,27 @@ class ComplianceReport(BaseModel):
     # 整体评估
     is_compliant: bool = Field(..., description="是否合规")
     compliance_score: float = Field(..., ge=0, le=100, description="合规得分")
+    
+    # 执行统计
+    rule_timings: Dict[str, float] = Field(default_factory=dict, description="各检查规则耗时（毫秒）")
+    partial: bool = Field(False, description="是否为超时后的部分报告")
+    unfinished_rules: List[str] = Field(default_factory=list, description="超时未完成的检查规则")
+
+
+class CheckRuleInfo(BaseModel):
+    """检查规则说明"""
+    name: str = Field(..., description="规则名")
+    description: str = Field("", description="规则说明")
+    cost: str = Field(..., description="开销等级")
+    enabled: bool = Field(..., description="对该标准是否启用")
+
+
+class ViolationHandles(BaseModel):
+    """违规项涉及的图元句柄（分页展开合并的违规）"""
+    violation_id: str = Field(..., description="违规项标识")
+    count: int = Field(..., description="句柄总数")
+    offset: int = Field(..., description="本页起始位置")
+    handles: List[str] = Field(default_factory=list, description="图元句柄")
 
 
 class ReportExportFormat(str, Enum):
@@ -0,0 +1,267 @@
+"""
+块参照（INSERT）展开（列式图元表版本）
+每个块定义只遍历一次，提取为块坐标下的图元表（嵌套块按深度展开后并入）；
+块参照的图元由 INSERT 变换矩阵对坐标数组做一次仿射变换得到，不逐个调用 virtual_entities()。
+展开结果为图元表的行字段，由解析器写入 EntityTableBuilder。
+0 图层和随块属性的解析规则与 frontend/checker/block_expander.py（字典图元版本）一致。
+
+同步维护：本模块在 backend/app/services/、checker/ 各有一份副本；
+后端服务与独立部署的检查包之间没有可共享的导入路径，修改时需同步全部副本。
+"""
+import math
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+# 默认展开的块嵌套层数（模型空间 INSERT 为第 1 层）
+DEFAULT_BLOCK_DEPTH = 4
+
+# 各图元类型在坐标数组中的点数（LINE 为起点、终点，其余为圆心/插入点）
+POINT_COUNTS = {"LINE": 2, "CIRCLE": 1, "TEXT": 1, "MTEXT": 1}
+# 块定义中不作为图元检查的类型（属性定义只是属性的模板）
+SKIPPED_TYPES = {"ATTDEF"}
+
+# 颜色/线宽/线型的“随块”取值
+COLOR_BYBLOCK = 0
+LINEWEIGHT_BYBLOCK = -2
+LINETYPE_BYBLOCK = "BYBLOCK"
+
+NAN = float("nan")
+
+
+class BlockDefinition(NamedTuple):
+    """块定义：块名、块基点（XY）和块内图元"""
+    name: str
+    base_point: Tuple[float, float]
+    entities: Iterable[Any]
+
+
+class DocumentBlocks:
+    """按块名读取 ezdxf 文档中的块定义"""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def get(self, name: str) -> Optional[BlockDefinition]:
+        block = self.doc.blocks.get(name)
+        if block is None:
+            return None
+        base_point = block.block.dxf.base_point
+        return BlockDefinition(block.name, (base_point.x, base_point.y), block)
+
+
+class BlockTable:
+    """块定义在块坐标下的图元表（已展开嵌套块）"""
+
+    __slots__ = ('records', 'starts', 'points', 'sizes')
+
+    def __init__(self, records: List[Dict[str, Any]], starts: List[int], points: np.ndarray, sizes: np.ndarray):
+        """
+        Args:
+            records: 图元字段模板（不含坐标和尺寸）
+            starts: 各图元在坐标数组中的起始行
+            points: 全部图元的坐标 (P, 2)
+            sizes: 各图元的半径/字高，无尺寸时为 NaN
+        """
+        self.records = records
+        self.starts = starts
+        self.points = points
+        self.sizes = sizes
+
+
+def insert_transform(insert, base_point: Tuple[float, float]) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    INSERT 在 XY 平面上的仿射变换（含块基点、缩放、旋转和插入点）
+
+    Returns:
+        (线性部分 A (2×2), 平移 t, 尺寸缩放比例)，块坐标 p 变换为 p @ A + t
+    """
+    rows = np.array(list(insert.matrix44().rows()), dtype=np.float64)
+    linear = rows[:2, :2]
+    translation = rows[3, :2]
+    if insert.doc is None:
+        # 不属于文档的 INSERT（流式读取）查不到块定义，matrix44 未减去块基点
+        translation = translation - np.asarray(base_point, dtype=np.float64) @ linear
+    return linear, translation, math.sqrt(abs(np.linalg.det(linear)))
+
+
+def _rotation(linear: np.ndarray) -> float:
+    """变换的旋转角（度）"""
+    return math.degrees(math.atan2(linear[0, 1], linear[0, 0]))
+
+
+def _record_type(entity_type: str) -> str:
+    """块内图元在图元表中的分类（与模型空间图元一致）"""
+    if entity_type in POINT_COUNTS:
+        return entity_type
+    if entity_type.startswith("DIMENSION"):
+        return "DIMENSION"
+    return "OTHER"
+
+
+def _resolve(record: Dict[str, Any], layer: str, color: int, linetype: str, lineweight: int):
+    """按块参照的属性解析图元的 0 图层和随块属性（原地修改）"""
+    if record["layer"] == "0":
+        record["layer"] = layer
+    if record["color"] == COLOR_BYBLOCK:
+        record["color"] = color
+    if record["linetype"].upper() == LINETYPE_BYBLOCK:
+        record["linetype"] = linetype
+    if record["lineweight"] == LINEWEIGHT_BYBLOCK:
+        record["lineweight"] = lineweight
+
+
+class BlockExpander:
+    """块参照展开器（每次解析一个实例，块定义表在实例内缓存）"""
+
+    def __init__(self, blocks, max_depth: int = DEFAULT_BLOCK_DEPTH):
+        """
+        Args:
+            blocks: 按块名返回 BlockDefinition 的对象（get(name)，不存在时返回 None）
+            max_depth: 最多展开的嵌套层数，0 表示不展开
+        """
+        self.blocks = blocks
+        self.max_depth = max_depth
+        # (块名, 剩余展开层数) -> 图元表；正在构建的块为 None（防止循环引用）
+        self._tables: Dict[Tuple[str, int], Optional[BlockTable]] = {}
+
+    def expand(self, insert) -> List[Dict[str, Any]]:
+        """
+        展开模型空间的块参照
+
+        返回的行字段为 type / layer / color / linetype / lineweight / text / style / rotation / block / block_handle
+        和坐标 x0, y0, x1, y1、尺寸 size（缺省为 NaN）；block 为嵌套块名路径，block_handle 为块定义中图元的句柄，
+        rotation 为文字的旋转角（度，已叠加块参照的旋转）。
+        MINSERT 的阵列单元属性完全相同，只按第一个单元展开一次，解析开销不随阵列规模增长。
+        """
+        if self.max_depth <= 0:
+            return []
+        table = self._table(insert.dxf.name, self.max_depth - 1)
+        if table is None or not table.records:
+            return []
+
+        block = self.blocks.get(insert.dxf.name)
+        linear, translation, scale = insert_transform(insert, block.base_point)
+        points = (table.points @ linear + translation).tolist()
+        sizes = (table.sizes * scale).tolist()
+        angle = _rotation(linear)
+
+        dxf = insert.dxf
+        layer, color, linetype, lineweight = dxf.layer, dxf.color, dxf.linetype, dxf.lineweight
+        rows = []
+        for record, start, size in zip(table.records, table.starts, sizes):
+            row = dict(record)
+            _resolve(row, layer, color, linetype, lineweight)
+            count = POINT_COUNTS.get(row["type"], 0)
+            if count:
+                row["x0"], row["y0"] = points[start]
+            if count == 2:
+                row["x1"], row["y1"] = points[start + 1]
+            row["size"] = size
+            if row["type"] in ("TEXT", "MTEXT"):
+                row["rotation"] += angle
+            rows.append(row)
+        return rows
+
+    def _table(self, name: str, depth: int) -> Optional[BlockTable]:
+        """块定义的图元表（按块名和剩余展开层数缓存），块不存在或循环引用时返回 None"""
+        key = (name, depth)
+        if key in self._tables:
+            return self._tables[key]
+        self._tables[key] = None
+        block = self.blocks.get(name)
+        if block is not None:
+            self._tables[key] = self._build(block, depth)
+        return self._tables[key]
+
+    def _build(self, block: BlockDefinition, depth: int) -> BlockTable:
+        """遍历块定义，嵌套块参照按其变换并入（剩余层数为 0 时只记录 INSERT 本身）"""
+        records: List[Dict[str, Any]] = []
+        starts: List[int] = []
+        point_chunks: List[np.ndarray] = []
+        size_chunks: List[np.ndarray] = []
+        total = 0
+
+        for entity in block.entities:
+            entity_type = entity.dxftype()
+            if entity_type in SKIPPED_TYPES:
+                continue
+
+            record = self._record(entity, entity_type, block.name)
+            records.append(record)
+            starts.append(total)
+            coords, size = self._geometry(entity, record["type"])
+            point_chunks.append(coords)
+            size_chunks.append(np.array([size]))
+            total += len(coords)
+
+            if entity_type != "INSERT" or depth <= 0:
+                continue
+            child = self._table(entity.dxf.name, depth - 1)
+            if child is None or not child.records:
+                continue
+
+            # 嵌套块：子块图元表变换到本块坐标后并入
+            linear, translation, scale = insert_transform(entity, self.blocks.get(entity.dxf.name).base_point)
+            angle = _rotation(linear)
+            dxf = entity.dxf
+            for child_record, child_start in zip(child.records, child.starts):
+                nested = dict(child_record)
+                _resolve(nested, dxf.layer, dxf.color, dxf.linetype, dxf.lineweight)
+                nested["block"] = f"{block.name}/{child_record['block']}"
+                if nested["type"] in ("TEXT", "MTEXT"):
+                    nested["rotation"] += angle
+                records.append(nested)
+                starts.append(total + child_start)
+            point_chunks.append(child.points @ linear + translation)
+            size_chunks.append(child.sizes * scale)
+            total += len(child.points)
+
+        points = np.concatenate(point_chunks) if point_chunks else np.empty((0, 2))
+        sizes = np.concatenate(size_chunks) if size_chunks else np.empty(0)
+        return BlockTable(records, starts, points.reshape(-1, 2), sizes)
+
+    @staticmethod
+    def _record(entity, entity_type: str, block_name: str) -> Dict[str, Any]:
+        """图元字段模板"""
+        record_type = _record_type(entity_type)
+        dxf = entity.dxf
+        record = {
+            "type": record_type,
+            "block_handle": dxf.handle,
+            "block": block_name,
+            "layer": dxf.layer,
+            "color": dxf.color,
+            "linetype": dxf.linetype,
+            "lineweight": getattr(dxf, 'lineweight', -1),
+            "text": None,
+            "style": None,
+            "rotation": 0.0,
+            "x0": NAN,
+            "y0": NAN,
+            "x1": NAN,
+            "y1": NAN
+        }
+        if record_type in ("TEXT", "MTEXT"):
+            record["text"] = dxf.text if record_type == "TEXT" else entity.text
+            record["style"] = getattr(dxf, 'style', 'Standard')
+            record["rotation"] = getattr(dxf, 'rotation', 0)
+        return record
+
+    @staticmethod
+    def _geometry(entity, record_type: str) -> Tuple[np.ndarray, float]:
+        """图元在块坐标下的坐标点 (k, 2) 和尺寸（半径/字高，没有时为 NaN）"""
+        if record_type == "LINE":
+            start, end = entity.dxf.start, entity.dxf.end
+            return np.array([[start.x, start.y], [end.x, end.y]]), NAN
+        if record_type == "CIRCLE":
+            center = entity.dxf.center
+            return np.array([[center.x, center.y]]), entity.dxf.radius
+        if record_type == "TEXT":
+            insert = entity.dxf.insert
+            return np.array([[insert.x, insert.y]]), entity.dxf.height
+        if record_type == "MTEXT":
+            insert = entity.dxf.insert
+            return np.array([[insert.x, insert.y]]), getattr(entity.dxf, 'char_height', 2.5)
+        return np.empty((0, 2)), NAN
@@ -1,34 +1,73 @@
 """
 CAD 合规性检查服务
 """
-import yaml
-import uuid
+import asyncio
+import re
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Optional
 from collections import Counter
 
+import numpy as np
+
 from app.models import (
     ComplianceReport,
-    Violation,
     ViolationType,
     SeverityLevel
 )
+from app.services.check_rules import CheckRule, CheckRuleRegistry, CostClass, RuleContext, run_rules
+from app.services.deadline import Deadline
+from app.services.dxf_parser import PARSER_TAG
+from app.services.entity_table import COLUMNS, LINEAR_TYPES
+from app.services.parse_projection import ParseProjection
+from app.services.rule_set import get_rule_set
+from app.services.violation_groups import ViolationGrouper
+from app.services.violation_records import ViolationRecord, ViolationRecordFactory, to_models
+from app.config import settings
+
+
+# 检查器版本：检查规则的实现或报告内容变化时递增
+CHECKER_VERSION = 1
+# 解析与检查代码的版本标识（结果缓存键的一部分，部署新的解析或检查逻辑后旧报告不再命中）
+ANALYSIS_CODE_TAG = f"{PARSER_TAG}.checker-v{CHECKER_VERSION}"
+
+# 尺寸标注图层（其上的文字不参与文字图层检查）
+DIMENSION_TEXT_LAYER = re.compile("DIM|尺寸")
+
+# 检查规则注册表：规则函数签名为 check(checker, dxf_data, ctx)，
+# 可在其他模块中用 check_rules.register(...) 追加规则
+check_rules = CheckRuleRegistry(COLUMNS)
 
 
 class ComplianceCheckerService:
     """合规性检查器"""
     
-    def __init__(self, standard: str = "GB/T 14665-2012"):
+    def __init__(
+        self,
+        standard: str = "GB/T 14665-2012",
+        aggregate: bool = False,
+        rules: Optional[List[str]] = None
+    ):
+        """
+        Args:
+            standard: 检查标准
+            aggregate: 是否合并同类违规项
+            rules: 只执行这些检查规则，None 表示该标准启用的全部规则
+
+        Raises:
+            ValueError: 标准不存在或包含未知的检查规则
+        """
         self.standard = standard
-        self.rules = self._load_rules()
-        self.violations: List[Violation] = []
-        
-    def _load_rules(self) -> Dict[str, Any]:
-        """加载规则配置"""
-        config_file = Path(__file__).parent.parent.parent / "config" / "rules_gbt14665.yaml"
-        with open(config_file, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        # 聚合模式：同类违规合并为一条，避免生成海量 Violation 对象
+        self.aggregate = aggregate
+        # 规则集在进程内缓存，规则文件变化时自动重新加载
+        self.rule_set = get_rule_set(standard)
+        self.rules = self.rule_set.rules
+        self.layer_matcher = self.rule_set.layer_matcher
+        self.enabled_rules = check_rules.enabled_for(self.rule_set, rules)
+        self.violations: List[ViolationRecord] = []
+        self.rule_timings: Dict[str, float] = {}
+        self.unfinished_rules: List[str] = []
     
     async def check(
         self,
@@ -37,7 +76,7 @@ class ComplianceCheckerService:
         file_path: str
     ) -> ComplianceReport:
         """
-        执行完整的合规性检查
+        执行完整的合规性检查（在线程中执行 check_sync，不阻塞事件循环）
         
         Args:
             dxf_data: 解析后的 DXF 数据
@@ -47,93 +86,172 @@ class ComplianceCheckerService:
         Returns:
             合规性报告
         """
-        self.violations = []
+        return await asyncio.to_thread(self.check_sync, dxf_data, analysis_id, file_path)
+    
+    def check_sync(
+        self,
+        dxf_data: Dict[str, Any],
+        analysis_id: str,
+        file_path: str,
+        deadline: Optional[Deadline] = None,
+        on_rule: Optional[Callable[[CheckRule, Optional[float]], None]] = None
+    ) -> ComplianceReport:
+        """
+        同步执行合规性检查（CPU 密集，供工作进程池直接调用）
+        
+        Args:
+            dxf_data: 解析后的 DXF 数据
+            analysis_id: 分析任务ID
+            file_path: 文件路径
+            deadline: 截止时间，超时后未完成的规则不计入报告（报告标记为 partial）
+            on_rule: 每条规则结束时的回调（用于上报进度）
+            
+        Returns:
+            合规性报告
+        """
+        # 执行当前标准启用的检查规则（互不依赖的规则并发执行）
+        results = run_rules(
+            self.enabled_rules,
+            self,
+            dxf_data,
+            lambda rule: self._make_context(rule, deadline),
+            settings.check_rule_workers,
+            on_rule
+        )
         
-        # 执行各项检查
-        self._check_layers(dxf_data)
-        self._check_lineweights(dxf_data)
-        self._check_colors(dxf_data)
-        self._check_fonts(dxf_data)
-        self._check_dimensions(dxf_data)
+        # 按注册顺序合并各规则的违规项；热路径上只生成轻量记录，ID 由规则和句柄确定性生成
+        make_violation = ViolationRecordFactory()
+        self.violations = []
+        self.rule_timings = {}
+        for rule, ctx, elapsed in results:
+            self.violations.extend(ctx.build(make_violation))
+            self.rule_timings[rule.name] = round(elapsed * 1000, 3)
+        self.unfinished_rules = [
+            rule.name for rule in self.enabled_rules if rule.name not in self.rule_timings
+        ]
         
         # 生成报告
         report = self._generate_report(dxf_data, analysis_id, file_path)
         return report
     
-    def _check_layers(self, dxf_data: Dict[str, Any]):
+    def partial_report(self, analysis_id: str, file_path: str) -> ComplianceReport:
+        """解析阶段已超时、未执行任何规则时的部分报告"""
+        self.violations = []
+        self.rule_timings = {}
+        self.unfinished_rules = [rule.name for rule in self.enabled_rules]
+        return self._generate_report({'filename': Path(file_path).name}, analysis_id, file_path)
+    
+    def projection(self) -> ParseProjection:
+        """启用的检查规则需要解析器提取的数据"""
+        return ParseProjection.from_rules(self.enabled_rules)
+    
+    def _make_context(self, rule: CheckRule, deadline: Optional[Deadline] = None) -> RuleContext:
+        """为规则创建执行上下文（聚合模式下每条规则使用独立的分组器）"""
+        grouper = None
+        if self.aggregate:
+            grouper = ViolationGrouper(
+                settings.violation_group_min_size,
+                settings.violation_sample_size
+            )
+        return RuleContext(rule.name, grouper, deadline)
+    
+    @check_rules.register(
+        "layers",
+        columns=("entity_type", "handle", "layer_id", "color", "linetype_id", "lineweight",
+                 "x0", "y0", "size", "text_id"),
+        entity_types=("DIMENSION", "TEXT", "MTEXT"),
+        cost=CostClass.MODERATE
+    )
+    def _check_layers(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查图层规范"""
         rules = self.rules['layers']
-        entities = dxf_data['entities']
+        table = dxf_data['entities']
+        layers = table.layers
         
-        # 检查尺寸标注是否在正确图层
+        # 检查尺寸标注是否在正确图层（每个不同图层名只匹配一次，图元按图层编号查表）
         expected_dim_layers = rules['尺寸层']['expected_names']
-        for dim in entities.get('DIMENSION', []):
-            layer = dim['layer']
-            if not any(exp_name.upper() in layer.upper() for exp_name in expected_dim_layers):
-                # 构建详细的实体信息
-                entity_details = {
-                    "entity_type": "尺寸标注",
-                    "measurement": dim.get('measurement', '未知'),
-                    "display_text": dim.get('display_text', ''),
-                    "position": dim.get('text_position', dim.get('defpoint', '未知位置')),
-                    "text_height": dim.get('text_height', 0),
-                    "arrow_size": dim.get('arrow_size', 0)
-                }
-                
-                # 构建更详细的描述
-                detail_info = f"测量值: {entity_details['measurement']}"
-                if entity_details['display_text']:
-                    detail_info += f", 显示文字: '{entity_details['display_text']}'"
-                
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
-                    type=ViolationType.LAYER,
-                    severity=SeverityLevel.WARNING,
-                    rule="GB/T 14665-2012 表6 - 图层规则",
-                    description=f"尺寸标注应位于专用图层（如：{', '.join(expected_dim_layers)}），当前位于: {layer}。{detail_info}",
-                    entity_handle=dim['handle'],
-                    layer=layer,
-                    entity_details=entity_details,
-                    suggestion=f"将尺寸标注移至 {expected_dim_layers[0]} 图层"
-                ))
+        dim_layer_ok = self.layer_matcher.mask(layers, '尺寸层')
+        dim_rows = table.rows('DIMENSION')
+        dim_layer_ids = table.layer_id[dim_rows]
+        for i in np.flatnonzero(~dim_layer_ok[dim_layer_ids]).tolist():
+            row = int(dim_rows[i])
+            layer = layers[dim_layer_ids[i]]
+            # 仅为违规图元构建字典视图
+            dim = table.row(row)
+            # 构建详细的实体信息
+            entity_details = {
+                "entity_type": "尺寸标注",
+                "measurement": dim.get('measurement', '未知'),
+                "display_text": dim.get('display_text', ''),
+                "position": dim.get('text_position', dim.get('defpoint', '未知位置')),
+                "text_height": dim.get('text_height', 0),
+                "arrow_size": dim.get('arrow_size', 0)
+            }
+            
+            # 构建更详细的描述
+            detail_info = f"测量值: {entity_details['measurement']}"
+            if entity_details['display_text']:
+                detail_info += f", 显示文字: '{entity_details['display_text']}'"
+            
+            ctx.add(
+                type=ViolationType.LAYER,
+                severity=SeverityLevel.WARNING,
+                rule="GB/T 14665-2012 表6 - 图层规则",
+                description=f"尺寸标注应位于专用图层（如：{', '.join(expected_dim_layers)}），当前位于: {layer}。{detail_info}",
+                entity_handle=dim['handle'],
+                layer=layer,
+                entity_details=entity_details,
+                suggestion=f"将尺寸标注移至 {expected_dim_layers[0]} 图层"
+            )
         
         # 检查文字是否在正确图层
         expected_text_layers = rules['文字层']['expected_names']
-        for text in entities.get('TEXT', []) + entities.get('MTEXT', []):
-            layer = text['layer']
-            # 跳过尺寸标注的文字
-            if 'DIM' in layer.upper() or '尺寸' in layer:
-                continue
-            if not any(exp_name.upper() in layer.upper() for exp_name in expected_text_layers):
-                # 构建详细的实体信息
-                entity_details = {
-                    "entity_type": "文字",
-                    "text_content": text.get('text', ''),
-                    "height": text.get('height', 0),
-                    "position": text.get('position', '未知位置'),
-                    "style": text.get('style', 'Standard'),
-                    "rotation": text.get('rotation', 0)
-                }
-                
-                # 构建更详细的描述
-                detail_info = f"文字内容: '{entity_details['text_content']}', 高度: {entity_details['height']:.2f}mm"
-                if entity_details['position'] != '未知位置':
-                    detail_info += f", 位置: ({entity_details['position'][0]:.2f}, {entity_details['position'][1]:.2f})"
-                
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
-                    type=ViolationType.LAYER,
-                    severity=SeverityLevel.INFO,
-                    rule="GB/T 14665-2012 表6 - 图层规则",
-                    description=f"文字应位于专用图层（如：{', '.join(expected_text_layers)}），当前位于: {layer}。{detail_info}",
-                    entity_handle=text['handle'],
-                    layer=layer,
-                    entity_details=entity_details,
-                    suggestion=f"将文字移至 {expected_text_layers[0]} 图层"
-                ))
+        # 跳过尺寸标注图层上的文字
+        text_layer_ok = self.layer_matcher.mask(layers, '文字层') | np.fromiter(
+            (DIMENSION_TEXT_LAYER.search(name.upper()) is not None for name in layers),
+            dtype=bool,
+            count=len(layers)
+        )
+        text_rows = table.rows('TEXT', 'MTEXT')
+        text_layer_ids = table.layer_id[text_rows]
+        for i in np.flatnonzero(~text_layer_ok[text_layer_ids]).tolist():
+            row = int(text_rows[i])
+            layer = layers[text_layer_ids[i]]
+            text = table.row(row)
+            # 构建详细的实体信息
+            entity_details = {
+                "entity_type": "文字",
+                "text_content": text.get('text', ''),
+                "height": text.get('height', 0),
+                "position": text.get('position', '未知位置'),
+                "style": text.get('style', 'Standard'),
+                "rotation": text.get('rotation', 0)
+            }
+            
+            # 构建更详细的描述
+            detail_info = f"文字内容: '{entity_details['text_content']}', 高度: {entity_details['height']:.2f}mm"
+            if entity_details['position'] != '未知位置':
+                detail_info += f", 位置: ({entity_details['position'][0]:.2f}, {entity_details['position'][1]:.2f})"
+            
+            ctx.add(
+                type=ViolationType.LAYER,
+                severity=SeverityLevel.INFO,
+                rule="GB/T 14665-2012 表6 - 图层规则",
+                description=f"文字应位于专用图层（如：{', '.join(expected_text_layers)}），当前位于: {layer}。{detail_info}",
+                entity_handle=text['handle'],
+                layer=layer,
+                entity_details=entity_details,
+                suggestion=f"将文字移至 {expected_text_layers[0]} 图层"
+            )
     
-    def _check_lineweights(self, dxf_data: Dict[str, Any]):
-        """检查线宽规范"""
+    @check_rules.register(
+        "lineweights",
+        columns=("entity_type", "handle", "layer_id", "lineweight"),
+        entity_types=LINEAR_TYPES,
+        cost=CostClass.MODERATE
+    )
+    def _check_lineweights(self, dxf_data: Dict[str, Any], ctx: RuleContext):
+        """检查线宽规范（按列向量化计算，仅为违规行生成记录）"""
         rules = self.rules['lineweights']
         tolerance = rules['tolerance']
         
@@ -143,112 +261,125 @@ class ComplianceCheckerService:
             rules['medium_line'],
             rules['thin_line']
         ]
+        standard = np.asarray(standard_weights, dtype=np.float64)
         
         # 检查所有线条实体
-        for entity_type in ['LINE', 'CIRCLE', 'ARC', 'POLYLINE']:
-            for entity in dxf_data['entities'].get(entity_type, []):
-                lineweight = entity.get('lineweight', -1)
+        table = dxf_data['entities']
+        for entity_type in LINEAR_TYPES:
+            rows = table.rows(entity_type)
+            lineweights = table.lineweight[rows]
+            
+            # 转换为 mm（DXF 中线宽单位是 1/100 mm），与每个标准线宽求差 (n, 3)
+            lineweights_mm = lineweights / 100.0
+            deviation = np.abs(lineweights_mm[:, None] - standard[None, :])
+            
+            # -1 表示使用默认值（ByLayer），-2 表示 ByBlock，不参与检查
+            flagged = (lineweights >= 0) & ~(deviation <= tolerance).any(axis=1)
+            if not flagged.any():
+                continue
+            recommended_index = deviation.argmin(axis=1)
+            
+            for i in np.flatnonzero(flagged).tolist():
+                row = int(rows[i])
+                lineweight_mm = float(lineweights_mm[i])
+                recommended = standard_weights[recommended_index[i]]
                 
-                # -1 表示使用默认值（ByLayer），-2 表示 ByBlock
-                if lineweight < 0:
-                    continue
+                # 构建详细的实体信息
+                entity_details = {
+                    "entity_type": entity_type,
+                    "current_lineweight": lineweight_mm,
+                    "standard_lineweights": standard_weights,
+                    "recommended_lineweight": recommended,
+                    "tolerance": tolerance
+                }
                 
-                # 转换为 mm（DXF 中线宽单位是 1/100 mm）
-                lineweight_mm = lineweight / 100.0
+                # 构建更详细的描述
+                detail_info = f"当前线宽: {lineweight_mm:.2f}mm, 推荐: {recommended:.2f}mm"
                 
-                # 检查是否符合标准线宽
-                is_standard = any(
-                    abs(lineweight_mm - std) <= tolerance
-                    for std in standard_weights
+                ctx.add(
+                    type=ViolationType.LINEWEIGHT,
+                    severity=SeverityLevel.WARNING,
+                    rule="GB/T 14665-2012 表1 - 线宽规则",
+                    description=f"线宽 {lineweight_mm:.2f}mm 不符合标准。标准线宽: {standard_weights}。{detail_info}",
+                    entity_handle=table.handle_str(row),
+                    layer=table.layer_name(row),
+                    entity_details=entity_details,
+                    suggestion=f"使用标准线宽: {recommended}mm",
+                    key=int(lineweights[i])
                 )
-                
-                if not is_standard:
-                    # 构建详细的实体信息
-                    entity_details = {
-                        "entity_type": entity_type,
-                        "current_lineweight": lineweight_mm,
-                        "standard_lineweights": standard_weights,
-                        "recommended_lineweight": min(standard_weights, key=lambda x: abs(x-lineweight_mm)),
-                        "tolerance": tolerance
-                    }
-                    
-                    # 构建更详细的描述
-                    detail_info = f"当前线宽: {lineweight_mm:.2f}mm, 推荐: {entity_details['recommended_lineweight']:.2f}mm"
-                    
-                    self.violations.append(Violation(
-                        id=str(uuid.uuid4()),
-                        type=ViolationType.LINEWEIGHT,
-                        severity=SeverityLevel.WARNING,
-                        rule="GB/T 14665-2012 表1 - 线宽规则",
-                        description=f"线宽 {lineweight_mm:.2f}mm 不符合标准。标准线宽: {standard_weights}。{detail_info}",
-                        entity_handle=entity['handle'],
-                        layer=entity['layer'],
-                        entity_details=entity_details,
-                        suggestion=f"使用标准线宽: {entity_details['recommended_lineweight']}mm"
-                    ))
     
-    def _check_colors(self, dxf_data: Dict[str, Any]):
+    @check_rules.register("colors", columns=("color",), cost=CostClass.CHEAP)
+    def _check_colors(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查颜色规范"""
         rules = self.rules['colors']
         default_color = rules['default']
         
-        # 统计非标准颜色使用
-        non_standard_colors = []
-        
-        for entity_type, entities in dxf_data['entities'].items():
-            for entity in entities:
-                color = entity.get('color', default_color)
-                
-                # 检查是否使用了过于花哨的颜色
-                if color not in [default_color, 256, 0] and 1 <= color <= 255:
-                    non_standard_colors.append((entity, color))
+        # 统计非标准颜色使用：1-255 之间且不是默认色（0 = ByBlock，256 = ByLayer）
+        colors = dxf_data['entities'].color
+        non_standard_count = int(np.count_nonzero(
+            (colors >= 1) & (colors <= 255) & (colors != default_color)
+        ))
         
         # 如果使用过多颜色，给出提示
-        if len(non_standard_colors) > 10:
-            self.violations.append(Violation(
-                id=str(uuid.uuid4()),
+        if non_standard_count > 10:
+            ctx.add(
                 type=ViolationType.COLOR,
                 severity=SeverityLevel.INFO,
                 rule="GB/T 14665-2012 表2 - 颜色规则",
-                description=f"检测到 {len(non_standard_colors)} 个实体使用了非标准颜色。建议统一使用随层或默认颜色",
+                description=f"检测到 {non_standard_count} 个实体使用了非标准颜色。建议统一使用随层或默认颜色",
                 suggestion="将实体颜色设置为 ByLayer（随层）以便统一管理"
-            ))
+            )
     
-    def _check_fonts(self, dxf_data: Dict[str, Any]):
-        """检查字体规范"""
+    @check_rules.register(
+        "fonts",
+        columns=("entity_type", "handle", "layer_id", "size"),
+        entity_types=("TEXT", "MTEXT"),
+        cost=CostClass.MODERATE
+    )
+    def _check_fonts(self, dxf_data: Dict[str, Any], ctx: RuleContext):
+        """检查字体规范（按字高列向量化筛选）"""
         rules = self.rules['fonts']
         min_height = rules['min_height']
         max_height = rules['max_height']
         
+        # TEXT/MTEXT 行按图纸顺序排列，与 texts 列表一一对应
+        table = dxf_data['entities']
+        rows = np.flatnonzero(table.mask('TEXT', 'MTEXT'))
+        heights = table.size[rows]
+        too_small = heights < min_height
+        too_large = heights > max_height
+        
         # 检查所有文字高度
-        for text in dxf_data['texts']:
-            height = text['height']
+        for i in np.flatnonzero(too_small | too_large).tolist():
+            row = int(rows[i])
+            height = float(heights[i])
             
-            if height < min_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+            if too_small[i]:
+                ctx.add(
                     type=ViolationType.FONT,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 表3 - 字体规则",
                     description=f"文字高度 {height:.1f}mm 过小，最小允许: {min_height}mm",
-                    entity_handle=text['handle'],
-                    layer=text['layer'],
-                    suggestion=f"将文字高度调整至 {min_height}mm 以上"
-                ))
+                    entity_handle=table.handle_str(row),
+                    layer=table.layer_name(row),
+                    suggestion=f"将文字高度调整至 {min_height}mm 以上",
+                    key=f"{height:.1f}"
+                )
             
-            elif height > max_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+            else:
+                ctx.add(
                     type=ViolationType.FONT,
                     severity=SeverityLevel.INFO,
                     rule="GB/T 14665-2012 表3 - 字体规则",
                     description=f"文字高度 {height:.1f}mm 过大，建议不超过: {max_height}mm",
-                    entity_handle=text['handle'],
-                    layer=text['layer'],
-                    suggestion=f"将文字高度调整至 {max_height}mm 以内"
-                ))
+                    entity_handle=table.handle_str(row),
+                    layer=table.layer_name(row),
+                    suggestion=f"将文字高度调整至 {max_height}mm 以内",
+                    key=f"{height:.1f}"
+                )
     
-    def _check_dimensions(self, dxf_data: Dict[str, Any]):
+    @check_rules.register("dimensions", sections=("dimensions",), cost=CostClass.MODERATE)
+    def _check_dimensions(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查尺寸标注规范"""
         dimensions = dxf_data['dimensions']
         
@@ -270,29 +401,28 @@ class ComplianceCheckerService:
             consistency = count / len(arrow_sizes)
             
             if consistency < consistency_threshold:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.DIMENSION,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 6.3节 - 尺寸终端一致性",
                     description=f"尺寸终端类型一致性仅为 {consistency*100:.1f}%，建议达到 {consistency_threshold*100:.0f}%",
                     suggestion=f"统一使用相同的尺寸终端样式（当前主要使用箭头大小: {most_common_size:.1f}mm）"
-                ))
+                )
         
         # 检查尺寸文字高度
         for dim in dimensions:
             text_height = dim['text_height']
             if text_height > 0 and text_height < min_text_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.DIMENSION,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 - 尺寸文字高度",
                     description=f"尺寸文字高度 {text_height:.1f}mm 过小，最小推荐: {min_text_height}mm",
                     entity_handle=dim['handle'],
                     layer=dim['layer'],
-                    suggestion=f"将尺寸文字高度调整至 {min_text_height}mm 以上"
-                ))
+                    suggestion=f"将尺寸文字高度调整至 {min_text_height}mm 以上",
+                    key=f"{text_height:.1f}"
+                )
     
     def _generate_report(
         self,
@@ -302,10 +432,10 @@ class ComplianceCheckerService:
     ) -> ComplianceReport:
         """生成合规性报告"""
         
-        # 统计各严重程度的违规数量
-        critical_count = sum(1 for v in self.violations if v.severity == SeverityLevel.CRITICAL)
-        warning_count = sum(1 for v in self.violations if v.severity == SeverityLevel.WARNING)
-        info_count = sum(1 for v in self.violations if v.severity == SeverityLevel.INFO)
+        # 统计各严重程度的违规数量（合并的违规按实际数量计）
+        critical_count = sum(v.get('count', 1) for v in self.violations if v['severity'] == SeverityLevel.CRITICAL)
+        warning_count = sum(v.get('count', 1) for v in self.violations if v['severity'] == SeverityLevel.WARNING)
+        info_count = sum(v.get('count', 1) for v in self.violations if v['severity'] == SeverityLevel.INFO)
         
         # 计算合规得分（简化算法）
         weights = self.rules['check_weights']
@@ -317,20 +447,25 @@ class ComplianceCheckerService:
         score -= info_count * 2       # 提示扣2分
         score = max(0, score)  # 最低0分
         
-        # 判断是否合规（无严重错误且得分>=80）
-        is_compliant = critical_count == 0 and score >= 80
+        # 判断是否合规（无严重错误且得分>=80；部分报告无法判定合规）
+        partial = bool(self.unfinished_rules)
+        is_compliant = critical_count == 0 and score >= 80 and not partial
         
-        return ComplianceReport(
+        # 违规记录批量校验一次，报告本身的字段由检查器生成，跳过校验
+        return ComplianceReport.model_construct(
             analysis_id=analysis_id,
             file_id=Path(file_path).stem,
             filename=dxf_data['filename'],
             standard=self.standard,
             analysis_time=datetime.now(),
-            total_violations=len(self.violations),
+            total_violations=critical_count + warning_count + info_count,
             critical_count=critical_count,
             warning_count=warning_count,
             info_count=info_count,
-            violations=self.violations,
+            violations=to_models(self.violations),
             is_compliant=is_compliant,
-            compliance_score=score
+            compliance_score=score,
+            rule_timings=self.rule_timings,
+            partial=partial,
+            unfinished_rules=self.unfinished_rules
         )
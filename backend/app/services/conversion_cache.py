@@ -0,0 +1,145 @@
+"""
+DWG 转换结果缓存
+按 (DWG 内容哈希, 转换器名称/版本) 缓存转换得到的 DXF，重复分析同一 DWG 时跳过转换；
+正在使用的内容哈希被钉住（引用计数），其 DXF 不会被淘汰。
+磁盘操作（查找、移入、淘汰、统计）都是阻塞调用，异步代码中应放到线程中执行。
+"""
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+
+class ConversionCache:
+    """磁盘上的 DXF 缓存，超出配额时按最近使用时间 (LRU) 淘汰"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # 内容哈希 -> 引用计数（计数大于 0 的 DXF 不淘汰）
+        self._pins: Dict[str, int] = {}
+        self._pin_lock = threading.Lock()
+
+    def path_for(self, content_hash: str, converter_tag: str) -> Path:
+        """缓存文件路径"""
+        return self.cache_dir / f"{content_hash}.{converter_tag}.dxf"
+
+    def pin(self, content_hash: str):
+        """钉住内容哈希的缓存文件（查找或转换之前调用），直到对应的 unpin 之前不会被淘汰"""
+        with self._pin_lock:
+            self._pins[content_hash] = self._pins.get(content_hash, 0) + 1
+
+    def unpin(self, content_hash: str):
+        """释放 pin 的引用"""
+        with self._pin_lock:
+            count = self._pins.get(content_hash, 0) - 1
+            if count > 0:
+                self._pins[content_hash] = count
+            else:
+                self._pins.pop(content_hash, None)
+
+    def release(self, dxf_path: str):
+        """按缓存中的 DXF 路径释放 pin 的引用（文件名以内容哈希开头）"""
+        self.unpin(Path(dxf_path).name.split(".", 1)[0])
+
+    def get(self, content_hash: str, converter_tags: List[str]) -> Optional[str]:
+        """
+        按转换器优先顺序查找缓存
+
+        Args:
+            content_hash: DWG 内容哈希
+            converter_tags: 可接受的转换器标识（名称+版本），按优先级排序
+
+        Returns:
+            缓存的 DXF 路径，未命中返回 None
+        """
+        for converter_tag in converter_tags:
+            path = self.path_for(content_hash, converter_tag)
+            try:
+                # 刷新修改时间作为 LRU 依据
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self.hits += 1
+            return str(path)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, content_hash: str, converter_tag: str, dxf_path: str) -> str:
+        """
+        将转换结果移入缓存
+
+        Returns:
+            缓存中的 DXF 路径
+        """
+        target = self.path_for(content_hash, converter_tag)
+        # 缓存目录在首次写入时创建（导入模块不创建目录）
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # 先移到缓存目录内的临时名，再原子重命名，读者不会看到写了一半的文件
+        staging = target.with_name(f"{target.name}.{uuid.uuid4().hex[:8]}.part")
+        shutil.move(dxf_path, staging)
+        os.replace(staging, target)
+        self._evict(keep=target)
+        return str(target)
+
+    def _evict(self, keep: Path):
+        """超出磁盘配额时删除最久未使用的文件"""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.dxf"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                # 在 pin 锁内检查并删除：已交给分析任务的 DXF 不会在检查之后被钉住又被删除
+                with self._pin_lock:
+                    if path.name.split(".", 1)[0] in self._pins:
+                        continue
+                    path.unlink(missing_ok=True)
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """命中率和占用统计"""
+        sizes = []
+        for path in self.cache_dir.glob("*.dxf"):
+            try:
+                sizes.append(path.stat().st_size)
+            except FileNotFoundError:
+                # 统计期间被淘汰
+                continue
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(sizes),
+            "size_bytes": sum(sizes),
+            "max_bytes": self.max_bytes
+        }
+
+
+# 全局转换缓存实例
+conversion_cache = ConversionCache(
+    cache_dir=settings.conversion_cache_dir,
+    max_bytes=settings.conversion_cache_max_bytes
+)
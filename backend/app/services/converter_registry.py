@@ -0,0 +1,104 @@
+"""
+DWG 转换器注册表
+记录启动时探测到的可用转换器，以及各转换器按 DWG 版本统计的成功率和耗时，
+用于为每个文件选择最可能成功的转换器
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.cad_format import DWG_VERSIONS
+
+
+@dataclass
+class ConverterProbe:
+    """转换器探测结果"""
+    available: bool
+    detail: str = ""
+
+
+@dataclass
+class ConverterStats:
+    """某转换器在某 DWG 版本上的运行统计"""
+    attempts: int = 0
+    successes: int = 0
+    total_seconds: float = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.attempts if self.attempts else 0.0
+
+    @property
+    def avg_seconds(self) -> float:
+        return self.total_seconds / self.attempts if self.attempts else 0.0
+
+    @property
+    def expected_success(self) -> float:
+        """平滑后的成功概率估计（未尝试过的转换器为 0.5）"""
+        return (self.successes + 1) / (self.attempts + 2)
+
+
+class ConverterRegistry:
+    """转换器可用性与成功率统计"""
+
+    def __init__(self):
+        self.probes: Dict[str, ConverterProbe] = {}
+        self._stats: Dict[Tuple[str, str], ConverterStats] = {}
+
+    @property
+    def probed(self) -> bool:
+        return bool(self.probes)
+
+    def set_probe(self, name: str, available: bool, detail: str = ""):
+        """记录转换器探测结果"""
+        self.probes[name] = ConverterProbe(available=available, detail=detail)
+
+    def is_available(self, name: str) -> bool:
+        probe = self.probes.get(name)
+        return probe is not None and probe.available
+
+    def record(self, name: str, dwg_version: Optional[str], success: bool, seconds: float):
+        """记录一次转换尝试"""
+        stats = self._stats.setdefault((name, dwg_version or "unknown"), ConverterStats())
+        stats.attempts += 1
+        stats.total_seconds += seconds
+        if success:
+            stats.successes += 1
+
+    def rank(self, names: List[str], dwg_version: Optional[str]) -> List[str]:
+        """
+        按该 DWG 版本上的成功概率（其次按平均耗时）排序可用转换器
+
+        Args:
+            names: 候选转换器，按默认优先级排序（成功率相同时保持该顺序）
+            dwg_version: DWG 版本标识
+        """
+        version = dwg_version or "unknown"
+        candidates = [name for name in names if self.is_available(name)]
+
+        def sort_key(item):
+            index, name = item
+            stats = self._stats.get((name, version), ConverterStats())
+            return (-stats.expected_success, stats.avg_seconds, index)
+
+        return [name for _, name in sorted(enumerate(candidates), key=sort_key)]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """探测结果和统计信息（用于 /health）"""
+        result = {}
+        for name, probe in self.probes.items():
+            versions = {}
+            for (stats_name, version), stats in self._stats.items():
+                if stats_name != name:
+                    continue
+                versions[version] = {
+                    "release": DWG_VERSIONS.get(version, version),
+                    "attempts": stats.attempts,
+                    "success_rate": round(stats.success_rate, 3),
+                    "avg_seconds": round(stats.avg_seconds, 3)
+                }
+            result[name] = {
+                "available": probe.available,
+                "detail": probe.detail,
+                "versions": versions
+            }
+        return result
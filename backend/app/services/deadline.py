@@ -0,0 +1,100 @@
+"""
+分析截止时间
+解析和检查阶段在循环中定期检查截止时间（协作式取消），超时后抛出 AnalysisTimeout；
+截止时间以墙上时钟传入工作进程，进程内换算为单调时钟。
+分析被取消时同样在检查点退出（AnalysisCancelled）。
+"""
+import time
+from typing import Callable, Optional
+
+
+# 解析阶段每遍历多少个图元检查一次截止时间
+DEADLINE_CHECK_INTERVAL = 1024
+
+
+class AnalysisTimeout(TimeoutError):
+    """分析超过截止时间"""
+
+    def __init__(self, stage: str, timeout: Optional[float] = None):
+        """
+        Args:
+            stage: 超时发生的阶段（parse / check / worker）
+            timeout: 超时时间（秒）
+        """
+        self.stage = stage
+        self.timeout = timeout
+        limit = f"（{timeout:g} 秒）" if timeout else ""
+        super().__init__(f"分析超过时间限制{limit}，超时阶段: {stage}")
+
+
+class AnalysisCancelled(AnalysisTimeout):
+    """分析被取消（与超时一样在检查点退出）"""
+
+    def __init__(self, stage: str):
+        super().__init__(stage)
+        self.args = (f"分析已取消，取消时的阶段: {stage}",)
+
+
+class Deadline:
+    """截止时间（timeout 为 None 时永不超时），可附带取消标志"""
+
+    __slots__ = ('timeout', 'expires_at', 'cancelled')
+
+    def __init__(self, timeout: Optional[float] = None, cancelled: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            timeout: 从现在起允许的秒数，None 或 0 表示不限制
+            cancelled: 返回分析是否已被取消的函数
+        """
+        self.timeout = timeout or None
+        self.expires_at = time.monotonic() + timeout if self.timeout else None
+        self.cancelled = cancelled
+
+    @classmethod
+    def at(
+        cls,
+        wall_time: Optional[float],
+        timeout: Optional[float] = None,
+        cancelled: Optional[Callable[[], bool]] = None
+    ) -> "Deadline":
+        """
+        由墙上时钟时刻（time.time()）创建截止时间，用于跨进程传递
+
+        Args:
+            wall_time: 截止时刻，None 表示不限制
+            timeout: 原始超时时间（仅用于错误信息）
+            cancelled: 返回分析是否已被取消的函数
+        """
+        deadline = cls(cancelled=cancelled)
+        if wall_time is not None:
+            deadline.timeout = timeout
+            deadline.expires_at = time.monotonic() + (wall_time - time.time())
+        return deadline
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数（不限制时为 None）"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """已超过截止时间或已被取消"""
+        if self.cancelled is not None and self.cancelled():
+            return True
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        """
+        已超过截止时间时抛出 AnalysisTimeout，已被取消时抛出 AnalysisCancelled
+
+        Args:
+            stage: 当前阶段（写入异常信息）
+        """
+        if self.cancelled is not None and self.cancelled():
+            raise AnalysisCancelled(stage)
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            raise AnalysisTimeout(stage, self.timeout)
+
+
+# 不限制时间（未传入截止时间时的默认值）
+NO_DEADLINE = Deadline()
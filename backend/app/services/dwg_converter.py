@@ -3,13 +3,29 @@ DWG 到 DXF 转换服务
 支持多种转换方式
 """
 import os
-import subprocess
+import asyncio
+import hashlib
+import logging
+import signal
 import tempfile
+import time
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Dict, Tuple, Callable, Awaitable
 import shutil
 
 from app.config import settings
+from app.services.conversion_cache import conversion_cache
+from app.services.converter_registry import ConverterRegistry
+from app.utils.cad_format import read_dwg_version
+from app.utils.file_hash import hash_file
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConverterError(Exception):
+    """外部转换器返回非零退出码"""
 
 
 class DWGConverterService:
@@ -19,15 +35,36 @@ class DWGConverterService:
         self.temp_dir = settings.temp_dir
         self.oda_converter_path = settings.oda_converter_path
         
-    async def convert_to_dxf(self, dwg_path: str) -> str:
+        # 限制同时运行的外部转换器进程数
+        self._converter_slots = asyncio.Semaphore(settings.converter_pool_size)
+        
+        # 转换器名称 -> 转换器标识（名称 + 版本）
+        self._converter_tags: Dict[str, str] = {}
+        
+        # 转换器可用性探测结果与成功率统计
+        self.registry = ConverterRegistry()
+        
+        # ODA 批处理队列：(DWG 路径, 等待结果的 Future)
+        self._oda_queue: List[Tuple[str, asyncio.Future]] = []
+        self._oda_flush_handle: Optional[asyncio.TimerHandle] = None
+        
+        # 进行中的转换：DWG 内容哈希 -> [转换任务, 等待者数量]（同一内容只转换一次）
+        self._conversions: Dict[str, list] = {}
+        
+    async def convert_to_dxf(self, dwg_path: str, content_hash: Optional[str] = None) -> str:
         """
         将 DWG 文件转换为 DXF
         
+        转换结果按 (DWG 内容哈希, 转换器名称/版本) 缓存，同一 DWG 再次分析
+        （包括按其他标准检查）时直接返回缓存的 DXF。
+        
         Args:
             dwg_path: DWG 文件路径
+            content_hash: DWG 内容 SHA-256（未提供时现场计算）
             
         Returns:
-            转换后的 DXF 文件路径
+            转换后的 DXF 文件路径（位于转换缓存中，调用方不应删除）；
+            该文件被钉住不会被淘汰，使用完毕后调用方需调用 conversion_cache.release(path)
             
         Raises:
             ValueError: 转换失败
@@ -37,34 +74,73 @@ class DWGConverterService:
         if not dwg_file.exists():
             raise ValueError(f"DWG 文件不存在: {dwg_path}")
         
-        # 尝试多种转换方法
-        dxf_path = None
-        errors = []
+        if not content_hash:
+            content_hash = await asyncio.to_thread(hash_file, dwg_file)
         
-        # 方法 1: 使用 ODA File Converter（推荐）
-        if self.oda_converter_path and os.path.exists(self.oda_converter_path):
-            try:
-                dxf_path = await self._convert_with_oda(dwg_path)
-                if dxf_path:
-                    return dxf_path
-            except Exception as e:
-                errors.append(f"ODA Converter 失败: {str(e)}")
-        
-        # 方法 2: 使用 ezdxf 的 readfile (支持部分 DWG 版本)
+        # 同一内容的并发请求（如同一文件按两个标准分析）共用一次转换，
+        # 避免各自把同一个转换结果移入缓存；全部等待者放弃时才取消转换
+        # 每个调用方在查找缓存之前钉住内容哈希，转换结果从查找/移入到分析结束都不会被淘汰
+        conversion_cache.pin(content_hash)
+        flight = self._conversions.get(content_hash)
+        if flight is None:
+            task = asyncio.ensure_future(self._convert(dwg_file, content_hash))
+            flight = self._conversions[content_hash] = [task, 0]
+            task.add_done_callback(lambda _: self._conversions.pop(content_hash, None))
+        flight[1] += 1
         try:
-            dxf_path = await self._convert_with_ezdxf(dwg_path)
-            if dxf_path:
-                return dxf_path
-        except Exception as e:
-            errors.append(f"ezdxf 直接读取失败: {str(e)}")
+            return await asyncio.shield(flight[0])
+        except asyncio.CancelledError:
+            conversion_cache.unpin(content_hash)
+            flight[1] -= 1
+            if not flight[1]:
+                flight[0].cancel()
+            raise
+        except Exception:
+            conversion_cache.unpin(content_hash)
+            raise
+    
+    async def _convert(self, dwg_file: Path, content_hash: str) -> str:
+        """查找转换缓存，未命中时按成功率依次尝试可用的转换器（参数和返回值同 convert_to_dxf）"""
+        dwg_path = str(dwg_file)
+        if not self.registry.probed:
+            await self.probe_converters()
         
-        # 方法 3: 使用 LibreDWG (如果安装了)
-        try:
-            dxf_path = await self._convert_with_libredwg(dwg_path)
+        # 只尝试探测可用的转换器，按该 DWG 版本上的历史成功率排序
+        converters = self._converters()
+        dwg_version = read_dwg_version(dwg_file)
+        ranked = self.registry.rank(list(converters), dwg_version)
+        
+        cached = await asyncio.to_thread(
+            conversion_cache.get, content_hash, [self.converter_tag(name) for name in ranked]
+        )
+        if cached:
+            logger.info("DWG 转换命中缓存: %s", dwg_file.name)
+            return cached
+        
+        errors = [
+            f"{label} 不可用: {self.registry.probes[name].detail}"
+            for name, (label, _) in converters.items()
+            if name not in ranked
+        ]
+        
+        for name in ranked:
+            label, convert = converters[name]
+            started = time.perf_counter()
+            dxf_path = None
+            # 被取消（CancelledError 不是 Exception）时直接传播，不计入转换器的成功率和耗时
+            try:
+                dxf_path = await convert(dwg_path)
+            except Exception as e:
+                errors.append(f"{label} 失败: {str(e)}")
+            elapsed = time.perf_counter() - started
+            self.registry.record(name, dwg_version, bool(dxf_path), elapsed)
+            
             if dxf_path:
-                return dxf_path
-        except Exception as e:
-            errors.append(f"LibreDWG 失败: {str(e)}")
+                logger.info("DWG 转换完成 (%s, %s): %s，耗时 %.2fs", label, dwg_version, dwg_file.name, elapsed)
+                # 移入缓存和超出配额时的淘汰都是磁盘操作，放到线程中执行
+                return await asyncio.to_thread(
+                    conversion_cache.put, content_hash, self.converter_tag(name), dxf_path
+                )
         
         # 所有方法都失败
         error_msg = "无法转换 DWG 文件。请尝试以下解决方案：\n"
@@ -75,22 +151,165 @@ class DWGConverterService:
         
         raise ValueError(error_msg)
     
+    def _converters(self) -> Dict[str, Tuple[str, Callable[[str], Awaitable[Optional[str]]]]]:
+        """全部转换方法: 名称 -> (显示名, 转换函数)，按默认优先级排序"""
+        return {
+            # 方法 1: 使用 ODA File Converter（推荐）
+            "oda": ("ODA Converter", self._convert_with_oda),
+            # 方法 2: 使用 ezdxf 的 readfile
+            "ezdxf": ("ezdxf 直接读取", self._convert_with_ezdxf),
+            # 方法 3: 使用 LibreDWG (如果安装了)
+            "libredwg": ("LibreDWG", self._convert_with_libredwg),
+        }
+    
+    async def probe_converters(self):
+        """探测各转换器是否可用（应用启动时调用），结果记录到注册表"""
+        # ODA File Converter
+        if not self.oda_converter_path:
+            self.registry.set_probe("oda", False, "未配置 ODA_CONVERTER_PATH")
+        elif not os.path.exists(self.oda_converter_path):
+            self.registry.set_probe("oda", False, f"文件不存在: {self.oda_converter_path}")
+        elif not os.access(self.oda_converter_path, os.X_OK):
+            self.registry.set_probe("oda", False, f"没有执行权限: {self.oda_converter_path}")
+        else:
+            self.registry.set_probe("oda", True, self.oda_converter_path)
+        
+        # ezdxf 只能读取 DXF，readfile 读取 DWG 必然失败，不再作为转换器尝试
+        self.registry.set_probe("ezdxf", False, "ezdxf 不支持读取 DWG 文件")
+        
+        # LibreDWG
+        dwg2dxf = shutil.which("dwg2dxf")
+        if not dwg2dxf:
+            self.registry.set_probe("libredwg", False, "未找到 dwg2dxf 命令")
+        else:
+            detail = dwg2dxf
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    dwg2dxf, "--version",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT
+                )
+                output, _ = await asyncio.wait_for(process.communicate(), 5)
+                version = output.decode('utf-8', errors='replace').strip().splitlines()
+                if version:
+                    detail = f"{dwg2dxf} ({version[0]})"
+            except Exception:
+                pass
+            self.registry.set_probe("libredwg", True, detail)
+        
+        logger.info("DWG 转换器探测结果: %s", {
+            name: probe.available for name, probe in self.registry.probes.items()
+        })
+    
+    def converter_tag(self, name: str) -> str:
+        """转换器标识（名称 + 版本），作为转换缓存键的一部分"""
+        if name not in self._converter_tags:
+            if name == "ezdxf":
+                import ezdxf
+                version = ezdxf.__version__
+            else:
+                # 外部程序没有统一的版本查询方式，以可执行文件的路径、大小和修改时间作为版本指纹
+                exe = self.oda_converter_path if name == "oda" else shutil.which("dwg2dxf")
+                try:
+                    stat = Path(exe).stat()
+                    fingerprint = f"{exe}|{stat.st_size}|{stat.st_mtime_ns}"
+                    version = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:8]
+                except (TypeError, OSError):
+                    version = "none"
+            self._converter_tags[name] = f"{name}-{version}"
+        return self._converter_tags[name]
+    
+    def _output_path(self, dwg_file: Path) -> Path:
+        """转换输出的临时路径（每次转换唯一，避免并发任务互相覆盖）"""
+        return self.temp_dir / f"{dwg_file.stem}_{uuid.uuid4().hex[:8]}.dxf"
+    
     async def _convert_with_oda(self, dwg_path: str) -> Optional[str]:
         """
         使用 ODA File Converter 转换
         
         ODA File Converter 是 Autodesk 官方推荐的 DWG/DXF 转换工具
         下载地址: https://www.opendesign.com/guestfiles/oda_file_converter
+        
+        请求先进入批处理队列，在 oda_batch_window 时间窗口内到达的多个 DWG
+        共用一次 ODA 调用。
         """
-        dwg_file = Path(dwg_path)
-        output_dir = self.temp_dir / f"oda_{dwg_file.stem}"
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._oda_queue.append((dwg_path, future))
+        
+        if len(self._oda_queue) >= settings.oda_batch_size:
+            self._flush_oda_queue()
+        elif self._oda_flush_handle is None:
+            self._oda_flush_handle = loop.call_later(settings.oda_batch_window, self._flush_oda_queue)
+        
+        return await future
+    
+    def _flush_oda_queue(self):
+        """取出当前队列中的全部请求，作为一个批次执行"""
+        if self._oda_flush_handle is not None:
+            self._oda_flush_handle.cancel()
+            self._oda_flush_handle = None
+        batch, self._oda_queue = self._oda_queue, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run_oda_batch(batch))
+    
+    async def _run_oda_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """执行一个批次并将结果分发给各个等待者"""
+        task = asyncio.ensure_future(self.convert_batch_with_oda([dwg_path for dwg_path, _ in batch]))
+        
+        # 批次内所有分析都已放弃时，终止转换进程
+        def _on_waiter_done(_):
+            if all(future.cancelled() for _, future in batch):
+                task.cancel()
+        
+        for _, future in batch:
+            future.add_done_callback(_on_waiter_done)
+        
+        try:
+            results = await task
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for dwg_path, future in batch:
+            if not future.done():
+                future.set_result(results.get(dwg_path))
+    
+    async def convert_batch_with_oda(self, dwg_paths: List[str]) -> Dict[str, Optional[str]]:
+        """
+        一次 ODA 调用转换多个 DWG 文件
+        
+        待转换文件被链接（或复制）到私有暂存目录，ODA 只处理本批次请求的文件，
+        耗时与上传目录中已有文件的数量无关。
+        
+        Args:
+            dwg_paths: DWG 文件路径列表
+            
+        Returns:
+            DWG 路径 -> 转换后的 DXF 路径（转换失败为 None）
+        """
+        work_dir = self.temp_dir / f"oda_{uuid.uuid4().hex}"
+        input_dir = work_dir / "input"
+        output_dir = work_dir / "output"
+        input_dir.mkdir(parents=True, exist_ok=True)
         output_dir.mkdir(parents=True, exist_ok=True)
         
+        # 暂存文件名 -> 原始路径（同一文件重复请求只转换一次）
+        staged = {}
+        for dwg_path in dict.fromkeys(dwg_paths):
+            staged_name = f"{len(staged)}_{Path(dwg_path).stem}"
+            self._stage_file(Path(dwg_path), input_dir / f"{staged_name}.dwg")
+            staged[staged_name] = dwg_path
+        
         # ODA File Converter 命令行参数
         # 格式: ODAFileConverter <input_folder> <output_folder> <output_version> <output_format> <recursive> <audit>
         cmd = [
             self.oda_converter_path,
-            str(dwg_file.parent),  # 输入文件夹
+            str(input_dir),         # 输入文件夹（仅包含本批次文件）
             str(output_dir),        # 输出文件夹
             "ACAD2018",             # 输出版本 (AutoCAD 2018 DXF)
             "DXF",                  # 输出格式
@@ -98,35 +317,42 @@ class DWGConverterService:
             "1"                     # 执行审计
         ]
         
+        results = {}
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                check=True
-            )
+            await self._run_converter("ODA", cmd, settings.converter_timeout * len(staged))
             
             # 查找生成的 DXF 文件
-            dxf_file = output_dir / f"{dwg_file.stem}.dxf"
-            if dxf_file.exists():
-                # 移动到上传目录
-                final_path = settings.upload_dir / f"{dwg_file.stem}_converted.dxf"
-                shutil.move(str(dxf_file), str(final_path))
-                return str(final_path)
+            for staged_name, dwg_path in staged.items():
+                dxf_file = output_dir / f"{staged_name}.dxf"
+                if dxf_file.exists():
+                    # 移出暂存目录（暂存目录随后会被删除）
+                    final_path = self._output_path(Path(dwg_path))
+                    shutil.move(str(dxf_file), str(final_path))
+                    results[dwg_path] = str(final_path)
+                else:
+                    results[dwg_path] = None
             
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             raise ValueError("ODA 转换超时")
-        except subprocess.CalledProcessError as e:
-            raise ValueError(f"ODA 转换失败: {e.stderr}")
+        except ConverterError as e:
+            raise ValueError(f"ODA 转换失败: {e}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             raise ValueError(f"ODA 转换错误: {str(e)}")
         finally:
-            # 清理临时目录
-            if output_dir.exists():
-                shutil.rmtree(output_dir, ignore_errors=True)
+            # 清理暂存目录
+            shutil.rmtree(work_dir, ignore_errors=True)
         
-        return None
+        return results
+    
+    @staticmethod
+    def _stage_file(source: Path, target: Path):
+        """将文件硬链接到暂存目录，跨文件系统时退回复制"""
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
     
     async def _convert_with_ezdxf(self, dwg_path: str) -> Optional[str]:
         """
@@ -143,7 +369,7 @@ class DWGConverterService:
             doc = ezdxf.readfile(dwg_path)
             
             # 转换为 DXF
-            dxf_path = settings.upload_dir / f"{dwg_file.stem}_converted.dxf"
+            dxf_path = self._output_path(dwg_file)
             doc.saveas(str(dxf_path))
             
             return str(dxf_path)
@@ -162,19 +388,13 @@ class DWGConverterService:
         安装: pip install libredwg (需要系统依赖)
         """
         dwg_file = Path(dwg_path)
-        dxf_path = settings.upload_dir / f"{dwg_file.stem}_converted.dxf"
+        dxf_path = self._output_path(dwg_file)
         
         # 使用 dwg2dxf 命令行工具
         cmd = ["dwg2dxf", "-y", "-o", str(dxf_path), str(dwg_path)]
         
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                check=True
-            )
+            await self._run_converter("LibreDWG", cmd, settings.converter_timeout)
             
             if dxf_path.exists():
                 return str(dxf_path)
@@ -182,13 +402,87 @@ class DWGConverterService:
         except FileNotFoundError:
             # LibreDWG 未安装
             return None
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             raise ValueError("LibreDWG 转换超时")
-        except subprocess.CalledProcessError as e:
-            raise ValueError(f"LibreDWG 转换失败: {e.stderr}")
+        except ConverterError as e:
+            raise ValueError(f"LibreDWG 转换失败: {e}")
         
         return None
     
+    async def _run_converter(self, name: str, cmd: List[str], timeout: float) -> float:
+        """
+        以异步子进程运行外部转换器
+        
+        受转换器池信号量限制并发数；stdout/stderr 逐行写入日志；
+        超时或调用方取消时终止子进程。
+        
+        Args:
+            name: 转换器名称（用于日志）
+            cmd: 命令行
+            timeout: 超时时间（秒）
+            
+        Returns:
+            子进程运行耗时（秒）
+            
+        Raises:
+            FileNotFoundError: 转换器程序不存在
+            asyncio.TimeoutError: 转换超时
+            ConverterError: 转换器返回非零退出码
+        """
+        async with self._converter_slots:
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                # 独立进程组，终止时连同转换器派生的子进程一起结束
+                start_new_session=(os.name == "posix")
+            )
+            stderr_tail: List[str] = []
+            
+            async def _pump(stream, level, tail=None):
+                async for raw in stream:
+                    line = raw.decode('utf-8', errors='replace').rstrip()
+                    if not line:
+                        continue
+                    logger.log(level, "[%s] %s", name, line)
+                    if tail is not None:
+                        tail.append(line)
+                        del tail[:-20]
+            
+            pumps = asyncio.gather(
+                _pump(process.stdout, logging.INFO),
+                _pump(process.stderr, logging.WARNING, stderr_tail)
+            )
+            try:
+                await asyncio.wait_for(process.wait(), timeout)
+                await pumps
+            except BaseException:
+                # 超时或分析被放弃：终止转换进程
+                self._kill_process(process)
+                await process.wait()
+                pumps.cancel()
+                await asyncio.gather(pumps, return_exceptions=True)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                logger.info("[%s] 进程退出 (returncode=%s)，耗时 %.2fs", name, process.returncode, elapsed)
+            
+            if process.returncode != 0:
+                raise ConverterError("\n".join(stderr_tail) or f"退出码 {process.returncode}")
+            return elapsed
+    
+    @staticmethod
+    def _kill_process(process: asyncio.subprocess.Process):
+        """终止转换器进程（POSIX 下终止整个进程组）"""
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+    
     def cleanup_temp_files(self):
         """清理临时文件"""
         if self.temp_dir.exists():
@@ -1,56 +1,241 @@
 """
 DXF 文件解析服务
 """
+import asyncio
+import os
 import ezdxf
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Callable, Optional
+
+from app.config import settings
+from app.services.block_expander import BlockExpander, DocumentBlocks
+from app.services.deadline import AnalysisTimeout, Deadline, DEADLINE_CHECK_INTERVAL, NO_DEADLINE
+from app.services.dxf_stream import DXFStreamReader, can_stream
+from app.services.entity_table import EntityTableBuilder
+from app.services.parse_cache import ParseCache, parse_cache
+from app.services.parse_projection import ParseProjection, FULL_PROJECTION
+
+
+NAN = float("nan")
+
+# 几何相关的列（任一需要时提取图元的全部几何信息）
+GEOMETRY_COLUMNS = frozenset({"x0", "y0", "x1", "y1", "size"})
+
+# 解析器版本：输出结构或提取逻辑变化时递增，旧版本的解析缓存随之失效
+PARSER_VERSION = 2
+
+
+def parser_tag(max_block_depth: int) -> str:
+    """解析器版本标识（解析结果还取决于块参照展开层数）"""
+    return f"parser-v{PARSER_VERSION}.blocks{max_block_depth}"
+
+
+PARSER_TAG = parser_tag(settings.max_block_depth)
 
 
 class DXFParserService:
     """DXF 文件解析器"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        streaming_threshold: Optional[int] = None,
+        cache: Optional[ParseCache] = None,
+        max_block_depth: Optional[int] = None
+    ):
+        """
+        Args:
+            streaming_threshold: 文件大小（字节）达到该值时流式解析，None 使用配置，0 表示不使用
+            cache: 解析结果缓存，None 使用全局缓存
+            max_block_depth: 块参照最多展开的嵌套层数，None 使用配置，0 表示不展开
+        """
         self.doc = None
         self.modelspace = None
+        self.streaming_threshold = (
+            settings.streaming_parse_threshold if streaming_threshold is None else streaming_threshold
+        )
+        self.cache = parse_cache if cache is None else cache
+        self.max_block_depth = settings.max_block_depth if max_block_depth is None else max_block_depth
+        self.cache_tag = parser_tag(self.max_block_depth)
+        self._projection = FULL_PROJECTION
+        self._with_geometry = True
+        self._expander: Optional[BlockExpander] = None
         
-    async def parse(self, file_path: str) -> Dict[str, Any]:
+    async def parse(self, file_path: str, projection: ParseProjection = FULL_PROJECTION) -> Dict[str, Any]:
         """
-        解析 DXF 文件
+        解析 DXF 文件（在线程中执行 parse_sync，不阻塞事件循环）
         
         Args:
             file_path: DXF 文件路径
+            projection: 需要提取的数据（默认全部）
             
         Returns:
             解析后的数据结构
         """
+        return await asyncio.to_thread(self.parse_sync, file_path, projection)
+    
+    def parse_sync(
+        self,
+        file_path: str,
+        projection: ParseProjection = FULL_PROJECTION,
+        deadline: Deadline = NO_DEADLINE,
+        progress: Optional[Callable[[int, int], None]] = None,
+        content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        同步解析 DXF 文件（CPU 密集，供工作进程池直接调用）
+        
+        文件达到 streaming_threshold 且投影只需要逐图元数据（projection.streamable）时
+        改为流式解析（见 parse_streaming），结果结构相同。
+        给出 content_hash 且启用了解析缓存时先查找缓存（见 _parse_cached）。
+        
+        Args:
+            file_path: DXF 文件路径
+            projection: 需要提取的数据；未包含的图元类型、列和数据段不提取（对应字段为空）
+            deadline: 截止时间，遍历图元时定期检查
+            progress: 解析进度回调 (已遍历图元数, 图元总数)
+            content_hash: DXF 内容 SHA-256
+            
+        Returns:
+            解析后的数据结构
+            
+        Raises:
+            AnalysisTimeout: 超过截止时间
+        """
+        if content_hash and self.cache.enabled:
+            return self._parse_cached(file_path, content_hash, projection, deadline, progress)
+        if self.use_streaming(file_path, projection):
+            return self.parse_streaming(file_path, projection, deadline, progress)
         try:
             # 读取 DXF 文件
             self.doc = ezdxf.readfile(file_path)
             self.modelspace = self.doc.modelspace()
+            deadline.check("parse")
+            
+            # 单次遍历模型空间，一次性提取图元、尺寸、文字和计数
+            sections = self._walk_modelspace(
+                self.modelspace, len(self.modelspace), projection, deadline, progress,
+                DocumentBlocks(self.doc)
+            )
+            deadline.check("parse")
             
             # 提取关键信息
             data = {
                 "filename": Path(file_path).name,
                 "version": self.doc.dxfversion,
-                "layers": self._extract_layers(),
-                "entities": self._extract_entities(),
-                "dimensions": self._extract_dimensions(),
-                "texts": self._extract_texts(),
-                "blocks": self._extract_blocks(),
-                "metadata": self._extract_metadata()
+                "layers": self._extract_layers(self.doc.layers) if projection.wants("layers") else [],
+                "entities": sections["entities"],
+                "dimensions": sections["dimensions"],
+                "texts": sections["texts"],
+                "blocks": self._extract_blocks() if projection.wants("blocks") else [],
+                "metadata": self._extract_metadata(
+                    self.doc.dxfversion, self.doc.header, len(self.doc.layers), sections["entity_count"]
+                )
             }
             
             return data
             
+        except AnalysisTimeout:
+            raise
         except ezdxf.DXFError as e:
             raise ValueError(f"DXF 文件解析失败: {str(e)}")
         except Exception as e:
             raise ValueError(f"文件处理错误: {str(e)}")
     
-    def _extract_layers(self) -> List[Dict[str, Any]]:
+    def _parse_cached(
+        self,
+        file_path: str,
+        content_hash: str,
+        projection: ParseProjection,
+        deadline: Deadline,
+        progress: Optional[Callable[[int, int], None]]
+    ) -> Dict[str, Any]:
+        """
+        经解析缓存解析
+        
+        缓存中同一内容、同一解析器版本的结果包含投影所需的全部数据时直接读取（图元表内存映射，不经过 ezdxf）；
+        否则解析后写入缓存。已有缓存不满足投影时按两者的并集重新解析，
+        替换后的缓存对之前和本次的规则都能命中。
+        """
+        entry = self.cache.get(content_hash, self.cache_tag)
+        if entry is not None:
+            if entry.projection.covers(projection):
+                data = entry.data
+                data["filename"] = Path(file_path).name
+                if progress is not None:
+                    count = data["metadata"]["entity_count"]
+                    progress(count, count)
+                return data
+            projection = projection.union(entry.projection)
+        
+        data = self.parse_sync(file_path, projection, deadline, progress)
+        self.cache.put(content_hash, self.cache_tag, projection, data)
+        return data
+    
+    def use_streaming(self, file_path: str, projection: ParseProjection = FULL_PROJECTION) -> bool:
+        """是否对该文件流式解析：达到大小阈值、投影只需要逐图元数据且为 ASCII DXF"""
+        if not self.streaming_threshold or not projection.streamable:
+            return False
+        try:
+            return os.path.getsize(file_path) >= self.streaming_threshold and can_stream(file_path)
+        except OSError:
+            return False
+    
+    def parse_streaming(
+        self,
+        file_path: str,
+        projection: ParseProjection = FULL_PROJECTION,
+        deadline: Deadline = NO_DEADLINE,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        流式解析 DXF 文件（低内存模式）
+        
+        不构建 ezdxf 文档：顺序读取文件，模型空间图元逐个写入列式表后即释放，
+        峰值内存只与可被 INSERT 引用的块定义相关。不提供块名列表（blocks 为空），图元总数按已读取字节估算。
+        
+        Args:
+            参数同 parse_sync
+            
+        Returns:
+            解析后的数据结构
+            
+        Raises:
+            AnalysisTimeout: 超过截止时间
+        """
+        reader = DXFStreamReader(file_path)
+        if progress is not None:
+            report = progress
+            progress = lambda count, total: report(count, reader.estimate_total(count))
+        try:
+            sections = self._walk_modelspace(
+                reader.modelspace(), 0, projection, deadline, progress, reader.blocks
+            )
+            deadline.check("parse")
+            
+            return {
+                "filename": Path(file_path).name,
+                "version": reader.dxfversion,
+                "layers": self._extract_layers(reader.layers) if projection.wants("layers") else [],
+                "entities": sections["entities"],
+                "dimensions": sections["dimensions"],
+                "texts": sections["texts"],
+                "blocks": [],
+                "metadata": self._extract_metadata(
+                    reader.dxfversion, reader.header, len(reader.layers), sections["entity_count"]
+                )
+            }
+        
+        except AnalysisTimeout:
+            raise
+        except ezdxf.DXFError as e:
+            raise ValueError(f"DXF 文件解析失败: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"文件处理错误: {str(e)}")
+    
+    def _extract_layers(self, layer_entities: Iterable) -> List[Dict[str, Any]]:
         """提取图层信息"""
         layers = []
-        for layer in self.doc.layers:
+        for layer in layer_entities:
             layers.append({
                 "name": layer.dxf.name,
                 "color": layer.dxf.color,
@@ -61,159 +246,285 @@ class DXFParserService:
             })
         return layers
     
-    def _extract_entities(self) -> Dict[str, List[Dict[str, Any]]]:
-        """提取所有图元信息"""
-        entities = {
-            "LINE": [],
-            "CIRCLE": [],
-            "ARC": [],
-            "POLYLINE": [],
-            "TEXT": [],
-            "MTEXT": [],
-            "DIMENSION": [],
-            "OTHER": []
+    def _walk_modelspace(
+        self,
+        modelspace: Iterable,
+        total: int,
+        projection: ParseProjection = FULL_PROJECTION,
+        deadline: Deadline = NO_DEADLINE,
+        progress: Optional[Callable[[int, int], None]] = None,
+        blocks=None
+    ) -> Dict[str, Any]:
+        """
+        单次遍历模型空间，按图元类型分派到对应的提取器
+
+        一次遍历同时填充 entities / dimensions / texts 以及实体计数，
+        避免对大图纸多次遍历模型空间。图元写入列式表（EntityTable），
+        不再为每个图元构建字典。投影中不需要的图元类型只计数、不提取。
+        每遍历 DEADLINE_CHECK_INTERVAL 个图元检查一次截止时间并上报进度。
+        
+        投影包含 inserts 时展开块参照：块内图元（及块参照的属性 ATTRIB）以块参照的句柄写入列式表，
+        文字同时写入 texts。
+        
+        Args:
+            modelspace: 模型空间图元（ezdxf 文档的模型空间或流式读取的图元）
+            total: 图元总数（只用于上报进度）
+            blocks: 按块名返回块定义的对象（get(name)）
+        """
+        self._projection = projection
+        self._with_geometry = not GEOMETRY_COLUMNS.isdisjoint(projection.columns)
+        self._expander = None
+        if blocks is not None and self.max_block_depth > 0 and projection.wants("inserts"):
+            self._expander = BlockExpander(blocks, self.max_block_depth)
+        sections = {
+            "entities": EntityTableBuilder(),
+            "dimensions": [],
+            "texts": [],
+            "entity_count": 0
         }
         
-        for entity in self.modelspace:
+        wants_type = projection.wants_type
+        skip = self._visit_skipped
+        visitors = {
+            "LINE": self._visit_line if wants_type("LINE") else skip,
+            "CIRCLE": self._visit_circle if wants_type("CIRCLE") else skip,
+            "DIMENSION": self._visit_dimension
+            if wants_type("DIMENSION") or projection.wants("dimensions") else skip
+        }
+        for text_type in ("TEXT", "MTEXT"):
+            visitors[text_type] = self._visit_text \
+                if wants_type(text_type) or projection.wants("texts") else skip
+        visit_other = self._visit_other if wants_type("OTHER") else skip
+        if self._expander is not None:
+            visitors["INSERT"] = self._visit_insert
+        
+        count = 0
+        for entity in modelspace:
+            count += 1
+            if not count % DEADLINE_CHECK_INTERVAL:
+                deadline.check("parse")
+                if progress is not None:
+                    progress(count, total)
             entity_type = entity.dxftype()
-            entity_data = {
-                "handle": entity.dxf.handle,
-                "layer": entity.dxf.layer,
-                "color": entity.dxf.color,
-                "linetype": entity.dxf.linetype,
-                "lineweight": getattr(entity.dxf, 'lineweight', -1)
-            }
+            visitors.get(entity_type, visit_other)(entity, entity_type, sections)
+        
+        sections["entities"] = sections["entities"].build()
+        sections["entity_count"] = count
+        return sections
+    
+    def _add_entity(self, sections: Dict[str, Any], entity, entity_type: str, **geometry):
+        """将图元的公共属性和几何信息写入列式表（投影中不需要的列写入缺省值）"""
+        dxf = entity.dxf
+        columns = self._projection.columns
+        sections["entities"].add(
+            entity_type,
+            dxf.handle if "handle" in columns else None,
+            dxf.layer if "layer_id" in columns else "",
+            dxf.color if "color" in columns else 256,
+            dxf.linetype if "linetype_id" in columns else "",
+            getattr(dxf, 'lineweight', -1) if "lineweight" in columns else -1,
+            **geometry
+        )
+    
+    def _visit_skipped(self, entity, entity_type: str, sections: Dict[str, Any]):
+        """投影中不需要的图元：只计数"""
+    
+    def _visit_line(self, entity, entity_type: str, sections: Dict[str, Any]):
+        """提取 LINE 图元"""
+        if not self._with_geometry:
+            self._add_entity(sections, entity, "LINE")
+            return
+        start = entity.dxf.start
+        end = entity.dxf.end
+        self._add_entity(sections, entity, "LINE", x0=start.x, y0=start.y, x1=end.x, y1=end.y)
+    
+    def _visit_circle(self, entity, entity_type: str, sections: Dict[str, Any]):
+        """提取 CIRCLE 图元"""
+        if not self._with_geometry:
+            self._add_entity(sections, entity, "CIRCLE")
+            return
+        center = entity.dxf.center
+        self._add_entity(sections, entity, "CIRCLE", x0=center.x, y0=center.y, size=entity.dxf.radius)
+    
+    def _visit_text(self, entity, entity_type: str, sections: Dict[str, Any]):
+        """提取 TEXT / MTEXT 图元，同时填充 entities 和 texts 两个输出段"""
+        projection = self._projection
+        in_table = projection.wants_type(entity_type)
+        in_texts = projection.wants("texts")
+        # 文字内容（MTEXT 需要解码）和字高/插入点只在用到时读取
+        wants_content = in_texts or (in_table and projection.wants_column("text_id"))
+        wants_geometry = in_texts or (in_table and self._with_geometry)
+        
+        dxf = entity.dxf
+        text_content = None
+        if wants_content:
+            text_content = dxf.text if entity_type == "TEXT" else entity.text
+        if not wants_geometry:
+            self._add_entity(sections, entity, entity_type, text=text_content)
+            return
+        
+        # TEXT 和 MTEXT 的高度属性不同
+        if entity_type == "TEXT":
+            height = dxf.height
+        else:  # MTEXT
+            height = getattr(dxf, 'char_height', 2.5)
+        insert = dxf.insert
+        position = (insert.x, insert.y)
+        
+        if in_table:
+            self._add_entity(
+                sections, entity, entity_type,
+                x0=insert.x, y0=insert.y, size=height, text=text_content
+            )
+        
+        if not in_texts:
+            return
+        sections["texts"].append({
+            "handle": dxf.handle,
+            "type": entity_type,
+            "layer": dxf.layer,
+            "text": text_content,
+            "height": height,
+            "position": position,
+            "rotation": getattr(dxf, 'rotation', 0),
+            "style": getattr(dxf, 'style', 'Standard'),
+            "color": dxf.color,
+            "linetype": dxf.linetype,
+            "lineweight": getattr(dxf, 'lineweight', -1)
+        })
+    
+    def _visit_dimension(self, dim, entity_type: str, sections: Dict[str, Any]):
+        """提取尺寸标注，同时填充 entities 和 dimensions 两个输出段"""
+        projection = self._projection
+        if projection.wants_type("DIMENSION"):
+            self._add_entity(sections, dim, "DIMENSION")
+        if not projection.wants("dimensions"):
+            return
+        
+        dxf = dim.dxf
+        dim_data = {
+            "handle": dxf.handle,
+            "layer": dxf.layer,
+            "dimtype": entity_type,
+            "text_override": getattr(dxf, 'text', ''),
+            "text_height": getattr(dxf, 'dimtxt', 0),
+            "arrow_size": getattr(dxf, 'dimasz', 0),
+            "color": dxf.color
+        }
+        
+        # 提取更详细的尺寸信息（get_measurement 开销较大，仅在规则需要时调用）
+        if not projection.wants("dimensions.measurement"):
+            sections["dimensions"].append(dim_data)
+            return
+        try:
+            measurement = dim.get_measurement()
+            dim_data["measurement"] = measurement
             
-            # 根据类型提取特定信息
-            if entity_type == "LINE":
-                entity_data.update({
-                    "start": (entity.dxf.start.x, entity.dxf.start.y),
-                    "end": (entity.dxf.end.x, entity.dxf.end.y)
-                })
-                entities["LINE"].append(entity_data)
-                
-            elif entity_type == "CIRCLE":
-                entity_data.update({
-                    "center": (entity.dxf.center.x, entity.dxf.center.y),
-                    "radius": entity.dxf.radius
-                })
-                entities["CIRCLE"].append(entity_data)
-                
-            elif entity_type in ["TEXT", "MTEXT"]:
-                # TEXT 和 MTEXT 的高度属性不同
-                if entity_type == "TEXT":
-                    height = entity.dxf.height
-                    text_content = entity.dxf.text
-                else:  # MTEXT
-                    height = getattr(entity.dxf, 'char_height', 2.5)
-                    text_content = entity.text
-                
-                entity_data.update({
-                    "text": text_content,
-                    "height": height,
-                    "position": (entity.dxf.insert.x, entity.dxf.insert.y)
-                })
-                entities["TEXT" if entity_type == "TEXT" else "MTEXT"].append(entity_data)
-                
-            elif entity_type.startswith("DIMENSION"):
-                entities["DIMENSION"].append(entity_data)
-                
-            else:
-                entities["OTHER"].append(entity_data)
-        
-        return entities
-    
-    def _extract_dimensions(self) -> List[Dict[str, Any]]:
-        """提取尺寸标注信息"""
-        dimensions = []
-        
-        for dim in self.modelspace.query('DIMENSION'):
-            dim_data = {
-                "handle": dim.dxf.handle,
-                "layer": dim.dxf.layer,
-                "dimtype": dim.dxftype(),
-                "text_override": getattr(dim.dxf, 'text', ''),
-                "text_height": getattr(dim.dxf, 'dimtxt', 0),
-                "arrow_size": getattr(dim.dxf, 'dimasz', 0),
-                "color": dim.dxf.color
-            }
+            # 提取尺寸线位置
+            if hasattr(dxf, 'defpoint'):
+                dim_data["defpoint"] = (dxf.defpoint.x, dxf.defpoint.y)
+            if hasattr(dxf, 'defpoint2'):
+                dim_data["defpoint2"] = (dxf.defpoint2.x, dxf.defpoint2.y)
+            if hasattr(dxf, 'defpoint3'):
+                dim_data["defpoint3"] = (dxf.defpoint3.x, dxf.defpoint3.y)
             
-            # 提取更详细的尺寸信息
-            try:
-                measurement = dim.get_measurement()
-                dim_data["measurement"] = measurement
-                
-                # 提取尺寸线位置
-                if hasattr(dim.dxf, 'defpoint'):
-                    dim_data["defpoint"] = (dim.dxf.defpoint.x, dim.dxf.defpoint.y)
-                if hasattr(dim.dxf, 'defpoint2'):
-                    dim_data["defpoint2"] = (dim.dxf.defpoint2.x, dim.dxf.defpoint2.y)
-                if hasattr(dim.dxf, 'defpoint3'):
-                    dim_data["defpoint3"] = (dim.dxf.defpoint3.x, dim.dxf.defpoint3.y)
-                
-                # 提取尺寸文字位置
-                if hasattr(dim.dxf, 'text_midpoint'):
-                    dim_data["text_position"] = (dim.dxf.text_midpoint.x, dim.dxf.text_midpoint.y)
-                
-                # 获取实际显示的文字内容
-                dim_text = dim.dxf.text if dim.dxf.text else f"{measurement:.2f}"
-                dim_data["display_text"] = dim_text
-                
-            except Exception as e:
-                # 如果获取失败，记录错误但不中断
-                dim_data["parse_error"] = str(e)
+            # 提取尺寸文字位置
+            if hasattr(dxf, 'text_midpoint'):
+                dim_data["text_position"] = (dxf.text_midpoint.x, dxf.text_midpoint.y)
             
-            dimensions.append(dim_data)
-        
-        return dimensions
-    
-    def _extract_texts(self) -> List[Dict[str, Any]]:
-        """提取所有文字信息"""
-        texts = []
-        
-        for text_entity in self.modelspace.query('TEXT MTEXT'):
-            # TEXT 和 MTEXT 的高度属性不同
-            entity_type = text_entity.dxftype()
-            if entity_type == "TEXT":
-                height = text_entity.dxf.height
-                text_content = text_entity.dxf.text
-                position = (text_entity.dxf.insert.x, text_entity.dxf.insert.y)
-                rotation = getattr(text_entity.dxf, 'rotation', 0)
-            else:  # MTEXT
-                height = getattr(text_entity.dxf, 'char_height', 2.5)
-                text_content = text_entity.text
-                position = (text_entity.dxf.insert.x, text_entity.dxf.insert.y)
-                rotation = getattr(text_entity.dxf, 'rotation', 0)
+            # 获取实际显示的文字内容
+            dim_text = dxf.text if dxf.text else f"{measurement:.2f}"
+            dim_data["display_text"] = dim_text
             
-            text_data = {
-                "handle": text_entity.dxf.handle,
-                "type": entity_type,
-                "layer": text_entity.dxf.layer,
-                "text": text_content,
-                "height": height,
-                "position": position,
-                "rotation": rotation,
-                "style": getattr(text_entity.dxf, 'style', 'Standard'),
-                "color": text_entity.dxf.color,
-                "linetype": text_entity.dxf.linetype,
-                "lineweight": getattr(text_entity.dxf, 'lineweight', -1)
-            }
-            texts.append(text_data)
+        except Exception as e:
+            # 如果获取失败，记录错误但不中断
+            dim_data["parse_error"] = str(e)
         
-        return texts
+        sections["dimensions"].append(dim_data)
+    
+    def _visit_other(self, entity, entity_type: str, sections: Dict[str, Any]):
+        """未单独处理的图元类型"""
+        self._add_entity(sections, entity, "OTHER")
+    
+    def _visit_insert(self, insert, entity_type: str, sections: Dict[str, Any]):
+        """块参照：本身记为 OTHER，块内图元和属性（ATTRIB）以块参照的句柄写入"""
+        if self._projection.wants_type("OTHER"):
+            self._add_entity(sections, insert, "OTHER")
+        handle = insert.dxf.handle
+        for row in self._expander.expand(insert):
+            self._add_block_row(sections, handle, row)
+        for attrib in insert.attribs:
+            dxf = attrib.dxf
+            insert_point = dxf.insert
+            self._add_block_row(sections, handle, {
+                "type": "TEXT",
+                "block": insert.dxf.name,
+                "layer": dxf.layer,
+                "color": dxf.color,
+                "linetype": dxf.linetype,
+                "lineweight": getattr(dxf, 'lineweight', -1),
+                "text": dxf.text,
+                "style": getattr(dxf, 'style', 'Standard'),
+                "rotation": getattr(dxf, 'rotation', 0),
+                "x0": insert_point.x,
+                "y0": insert_point.y,
+                "x1": NAN,
+                "y1": NAN,
+                "size": dxf.height
+            })
+    
+    def _add_block_row(self, sections: Dict[str, Any], handle: str, row: Dict[str, Any]):
+        """将展开的块内图元写入列式表（投影中不需要的列写入缺省值），文字同时写入 texts"""
+        projection = self._projection
+        entity_type = row["type"]
+        if projection.wants_type(entity_type):
+            columns = projection.columns
+            geometry = {}
+            if self._with_geometry:
+                geometry = dict(x0=row["x0"], y0=row["y0"], x1=row["x1"], y1=row["y1"], size=row["size"])
+            sections["entities"].add(
+                entity_type,
+                handle if "handle" in columns else None,
+                row["layer"] if "layer_id" in columns else "",
+                row["color"] if "color" in columns else 256,
+                row["linetype"] if "linetype_id" in columns else "",
+                row["lineweight"] if "lineweight" in columns else -1,
+                text=row["text"] if "text_id" in columns else None,
+                **geometry
+            )
+        if entity_type not in ("TEXT", "MTEXT") or not projection.wants("texts"):
+            return
+        sections["texts"].append({
+            "handle": handle,
+            "type": entity_type,
+            "layer": row["layer"],
+            "text": row["text"],
+            "height": row["size"],
+            "position": (row["x0"], row["y0"]),
+            "rotation": row["rotation"],
+            "style": row["style"],
+            "color": row["color"],
+            "linetype": row["linetype"],
+            "lineweight": row["lineweight"],
+            "block": row["block"]
+        })
     
     def _extract_blocks(self) -> List[str]:
         """提取块定义信息"""
         return [block.name for block in self.doc.blocks if not block.name.startswith('*')]
     
-    def _extract_metadata(self) -> Dict[str, Any]:
-        """提取文件元数据"""
-        header = self.doc.header
+    def _extract_metadata(self, dxf_version: str, header, layer_count: int, entity_count: int) -> Dict[str, Any]:
+        """
+        提取文件元数据（实体计数由单次遍历提供）
+        
+        Args:
+            header: 头变量映射（ezdxf 文档的 header 或流式读取的头变量字典）
+        """
         metadata = {
-            "dxf_version": self.doc.dxfversion,
-            "units": getattr(header, '$INSUNITS', 0),
-            "layer_count": len(list(self.doc.layers)),
-            "entity_count": len(list(self.modelspace))
+            "dxf_version": dxf_version,
+            "units": header.get('$INSUNITS', 0),
+            "layer_count": layer_count,
+            "entity_count": entity_count
         }
         
         # 提取图纸范围
@@ -0,0 +1,152 @@
+"""
+流式 DXF 读取
+单次顺序读取 ASCII DXF 文件：记录 HEADER 中用到的变量和 LAYER 表，BLOCKS 段只保留可被 INSERT 引用的块定义
+（尺寸、表格等匿名块和布局块跳过），ENTITIES 段中的模型空间图元逐个构建后交给调用方，
+读完 ENTITIES 段即停止（不读取 OBJECTS 段）。
+内存占用只与单个图元和块定义相关，而 ezdxf.readfile 会把整个文档保留在内存中。
+"""
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from ezdxf.entities import factory
+from ezdxf.entities.subentity import entity_linker
+from ezdxf.filemanagement import dxf_file_info
+from ezdxf.lldxf.extendedtags import ExtendedTags
+from ezdxf.lldxf.tagger import ascii_tags_loader, tag_compiler
+from ezdxf.lldxf.validator import is_binary_dxf_file
+
+from app.services.block_expander import BlockDefinition
+
+
+# 需要记录的 HEADER 变量
+HEADER_VARS = frozenset({"$ACADVER", "$INSUNITS", "$EXTMIN", "$EXTMAX"})
+
+
+def _insertable(block_name: str) -> bool:
+    """块能否被 INSERT 引用：普通块和动态块的匿名块 *U"""
+    return not block_name.startswith("*") or block_name[1:2].upper() == "U"
+
+
+def can_stream(file_path: str) -> bool:
+    """文件能否流式读取（只支持 ASCII DXF）"""
+    return not is_binary_dxf_file(str(file_path))
+
+
+class DXFStreamReader:
+    """ASCII DXF 流式读取器"""
+
+    def __init__(self, file_path: str):
+        self.file_path = Path(file_path)
+        self.file_size = os.path.getsize(file_path)
+        # 在产出第一个图元之前读取完毕（HEADER、TABLES、BLOCKS 段位于 ENTITIES 段之前）
+        self.header: Dict[str, Any] = {}
+        self.layers: List[Any] = []
+        self.blocks: Dict[str, BlockDefinition] = {}
+        self._stream = None
+
+    @property
+    def dxfversion(self) -> str:
+        return self.header.get("$ACADVER", "AC1009")
+
+    def bytes_read(self) -> int:
+        """已读取的字节数（按底层缓冲区位置计算，用于估算进度）"""
+        if self._stream is None or self._stream.closed:
+            return self.file_size
+        return self._stream.buffer.tell()
+
+    def estimate_total(self, count: int) -> int:
+        """按已读取字节比例估算模型空间图元总数"""
+        read = self.bytes_read()
+        if not read:
+            return count
+        return max(count, int(count * self.file_size / read))
+
+    def modelspace(self) -> Iterator[Any]:
+        """
+        逐个产出模型空间图元（不属于任何文档的 DXFGraphic）
+
+        POLYLINE 的 VERTEX、INSERT 的 ATTRIB 由 entity_linker 合并到所属图元，
+        图纸空间图元被跳过。块定义在产出第一个图元前读入 blocks。
+
+        Raises:
+            DXFStructureError: 文件结构无效
+        """
+        info = dxf_file_info(str(self.file_path))
+        linked_entity = entity_linker()
+        section: Optional[str] = None
+        header_var: Optional[str] = None
+        tags: List[Any] = []
+        queued = None
+        # BLOCKS 段中正在读取的块定义的图元（不需要的块为 None）
+        block_entities: Optional[List[Any]] = None
+
+        with open(self.file_path, mode="rt", encoding=info.encoding, errors="surrogateescape") as stream:
+            self._stream = stream
+            for tag in tag_compiler(ascii_tags_loader(stream)):
+                code = tag.code
+                if code != 0:
+                    if section == "HEADER":
+                        if code == 9:
+                            header_var = tag.value if tag.value in HEADER_VARS else None
+                        elif header_var is not None:
+                            self.header[header_var] = tag.value
+                            header_var = None
+                    elif code == 2 and len(tags) == 1 and tags[0].value == "SECTION":
+                        section = tag.value
+                    if tags:
+                        tags.append(tag)
+                    continue
+
+                # 组码 0：上一条记录结束
+                if tags:
+                    record_type = tags[0].value
+                    if section == "ENTITIES" and record_type != "SECTION":
+                        entity = factory.load(ExtendedTags(tags))
+                        if not linked_entity(entity) and not entity.dxf.get("paperspace", 0):
+                            if queued is not None:
+                                yield queued
+                            queued = entity
+                    elif section == "TABLES" and record_type == "LAYER":
+                        self.layers.append(factory.load(ExtendedTags(tags)))
+                    elif section == "BLOCKS":
+                        block_entities = self._load_block_record(tags, block_entities, linked_entity)
+
+                value = tag.value
+                if value == "ENDSEC":
+                    if section == "ENTITIES":
+                        break
+                    section = None
+                    tags = []
+                elif value == "SECTION" or section in ("TABLES", "BLOCKS", "ENTITIES"):
+                    tags = [tag]
+                else:
+                    tags = []
+
+            if queued is not None:
+                yield queued
+        self._stream = None
+
+    def _load_block_record(self, tags: List[Any], block_entities: Optional[List[Any]], linked_entity) -> Optional[List[Any]]:
+        """
+        处理 BLOCKS 段中的一条记录
+
+        Returns:
+            之后的图元所属块定义的图元列表（不在需要的块定义中时为 None）
+        """
+        record_type = tags[0].value
+        if record_type == "BLOCK":
+            block = factory.load(ExtendedTags(tags))
+            name = block.dxf.name
+            if not _insertable(name):
+                return None
+            base_point = block.dxf.base_point
+            entities: List[Any] = []
+            self.blocks[name] = BlockDefinition(name, (base_point.x, base_point.y), entities)
+            return entities
+        if record_type == "ENDBLK" or block_entities is None:
+            return None
+        entity = factory.load(ExtendedTags(tags))
+        if not linked_entity(entity):
+            block_entities.append(entity)
+        return block_entities
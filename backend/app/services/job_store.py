@@ -0,0 +1,458 @@
+"""
+分析任务存储
+保存任务状态和序列化后的报告，按 TTL / LRU 淘汰，默认使用 SQLite (WAL) 持久化
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.config import settings
+from app.models import AnalysisProgress, AnalysisStatus, ComplianceReport
+
+
+# 已结束的任务不再变化，可以安全地放入进程内热缓存
+TERMINAL_STATUSES = {AnalysisStatus.COMPLETED, AnalysisStatus.FAILED, AnalysisStatus.TIMED_OUT}
+
+# 当前服务实例的标识（主机名-进程号-随机后缀），记录为其创建的任务的执行者
+INSTANCE_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class JobStore(ABC):
+    """分析任务存储接口"""
+
+    @abstractmethod
+    def create(self, analysis_id: str, file_id: str, file_path: str, standard: str):
+        """创建任务记录（状态为 PENDING）"""
+
+    @abstractmethod
+    def update_status(self, analysis_id: str, status: AnalysisStatus, error: Optional[str] = None):
+        """更新任务状态"""
+
+    @abstractmethod
+    def save_report(
+        self,
+        analysis_id: str,
+        report: ComplianceReport,
+        status: AnalysisStatus = AnalysisStatus.COMPLETED
+    ):
+        """保存报告并将任务标记为 COMPLETED（超时的部分报告标记为 TIMED_OUT）"""
+
+    @abstractmethod
+    def update_progress(self, analysis_id: str, progress: AnalysisProgress):
+        """保存最新的进度事件（供其他进程中的进度订阅者读取）"""
+
+    @abstractmethod
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务记录
+
+        Returns:
+            包含 status / file_id / file_path / standard / started_at /
+            completed_at / report / error / progress 的字典，不存在或已过期时返回 None
+        """
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """清理过期任务，返回删除数量"""
+
+    @abstractmethod
+    def heartbeat(self):
+        """更新当前实例的心跳时间（表明其创建的未结束任务仍有执行者）"""
+
+    @abstractmethod
+    def fail_unfinished(self, error: str) -> int:
+        """
+        将执行者已停止的未结束（PENDING / PROCESSING）任务标记为 FAILED，并追加一条结束进度事件
+        （服务启动时和心跳时调用：中断的任务不会再有进度，订阅者需要收到结束事件）
+
+        执行者超过 job_owner_timeout 未更新心跳即视为已停止；共享同一存储的其他实例的任务不受影响。
+
+        Returns:
+            标记的任务数
+        """
+
+
+def _failed_event(analysis_id: str, last: Optional[AnalysisProgress], error: str) -> AnalysisProgress:
+    """接在最后一条进度事件之后的失败事件"""
+    return AnalysisProgress(
+        analysis_id=analysis_id,
+        seq=last.seq + 1 if last else 1,
+        status=AnalysisStatus.FAILED,
+        stage=last.stage if last else None,
+        percent=100.0,
+        message=error
+    )
+
+
+class _HotCache:
+    """已结束任务的小型 LRU 热缓存"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: str, item: Dict[str, Any]):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class SQLiteJobStore(JobStore):
+    """基于 SQLite (WAL 模式) 的任务存储，服务重启后结果仍然保留"""
+
+    # 读取时最多每隔多少秒刷新一次访问时间，避免状态轮询变成频繁写入
+    TOUCH_INTERVAL = 60
+
+    def __init__(
+        self,
+        db_path: Path,
+        ttl: int,
+        max_entries: int,
+        cache_size: int,
+        owner_timeout: int = 60,
+        instance_id: str = INSTANCE_ID
+    ):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.owner_timeout = owner_timeout
+        self.instance_id = instance_id
+        self.cache = _HotCache(cache_size)
+        self._lock = threading.Lock()
+
+        # 数据库在首次使用时才打开（导入模块不创建文件）
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        """创建数据库目录、打开连接并建表"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                analysis_id TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                standard TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                report BLOB,
+                started_at REAL NOT NULL,
+                completed_at REAL,
+                accessed_at REAL NOT NULL,
+                progress TEXT,
+                owner TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_accessed ON jobs(accessed_at)")
+        # 旧版本创建的表没有 progress / owner 列
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "progress" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+        if "owner" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        # 共享同一数据库的服务实例及其心跳时间
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS instances (
+                instance_id TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "INSERT OR REPLACE INTO instances (instance_id, heartbeat_at) VALUES (?, ?)",
+            (self.instance_id, time.time())
+        )
+        return conn
+
+    def create(self, analysis_id: str, file_id: str, file_path: str, standard: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs "
+                "(analysis_id, file_id, file_path, standard, status, started_at, accessed_at, owner) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (analysis_id, file_id, file_path, standard, AnalysisStatus.PENDING.value, now, now, self.instance_id)
+            )
+        self.purge_expired()
+
+    def update_status(self, analysis_id: str, status: AnalysisStatus, error: Optional[str] = None):
+        now = time.time()
+        completed_at = now if status in TERMINAL_STATUSES else None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, completed_at = ?, accessed_at = ? "
+                "WHERE analysis_id = ?",
+                (status.value, error, completed_at, now, analysis_id)
+            )
+        self.cache.discard(analysis_id)
+
+    def save_report(
+        self,
+        analysis_id: str,
+        report: ComplianceReport,
+        status: AnalysisStatus = AnalysisStatus.COMPLETED
+    ):
+        now = time.time()
+        payload = zlib.compress(report.model_dump_json().encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, report = ?, error = NULL, completed_at = ?, accessed_at = ? "
+                "WHERE analysis_id = ?",
+                (status.value, payload, now, now, analysis_id)
+            )
+        self.cache.discard(analysis_id)
+
+    def update_progress(self, analysis_id: str, progress: AnalysisProgress):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ? WHERE analysis_id = ?",
+                (progress.model_dump_json(), analysis_id)
+            )
+        self.cache.discard(analysis_id)
+
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        cached = self.cache.get(analysis_id)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_id, file_path, standard, status, error, report, "
+                "started_at, completed_at, accessed_at, progress FROM jobs WHERE analysis_id = ?",
+                (analysis_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        file_id, file_path, standard, status, error, report, started_at, completed_at, accessed_at, progress = row
+        now = time.time()
+        if self.ttl and now - accessed_at > self.ttl:
+            return None
+        if now - accessed_at > self.TOUCH_INTERVAL:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE jobs SET accessed_at = ? WHERE analysis_id = ?",
+                    (now, analysis_id)
+                )
+
+        result = {
+            "status": AnalysisStatus(status),
+            "file_id": file_id,
+            "file_path": file_path,
+            "standard": standard,
+            "started_at": datetime.fromtimestamp(started_at),
+            "completed_at": datetime.fromtimestamp(completed_at) if completed_at else None,
+            "report": ComplianceReport.model_validate_json(zlib.decompress(report)) if report else None,
+            "error": error,
+            "progress": AnalysisProgress.model_validate_json(progress) if progress else None
+        }
+        if result["status"] in TERMINAL_STATUSES:
+            self.cache.put(analysis_id, result)
+        return result
+
+    def purge_expired(self) -> int:
+        deleted = 0
+        with self._lock:
+            if self.ttl:
+                deleted += self._conn.execute(
+                    "DELETE FROM jobs WHERE accessed_at < ?",
+                    (time.time() - self.ttl,)
+                ).rowcount
+            if self.max_entries:
+                # LRU：只保留最近访问的 max_entries 条
+                deleted += self._conn.execute(
+                    "DELETE FROM jobs WHERE analysis_id IN ("
+                    "SELECT analysis_id FROM jobs ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+        if deleted:
+            self.cache.clear()
+        return deleted
+
+    def heartbeat(self):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO instances (instance_id, heartbeat_at) VALUES (?, ?)",
+                (self.instance_id, time.time())
+            )
+
+    def fail_unfinished(self, error: str) -> int:
+        now = time.time()
+        unfinished = (AnalysisStatus.PENDING.value, AnalysisStatus.PROCESSING.value)
+        with self._lock:
+            # 执行者不是当前实例且已停止（心跳过期、没有记录或旧版本创建的任务）
+            rows = self._conn.execute(
+                "SELECT analysis_id, progress FROM jobs WHERE status IN (?, ?) "
+                "AND (owner IS NULL OR (owner != ? AND owner NOT IN ("
+                "SELECT instance_id FROM instances WHERE heartbeat_at >= ?)))",
+                (*unfinished, self.instance_id, now - self.owner_timeout)
+            ).fetchall()
+            for analysis_id, progress in rows:
+                last = AnalysisProgress.model_validate_json(progress) if progress else None
+                event = _failed_event(analysis_id, last, error)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, completed_at = ?, progress = ? "
+                    "WHERE analysis_id = ?",
+                    (AnalysisStatus.FAILED.value, error, now, event.model_dump_json(), analysis_id)
+                )
+            # 已停止的实例不再有未结束的任务
+            self._conn.execute(
+                "DELETE FROM instances WHERE heartbeat_at < ? AND instance_id != ?",
+                (now - self.owner_timeout, self.instance_id)
+            )
+        self.cache.clear()
+        return len(rows)
+
+
+class MemoryJobStore(JobStore):
+    """进程内有界任务存储（开发调试用，重启后结果丢失）"""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, analysis_id: str, file_id: str, file_path: str, standard: str):
+        with self._lock:
+            self._jobs[analysis_id] = {
+                "status": AnalysisStatus.PENDING,
+                "file_id": file_id,
+                "file_path": file_path,
+                "standard": standard,
+                "started_at": datetime.now(),
+                "completed_at": None,
+                "report": None,
+                "error": None,
+                "progress": None,
+                "accessed_at": time.time()
+            }
+        self.purge_expired()
+
+    def update_status(self, analysis_id: str, status: AnalysisStatus, error: Optional[str] = None):
+        with self._lock:
+            job = self._jobs.get(analysis_id)
+            if job is None:
+                return
+            job["status"] = status
+            job["error"] = error
+            if status in TERMINAL_STATUSES:
+                job["completed_at"] = datetime.now()
+
+    def save_report(
+        self,
+        analysis_id: str,
+        report: ComplianceReport,
+        status: AnalysisStatus = AnalysisStatus.COMPLETED
+    ):
+        with self._lock:
+            job = self._jobs.get(analysis_id)
+            if job is None:
+                return
+            job.update(
+                status=status,
+                report=report,
+                error=None,
+                completed_at=datetime.now()
+            )
+
+    def update_progress(self, analysis_id: str, progress: AnalysisProgress):
+        with self._lock:
+            job = self._jobs.get(analysis_id)
+            if job is not None:
+                job["progress"] = progress
+
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(analysis_id)
+            if job is None:
+                return None
+            now = time.time()
+            if self.ttl and now - job["accessed_at"] > self.ttl:
+                del self._jobs[analysis_id]
+                return None
+            job["accessed_at"] = now
+            self._jobs.move_to_end(analysis_id)
+            return dict(job)
+
+    def purge_expired(self) -> int:
+        deleted = 0
+        with self._lock:
+            if self.ttl:
+                cutoff = time.time() - self.ttl
+                expired = [key for key, job in self._jobs.items() if job["accessed_at"] < cutoff]
+                for key in expired:
+                    del self._jobs[key]
+                deleted += len(expired)
+            while self.max_entries and len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+                deleted += 1
+        return deleted
+
+    def heartbeat(self):
+        pass
+
+    def fail_unfinished(self, error: str) -> int:
+        # 进程内存储的任务都由当前进程执行，随进程一起结束，不存在执行者已停止的任务
+        return 0
+
+
+def create_job_store() -> JobStore:
+    """根据配置创建任务存储"""
+    if settings.job_store_backend == "memory":
+        return MemoryJobStore(
+            ttl=settings.job_store_ttl,
+            max_entries=settings.job_store_max_entries
+        )
+    if settings.job_store_backend == "sqlite":
+        return SQLiteJobStore(
+            db_path=settings.job_store_path,
+            ttl=settings.job_store_ttl,
+            max_entries=settings.job_store_max_entries,
+            cache_size=settings.job_store_cache_size,
+            owner_timeout=settings.job_owner_timeout
+        )
+    raise ValueError(f"不支持的任务存储后端: {settings.job_store_backend}")
+
+
+# 全局任务存储实例
+job_store = create_job_store()
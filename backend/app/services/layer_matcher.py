@@ -0,0 +1,73 @@
+"""
+图层名称匹配器
+把规则文件中各图层类别的 expected_names 预编译为正则，
+每个不同的图层名只分类一次，图元按图层编号查表得到结果
+
+同步维护：本模块在 backend/app/services/、checker/、frontend/checker/ 各有一份副本；
+后端服务与独立部署的检查包之间没有可共享的导入路径，修改时需同步全部副本。
+"""
+import re
+from typing import Dict, List, Any, FrozenSet
+
+import numpy as np
+
+
+# 图层分类缓存上限（匹配器随规则集在进程内长期存在）
+MAX_CACHED_LAYERS = 100000
+
+
+class LayerMatcher:
+    """按 expected_names 对图层名分类（不区分大小写的子串匹配）"""
+
+    def __init__(self, layer_rules: Dict[str, Dict[str, Any]]):
+        """
+        Args:
+            layer_rules: 规则文件中的 layers 段，类别名 -> {expected_names: [...], ...}
+        """
+        self.expected_names: Dict[str, List[str]] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+        for layer_class, rule in layer_rules.items():
+            names = rule.get('expected_names') or []
+            self.expected_names[layer_class] = list(names)
+            if names:
+                # 同一类别的所有名称合并为一个交替正则，一次扫描完成
+                self._patterns[layer_class] = re.compile(
+                    "|".join(re.escape(name.upper()) for name in names)
+                )
+        self._classes: Dict[str, FrozenSet[str]] = {}
+
+    def classify(self, layer: str) -> FrozenSet[str]:
+        """图层名所属的全部类别（按图层名缓存）"""
+        classes = self._classes.get(layer)
+        if classes is None:
+            upper = layer.upper()
+            if len(self._classes) >= MAX_CACHED_LAYERS:
+                self._classes.clear()
+            classes = frozenset(
+                layer_class
+                for layer_class, pattern in self._patterns.items()
+                if pattern.search(upper)
+            )
+            self._classes[layer] = classes
+        return classes
+
+    def matches(self, layer: str, layer_class: str) -> bool:
+        """图层名是否属于指定类别"""
+        return layer_class in self.classify(layer)
+
+    def mask(self, layer_names: List[str], layer_class: str) -> np.ndarray:
+        """
+        对图层名表逐项判断是否属于指定类别
+
+        Args:
+            layer_names: 驻留后的图层名表（EntityTable.layers）
+            layer_class: 图层类别
+
+        Returns:
+            与 layer_names 等长的布尔数组，可直接用图层编号索引
+        """
+        return np.fromiter(
+            (layer_class in self.classify(name) for name in layer_names),
+            dtype=bool,
+            count=len(layer_names)
+        )
@@ -0,0 +1,286 @@
+"""
+解析结果缓存
+按 (DXF 内容哈希, 解析器版本) 缓存解析结果，同一图纸按其他标准或修改后的规则文件重新检查时跳过 ezdxf 解析。
+
+缓存文件为不压缩的 .npz（可用 numpy.load 读取）：列式图元表的每一列是一个 .npy 成员，
+数据起始位置按 ALIGNMENT 对齐，读取时直接内存映射，不复制数组数据；
+字符串驻留表保存为 UTF-8 字节 + 偏移量，图层、尺寸、文字等记录段保存为 JSON。
+"""
+import io
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.entity_table import COLUMNS, EntityTable
+from app.services.parse_projection import ParseProjection
+
+
+logger = logging.getLogger(__name__)
+
+# 成员数据在文件中的对齐字节数（.npy 头部本身按 64 字节补齐，成员起始对齐后数组数据也对齐）
+ALIGNMENT = 64
+# 补齐对齐用的 ZIP 扩展字段 ID（与 Android zipalign 相同，解压工具会忽略）
+ALIGNMENT_EXTRA_ID = 0xD935
+# ZIP 本地文件头的固定长度
+LOCAL_HEADER_SIZE = 30
+# .npy 头部最大长度（1.0 版头部长度字段为 2 字节）
+NPY_HEADER_MAX = 10 + 0xFFFF
+# 列式图元表的字符串驻留表
+STRING_POOLS = ("layers", "linetypes", "texts")
+# 以 JSON 保存的数据段（记录中的 JSON 数组均为坐标元组，读取时还原为元组）
+RECORD_SECTIONS = ("layers", "dimensions", "texts", "blocks", "metadata")
+
+
+def _encode_json(value: Any) -> np.ndarray:
+    text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return np.frombuffer(text.encode('utf-8', 'surrogatepass'), dtype=np.uint8)
+
+
+def _decode_json(data: np.ndarray) -> Any:
+    return json.loads(data.tobytes().decode('utf-8', 'surrogatepass'))
+
+
+def _encode_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """字符串列表 -> (UTF-8 字节, 各字符串的起止偏移量)"""
+    encoded = [value.encode('utf-8', 'surrogatepass') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[start:end].decode('utf-8', 'surrogatepass') for start, end in zip(bounds, bounds[1:])]
+
+
+def _restore_tuples(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: tuple(value) if isinstance(value, list) else value for key, value in record.items()}
+
+
+def _write_member(stream, archive: zipfile.ZipFile, name: str, array: np.ndarray):
+    """写入一个不压缩的 .npy 成员，用扩展字段补齐使数据起始位置按 ALIGNMENT 对齐"""
+    info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = zipfile.ZIP_STORED
+    # 扩展字段至少包含 4 字节的 ID 和长度
+    data_start = stream.tell() + LOCAL_HEADER_SIZE + len(info.filename.encode('utf-8')) + 4
+    padding = -data_start % ALIGNMENT
+    info.extra = struct.pack('<HH', ALIGNMENT_EXTRA_ID, padding) + bytes(padding)
+    with archive.open(info, mode='w') as member:
+        np.lib.format.write_array(member, np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _map_members(path: Path) -> Dict[str, np.ndarray]:
+    """
+    内存映射 .npz 中的全部数组（数组为只读，引用映射的缓冲区）
+
+    Raises:
+        ValueError: 成员被压缩或不是有效的 .npy
+    """
+    with open(path, 'rb') as stream:
+        with zipfile.ZipFile(stream) as archive:
+            infos = archive.infolist()
+        buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+    arrays = {}
+    for info in infos:
+        if info.compress_type != zipfile.ZIP_STORED or not info.filename.endswith('.npy'):
+            raise ValueError(f"无法内存映射的成员: {info.filename}")
+        name_length, extra_length = struct.unpack_from('<HH', buffer, info.header_offset + 26)
+        start = info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length
+        head = io.BytesIO(buffer[start:start + min(info.file_size, NPY_HEADER_MAX)])
+        version = np.lib.format.read_magic(head)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(head)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(head)
+        if fortran_order or dtype.hasobject:
+            raise ValueError(f"无法内存映射的成员: {info.filename}")
+        count = int(np.prod(shape))
+        arrays[info.filename[:-4]] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=start + head.tell()
+        ).reshape(shape)
+    return arrays
+
+
+class ParseCacheEntry:
+    """一条解析缓存：解析时使用的投影和解析结果（图元表各列内存映射）"""
+
+    __slots__ = ('projection', 'data')
+
+    def __init__(self, path: Path):
+        """
+        Raises:
+            OSError, ValueError, KeyError: 缓存文件损坏
+        """
+        arrays = _map_members(path)
+        meta = _decode_json(arrays["meta"])
+        self.projection = ParseProjection(
+            frozenset(meta["entity_types"]),
+            frozenset(meta["columns"]),
+            frozenset(meta["sections"])
+        )
+
+        pools = {
+            name: _decode_strings(arrays[f"entities.{name}.data"], arrays[f"entities.{name}.offsets"])
+            for name in STRING_POOLS
+        }
+        columns = {column: arrays[f"entities.{column}"] for column in COLUMNS}
+        sections = {section: _decode_json(arrays[section]) for section in RECORD_SECTIONS}
+
+        # 键顺序与 DXFParserService 的输出一致
+        self.data = {
+            "filename": meta["filename"],
+            "version": meta["version"],
+            "layers": [_restore_tuples(layer) for layer in sections["layers"]],
+            "entities": EntityTable(**columns, **pools),
+            "dimensions": [_restore_tuples(dim) for dim in sections["dimensions"]],
+            "texts": [_restore_tuples(text) for text in sections["texts"]],
+            "blocks": sections["blocks"],
+            "metadata": _restore_tuples(sections["metadata"])
+        }
+
+
+class ParseCache:
+    """磁盘上的解析结果缓存，超出配额时按最近使用时间 (LRU) 淘汰"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 磁盘配额（字节），0 表示不缓存
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path_for(self, content_hash: str, parser_tag: str) -> Path:
+        """缓存文件路径"""
+        return self.cache_dir / f"{content_hash}.{parser_tag}.npz"
+
+    def get(self, content_hash: str, parser_tag: str) -> Optional[ParseCacheEntry]:
+        """
+        读取缓存
+
+        Args:
+            content_hash: DXF 内容哈希
+            parser_tag: 解析器版本标识
+
+        Returns:
+            缓存条目，未命中或缓存文件损坏时返回 None
+        """
+        path = self.path_for(content_hash, parser_tag)
+        try:
+            # 刷新修改时间作为 LRU 依据
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        try:
+            return ParseCacheEntry(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning("解析缓存文件损坏，已忽略 %s: %s", path.name, e)
+            return None
+
+    def put(self, content_hash: str, parser_tag: str, projection: ParseProjection, data: Dict[str, Any]):
+        """
+        写入解析结果（写入失败只记录日志，不影响分析）
+
+        Args:
+            projection: 解析时使用的投影
+            data: DXFParserService 的解析结果
+        """
+        target = self.path_for(content_hash, parser_tag)
+        # 先写到缓存目录内的临时名，再原子重命名，读者不会看到写了一半的文件
+        staging = target.with_name(f"{target.name}.{uuid.uuid4().hex[:8]}.part")
+        try:
+            # 缓存目录在首次写入时创建（导入模块不创建目录）
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._write(staging, projection, data)
+            if staging.stat().st_size > self.max_bytes:
+                staging.unlink()
+                return
+            os.replace(staging, target)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("解析缓存写入失败 %s: %s", target.name, e)
+            staging.unlink(missing_ok=True)
+            return
+        self._evict(keep=target)
+
+    @staticmethod
+    def _write(path: Path, projection: ParseProjection, data: Dict[str, Any]):
+        table = data["entities"]
+        meta = {
+            "filename": data["filename"],
+            "version": data["version"],
+            "entity_types": sorted(projection.entity_types),
+            "columns": sorted(projection.columns),
+            "sections": sorted(projection.sections)
+        }
+        with open(path, 'wb') as stream, zipfile.ZipFile(stream, mode='w') as archive:
+            _write_member(stream, archive, "meta", _encode_json(meta))
+            for column in COLUMNS:
+                _write_member(stream, archive, f"entities.{column}", getattr(table, column))
+            for name in STRING_POOLS:
+                values, offsets = _encode_strings(getattr(table, name))
+                _write_member(stream, archive, f"entities.{name}.data", values)
+                _write_member(stream, archive, f"entities.{name}.offsets", offsets)
+            for section in RECORD_SECTIONS:
+                _write_member(stream, archive, section, _encode_json(data[section]))
+
+    def _evict(self, keep: Path):
+        """超出磁盘配额时删除最久未使用的文件"""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.npz"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    path.unlink(missing_ok=True)
+                except OSError:
+                    # Windows 上正被其他进程内存映射的文件无法删除
+                    continue
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """占用统计（读写发生在工作进程中，这里只统计磁盘上的条目）"""
+        sizes = [path.stat().st_size for path in self.cache_dir.glob("*.npz")]
+        return {
+            "entries": len(sizes),
+            "size_bytes": sum(sizes),
+            "max_bytes": self.max_bytes
+        }
+
+
+# 全局解析缓存实例
+parse_cache = ParseCache(
+    cache_dir=settings.parse_cache_dir,
+    max_bytes=settings.parse_cache_max_bytes
+)
@@ -0,0 +1,92 @@
+"""
+解析投影
+由启用的检查规则声明的图元类型、图元列和数据段求并集，
+解析器只提取其中的数据，跳过规则用不到的逐图元开销（如 get_measurement、MTEXT 文字解码）
+"""
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable
+
+from app.services.entity_table import COLUMNS, ENTITY_TYPES
+
+
+# 可按需提取的数据段；"段名.字段组" 为段中开销较大的可选字段；
+# inserts 表示展开块参照，块内图元并入图元表（和 texts）
+SECTIONS = ("layers", "blocks", "texts", "dimensions", "dimensions.measurement", "inserts")
+# 流式解析能提供的数据段（blocks 块名列表只在读取完整文档时提供）
+STREAMING_SECTIONS = frozenset({"layers", "texts", "dimensions", "dimensions.measurement", "inserts"})
+
+
+@dataclass(frozen=True)
+class ParseProjection:
+    """解析器需要提取的数据"""
+    entity_types: FrozenSet[str]
+    columns: FrozenSet[str]
+    sections: FrozenSet[str]
+
+    @classmethod
+    def from_rules(cls, rules: Iterable) -> "ParseProjection":
+        """
+        启用规则所需数据的并集
+
+        Args:
+            rules: CheckRule 列表
+        """
+        entity_types = set()
+        columns = set()
+        sections = set()
+        for rule in rules:
+            if rule.columns:
+                entity_types.update(rule.entity_types if rule.entity_types is not None else ENTITY_TYPES)
+                columns.update(rule.columns)
+            sections.update(rule.sections)
+        if entity_types:
+            # 按类型取行总是需要类型列
+            columns.add("entity_type")
+        if entity_types or "texts" in sections:
+            # 读取图元或文字的规则同样检查块参照内的图元
+            sections.add("inserts")
+        # 字段组隐含所在的段
+        sections.update(section.split(".")[0] for section in list(sections))
+        return cls(frozenset(entity_types), frozenset(columns), frozenset(sections))
+
+    def wants_type(self, entity_type: str) -> bool:
+        return entity_type in self.entity_types
+
+    def wants_column(self, column: str) -> bool:
+        return column in self.columns
+
+    def wants(self, section: str) -> bool:
+        return section in self.sections
+
+    def covers(self, other: "ParseProjection") -> bool:
+        """是否包含另一投影需要的全部数据（按本投影解析的结果可直接用于另一投影）"""
+        return (
+            other.entity_types <= self.entity_types
+            and other.columns <= self.columns
+            and other.sections <= self.sections
+        )
+
+    def union(self, other: "ParseProjection") -> "ParseProjection":
+        """两个投影所需数据的并集"""
+        return ParseProjection(
+            self.entity_types | other.entity_types,
+            self.columns | other.columns,
+            self.sections | other.sections
+        )
+
+    @property
+    def streamable(self) -> bool:
+        """只需要逐图元数据（及图层表）时可以流式解析"""
+        return self.sections <= STREAMING_SECTIONS
+
+    def describe(self) -> str:
+        """简短描述（用于日志和基准测试输出）"""
+        return (
+            f"types={','.join(sorted(self.entity_types)) or '-'} "
+            f"columns={','.join(sorted(self.columns)) or '-'} "
+            f"sections={','.join(sorted(self.sections)) or '-'}"
+        )
+
+
+# 提取全部数据（未指定投影时的默认行为）
+FULL_PROJECTION = ParseProjection(frozenset(ENTITY_TYPES), frozenset(COLUMNS), frozenset(SECTIONS))
@@ -0,0 +1,120 @@
+"""
+分析进度上报
+各阶段在整体进度中占固定区间；工作进程中的 ProgressReporter 把解析和检查进度
+转换为进度事件字段，通过回调（进度队列）发送给 API 进程中的 ProgressBus
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.models import AnalysisStage
+
+
+# 各阶段在整体进度中的百分比区间
+STAGE_RANGES = {
+    AnalysisStage.UPLOAD: (0.0, 5.0),
+    AnalysisStage.CONVERT: (5.0, 15.0),
+    AnalysisStage.PARSE: (15.0, 60.0),
+    AnalysisStage.CHECK: (60.0, 95.0),
+    AnalysisStage.REPORT: (95.0, 100.0),
+}
+
+
+def stage_percent(stage: AnalysisStage, fraction: float = 0.0) -> float:
+    """阶段内完成比例对应的整体进度百分比"""
+    low, high = STAGE_RANGES[stage]
+    return round(low + (high - low) * min(max(fraction, 0.0), 1.0), 1)
+
+
+class ProgressReporter:
+    """
+    工作进程内的进度上报器
+
+    阶段切换和规则完成总是上报；解析进度按 interval 节流，避免逐批图元发送事件。
+    rule_done 可能在规则线程池中并发调用。
+    """
+
+    def __init__(
+        self,
+        analysis_id: str,
+        send: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        interval: float = 0.25
+    ):
+        """
+        Args:
+            analysis_id: 分析任务ID
+            send: 接收 (analysis_id, 事件字段) 的回调，None 表示不上报
+            interval: 解析进度的最小上报间隔（秒）
+        """
+        self.analysis_id = analysis_id
+        self.send = send
+        self.interval = interval
+        self._sent_at = 0.0
+        self._rules_total = 0
+        self._rules_done = 0
+        self._lock = threading.Lock()
+
+    def stage(
+        self,
+        stage: AnalysisStage,
+        message: str,
+        fraction: float = 0.0,
+        current: Optional[int] = None,
+        total: Optional[int] = None,
+        rule: Optional[str] = None
+    ):
+        """上报阶段进度"""
+        if self.send is None:
+            return
+        self._sent_at = time.monotonic()
+        self.send(self.analysis_id, {
+            "stage": stage,
+            "percent": stage_percent(stage, fraction),
+            "message": message,
+            "current": current,
+            "total": total,
+            "rule": rule
+        })
+
+    def parse(self, current: int, total: int):
+        """解析进度（已遍历 current / total 个图元）"""
+        if self.send is None or time.monotonic() - self._sent_at < self.interval:
+            return
+        self.stage(
+            AnalysisStage.PARSE,
+            f"正在解析图元 {current}/{total}",
+            current / total if total else 1.0,
+            current,
+            total
+        )
+
+    def start_rules(self, total: int):
+        """开始执行 total 条检查规则"""
+        self._rules_total = total
+        self._rules_done = 0
+        self.stage(AnalysisStage.CHECK, f"正在执行 {total} 条检查规则", 0.0, 0, total)
+        if not total:
+            self.stage(AnalysisStage.REPORT, "正在生成报告")
+
+    def rule_done(self, rule, elapsed: Optional[float]):
+        """
+        一条检查规则结束（run_rules 的 on_rule 回调）；全部结束后进入报告阶段
+
+        Args:
+            rule: CheckRule
+            elapsed: 耗时秒数，超时未完成时为 None
+        """
+        with self._lock:
+            self._rules_done += 1
+            done, total = self._rules_done, self._rules_total
+            state = "完成" if elapsed is not None else "超时未完成"
+            self.stage(
+                AnalysisStage.CHECK,
+                f"检查规则 {rule.name} {state}（{done}/{total}）",
+                done / total if total else 1.0,
+                done,
+                total,
+                rule.name
+            )
+            if done == total:
+                self.stage(AnalysisStage.REPORT, "正在生成报告")
@@ -0,0 +1,182 @@
+"""
+分析进度发布/订阅
+ProgressBus 在 API 进程中为每个分析保存最近的进度事件并唤醒等待中的订阅者（SSE / 长轮询）；
+工作进程的进度经进度队列转发后在事件循环中发布。最新进度按间隔写入任务存储，
+分析在其他进程中执行时订阅者从任务存储轮询读取。
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.models import AnalysisProgress, AnalysisStage, AnalysisStatus
+from app.services.job_store import JobStore, TERMINAL_STATUSES, job_store
+
+
+class _Channel:
+    """单个分析的进度频道"""
+
+    __slots__ = ('events', 'changed', 'percent', 'stage', 'stored_at')
+
+    def __init__(self, history: int):
+        self.events: Deque[AnalysisProgress] = deque(maxlen=history)
+        # 每次发布时置位并替换，等待者持有发布前的事件对象
+        self.changed = asyncio.Event()
+        self.percent = 0.0
+        self.stage: Optional[AnalysisStage] = None
+        self.stored_at = 0.0
+
+
+class ProgressBus:
+    """进程内的分析进度发布/订阅"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        history: int = 64,
+        store_interval: float = 1.0,
+        retention: float = 300.0,
+        poll_interval: float = 0.5
+    ):
+        """
+        Args:
+            store: 任务存储（跨进程转发最新进度）
+            history: 每个分析保留的最近事件数（断线重连时补发）
+            store_interval: 同一阶段内写入任务存储的最小间隔（秒）
+            retention: 分析结束后频道保留的时间（秒）
+            poll_interval: 分析不在本进程时轮询任务存储的间隔（秒）
+        """
+        self.store = store
+        self.history = history
+        self.store_interval = store_interval
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self._channels: Dict[str, _Channel] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def publish(
+        self,
+        analysis_id: str,
+        status: AnalysisStatus = AnalysisStatus.PROCESSING,
+        stage: Optional[AnalysisStage] = None,
+        percent: Optional[float] = None,
+        message: str = "",
+        current: Optional[int] = None,
+        total: Optional[int] = None,
+        rule: Optional[str] = None
+    ) -> Optional[AnalysisProgress]:
+        """
+        发布进度事件（在事件循环线程中调用，同时记录事件循环供 publish_threadsafe 使用）
+
+        进度百分比只增不减；分析结束后迟到的进度事件（如工作进程队列中的残留事件）被丢弃。
+
+        Returns:
+            发布的事件，被丢弃时返回 None
+        """
+        self._loop = asyncio.get_running_loop()
+        channel = self._channels.get(analysis_id)
+        if channel is None:
+            channel = self._channels[analysis_id] = _Channel(self.history)
+        elif channel.events and channel.events[-1].status in TERMINAL_STATUSES:
+            return None
+
+        terminal = status in TERMINAL_STATUSES
+        if terminal:
+            percent = 100.0
+        channel.percent = max(channel.percent, percent if percent is not None else 0.0)
+        event = AnalysisProgress(
+            analysis_id=analysis_id,
+            seq=channel.events[-1].seq + 1 if channel.events else 1,
+            status=status,
+            stage=stage or channel.stage,
+            percent=channel.percent,
+            message=message,
+            current=current,
+            total=total,
+            rule=rule
+        )
+        channel.events.append(event)
+        changed, channel.changed = channel.changed, asyncio.Event()
+        changed.set()
+
+        # 阶段切换、分析结束或达到间隔时写入任务存储
+        now = time.monotonic()
+        if terminal or event.stage != channel.stage or now - channel.stored_at >= self.store_interval:
+            self.store.update_progress(analysis_id, event)
+            channel.stored_at = now
+        channel.stage = event.stage
+
+        if terminal:
+            self._loop.call_later(self.retention, self._channels.pop, analysis_id, None)
+        return event
+
+    def publish_threadsafe(self, analysis_id: str, fields: Dict[str, Any]):
+        """从其他线程发布进度事件（未绑定事件循环或循环已关闭时丢弃）"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(lambda: self.publish(analysis_id, **fields))
+
+    def latest(self, analysis_id: str) -> Optional[AnalysisProgress]:
+        """
+        最新进度：本进程的频道，其次是任务存储中的记录；
+        没有进度记录的任务（如升级前创建的任务）按任务状态生成快照。任务不存在时返回 None
+        """
+        channel = self._channels.get(analysis_id)
+        if channel is not None:
+            return channel.events[-1]
+        job = self.store.get(analysis_id)
+        if job is None:
+            return None
+        if job.get("progress") is not None:
+            return job["progress"]
+        terminal = job["status"] in TERMINAL_STATUSES
+        return AnalysisProgress(
+            analysis_id=analysis_id,
+            seq=1 if terminal else 0,
+            status=job["status"],
+            percent=100.0 if terminal else 0.0,
+            message=job.get("error") or ""
+        )
+
+    async def next_events(self, analysis_id: str, after: int, timeout: float) -> List[AnalysisProgress]:
+        """
+        等待序号大于 after 的事件
+
+        Args:
+            analysis_id: 分析任务ID
+            after: 已收到的最后一个事件序号
+            timeout: 最长等待秒数
+
+        Returns:
+            按序号排列的新事件（分析不在本进程时只有最新一条），超时返回空列表
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            channel = self._channels.get(analysis_id)
+            if channel is not None:
+                waiter = channel.changed
+                events = [event for event in channel.events if event.seq > after]
+            else:
+                waiter = None
+                event = self.latest(analysis_id)
+                events = [event] if event is not None and event.seq > after else []
+            if events:
+                return events
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return []
+            if waiter is None:
+                await asyncio.sleep(min(self.poll_interval, remaining))
+                continue
+            try:
+                await asyncio.wait_for(waiter.wait(), remaining)
+            except asyncio.TimeoutError:
+                return []
+
+
+# 全局进度总线
+progress_bus = ProgressBus(job_store, store_interval=settings.progress_store_interval)
@@ -0,0 +1,133 @@
+"""
+分析结果缓存
+按 (文件内容哈希, 检查标准, 规则文件版本, 代码版本) 缓存已完成的报告，重复上传的图纸直接复用结果
+"""
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.config import settings
+from app.models import ComplianceReport
+
+
+class ResultCache:
+    """基于 SQLite 的报告缓存，按总字节数上限做 LRU 淘汰"""
+
+    def __init__(self, db_path: Path, max_bytes: int):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # 数据库在首次使用时才打开（导入模块不创建文件）
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        """创建数据库目录、打开连接并建表"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                cache_key TEXT PRIMARY KEY,
+                report BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+        return conn
+
+    @staticmethod
+    def make_key(content_hash: str, standard: str, rules_version: str, code_tag: str, options: str = "") -> str:
+        """
+        构造缓存键
+
+        Args:
+            rules_version: 规则文件版本
+            code_tag: 解析与检查代码的版本标识
+            options: 影响报告内容的检查选项（如违规聚合）
+        """
+        return f"{content_hash}:{standard}:{rules_version}:{code_tag}:{options}"
+
+    def get(self, cache_key: str) -> Optional[ComplianceReport]:
+        """读取缓存的报告，未命中返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT report FROM results WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE results SET accessed_at = ? WHERE cache_key = ?",
+                (time.time(), cache_key)
+            )
+        return ComplianceReport.model_validate_json(zlib.decompress(row[0]))
+
+    def put(self, cache_key: str, report: ComplianceReport):
+        """写入报告并按容量上限淘汰最久未访问的条目"""
+        payload = zlib.compress(report.model_dump_json().encode('utf-8'))
+        if len(payload) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (cache_key, report, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (cache_key, payload, len(payload), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """LRU 淘汰直到总大小不超过上限（调用方持有锁）"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT cache_key, size FROM results ORDER BY accessed_at").fetchall()
+        for cache_key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE cache_key = ?", (cache_key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """命中率统计"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+
+# 全局结果缓存实例
+result_cache = ResultCache(
+    db_path=settings.result_cache_path,
+    max_bytes=settings.result_cache_max_bytes
+)
@@ -0,0 +1,116 @@
+"""
+违规项聚合
+同一 (规则, 类型, 严重程度, 图层, 关键属性) 的违规项合并为一条，
+只保留数量、少量示例句柄和压缩后的完整句柄列表，避免生成海量违规对象
+"""
+import base64
+import zlib
+from typing import Dict, List, Any, Callable, Hashable, Optional
+
+import numpy as np
+
+from app.models import Violation
+
+
+def pack_handles(handles: List[str]) -> str:
+    """
+    将十六进制句柄列表压缩为字符串
+
+    句柄排序去重后做差分，再 zlib 压缩并 base64 编码；
+    图纸中的句柄大多连续，差分后压缩率很高
+    """
+    values = np.unique(np.fromiter((int(h, 16) for h in handles), dtype=np.uint64, count=len(handles)))
+    deltas = np.diff(values, prepend=np.uint64(0))
+    return base64.b64encode(zlib.compress(deltas.astype('<u8').tobytes())).decode('ascii')
+
+
+def unpack_handles(packed: str) -> List[str]:
+    """pack_handles 的逆操作，返回升序排列的十六进制句柄"""
+    deltas = np.frombuffer(zlib.decompress(base64.b64decode(packed)), dtype='<u8')
+    return [format(value, 'X') for value in np.cumsum(deltas, dtype=np.uint64).tolist()]
+
+
+class _Group:
+    """一组同类违规项"""
+
+    def __init__(self):
+        self.count = 0
+        self.members: List[Dict[str, Any]] = []
+        self.handles: List[str] = []
+
+
+class ViolationGrouper:
+    """按分组键收集违规项，数量达到阈值的组合并为一条违规"""
+
+    def __init__(self, min_size: int, sample_size: int):
+        """
+        Args:
+            min_size: 同类违规达到该数量才合并，否则仍逐条输出
+            sample_size: 合并后保留的示例句柄数量
+        """
+        self.min_size = max(min_size, 2)
+        self.sample_size = sample_size
+        self._groups: Dict[Hashable, _Group] = {}
+
+    def add(self, fields: Dict[str, Any], key: Hashable = None):
+        """
+        记录一条违规
+
+        Args:
+            fields: Violation 的字段（不含 id）
+            key: 关键属性（如线宽值），与规则/类型/严重程度/图层一起组成分组键
+        """
+        handle = fields.get('entity_handle')
+        if handle is None:
+            # 没有图元句柄的全局违规不参与合并
+            group_key = object()
+        else:
+            group_key = (fields['rule'], fields['type'], fields['severity'], fields.get('layer'), key)
+
+        group = self._groups.get(group_key)
+        if group is None:
+            group = self._groups[group_key] = _Group()
+        group.count += 1
+        # 未达到合并阈值前保留完整字段，之后只记录句柄
+        if group.count <= self.min_size:
+            group.members.append(fields)
+        if handle is not None:
+            group.handles.append(handle)
+
+    def build(self, make_violation: Callable[..., Any]) -> List[Any]:
+        """
+        按各组首次出现的顺序生成违规列表
+
+        Args:
+            make_violation: 由字段构造违规记录的函数
+        """
+        violations = []
+        for group in self._groups.values():
+            if group.count < self.min_size:
+                violations.extend(make_violation(**fields) for fields in group.members)
+                continue
+
+            fields = dict(group.members[0])
+            fields['description'] = f"{fields['description']}（同类问题共 {group.count} 处，已合并）"
+            violations.append(make_violation(
+                **fields,
+                count=group.count,
+                sample_handles=group.handles[:self.sample_size],
+                packed_handles=pack_handles(group.handles)
+            ))
+        return violations
+
+
+def violation_handles(violation: Violation) -> List[str]:
+    """违规项涉及的全部图元句柄（合并的违规项展开为完整列表）"""
+    if violation.packed_handles:
+        return unpack_handles(violation.packed_handles)
+    return [violation.entity_handle] if violation.entity_handle else []
+
+
+def find_violation(violations: List[Violation], violation_id: str) -> Optional[Violation]:
+    """按 ID 查找违规项"""
+    for violation in violations:
+        if violation.id == violation_id:
+            return violation
+    return None
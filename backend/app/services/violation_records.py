@@ -0,0 +1,72 @@
+"""
+轻量违规记录
+检查器在热路径上只生成字典记录，不构造 Pydantic 模型；
+生成报告时再通过 TypeAdapter 一次性批量校验为 Violation 列表
+"""
+import hashlib
+from typing import Any, Dict, List, Set
+
+from pydantic import TypeAdapter
+
+from app.models import Violation, ViolationType, SeverityLevel
+
+
+def violation_id(
+    rule: str,
+    violation_type: ViolationType,
+    severity: SeverityLevel,
+    anchor: str
+) -> str:
+    """
+    确定性的违规项 ID
+
+    Args:
+        anchor: 图元句柄；没有句柄的全局违规使用描述文字
+    """
+    key = f"{rule}|{violation_type.value}|{severity.value}|{anchor}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+# 违规记录列表 -> Violation 列表（一次批量校验，由 pydantic-core 在单次调用中完成）
+_VIOLATION_LIST = TypeAdapter(List[Violation])
+
+# 检查器内部使用的违规记录：Violation 字段组成的普通字典（生成报告前不构造模型）
+ViolationRecord = Dict[str, Any]
+
+
+def to_models(records: List[ViolationRecord]) -> List[Violation]:
+    """把违规记录批量转换为 Violation"""
+    return _VIOLATION_LIST.validate_python(records)
+
+
+class ViolationRecordFactory:
+    """为一次检查生成违规记录，保证同一报告内 ID 不重复"""
+
+    def __init__(self):
+        self._ids: Set[str] = set()
+        # (规则, 类型, 严重程度) -> 已写入前缀的哈希对象，每条记录只需追加锚点
+        self._hashers: Dict[tuple, "hashlib.blake2b"] = {}
+
+    def _id(self, rule: str, violation_type: ViolationType, severity: SeverityLevel, anchor: str) -> str:
+        """与 violation_id 结果相同，复用同一规则的哈希前缀"""
+        prefix_key = (rule, violation_type, severity)
+        hasher = self._hashers.get(prefix_key)
+        if hasher is None:
+            prefix = f"{rule}|{violation_type.value}|{severity.value}|"
+            hasher = self._hashers[prefix_key] = hashlib.blake2b(prefix.encode('utf-8'), digest_size=8)
+        hasher = hasher.copy()
+        hasher.update(anchor.encode('utf-8'))
+        return hasher.hexdigest()
+
+    def __call__(self, **fields) -> ViolationRecord:
+        anchor = fields.get('entity_handle') or fields['description']
+        record_id = self._id(fields['rule'], fields['type'], fields['severity'], anchor)
+        if record_id in self._ids:
+            # 同一图元重复触发同一规则时追加序号
+            suffix = 2
+            while f"{record_id}-{suffix}" in self._ids:
+                suffix += 1
+            record_id = f"{record_id}-{suffix}"
+        self._ids.add(record_id)
+        fields['id'] = record_id
+        return fields
@@ -0,0 +1,275 @@
+"""
+分析工作进程池
+将 CPU 密集的 解析 → 检查 流水线放到独立进程中执行，避免阻塞事件循环；
+每个分析受 analysis_timeout 限制，超时或被取消的工作进程先协作退出，必要时强制终止
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.models import AnalysisStage, ComplianceReport
+from app.services.deadline import AnalysisTimeout, Deadline
+from app.services.dxf_parser import DXFParserService
+from app.services.parse_cache import parse_cache
+from app.services.compliance_checker import ComplianceCheckerService
+from app.services.progress import ProgressReporter
+from app.utils.file_hash import hash_file
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+# 工作进程上报进度的队列（每个进程池一个，由转发线程发布到 progress_bus）
+_progress_queue = None
+# 工作进程内由 _init_worker 设置的进度队列
+_worker_progress_queue = None
+# 各槽位的取消标志（每个进程池一个共享内存数组，非 0 表示该槽位的分析已被取消）
+_cancel_flags = None
+# 工作进程内由 _init_worker 设置的取消标志
+_worker_cancel_flags = None
+# 限制同时提交到进程池的分析数（等于进程数），使截止时间从任务实际占用工作进程时开始计算；
+# 任务在工作进程结束前一直占用槽位（取消后也是），不会超额提交
+_slots: Optional[asyncio.Semaphore] = None
+# 空闲的槽位编号（取消标志的下标）
+_free_slots: List[int] = []
+
+
+def _pool_size() -> int:
+    return settings.worker_pool_size or os.cpu_count() or 1
+
+
+def get_worker_pool() -> ProcessPoolExecutor:
+    """获取（首次调用时创建）全局工作进程池"""
+    global _executor, _progress_queue, _cancel_flags
+    if _executor is None:
+        # spawn 启动方式：不继承父进程的事件循环和线程状态
+        mp_context = multiprocessing.get_context("spawn")
+        _progress_queue = mp_context.Queue()
+        _cancel_flags = mp_context.RawArray('b', _pool_size())
+        _executor = ProcessPoolExecutor(
+            max_workers=_pool_size(),
+            mp_context=mp_context,
+            max_tasks_per_child=settings.worker_max_tasks_per_child or None,
+            initializer=_init_worker,
+            initargs=(_progress_queue, _cancel_flags)
+        )
+        threading.Thread(
+            target=_relay_progress,
+            args=(_progress_queue,),
+            name="progress-relay",
+            daemon=True
+        ).start()
+    return _executor
+
+
+def shutdown_worker_pool():
+    """关闭工作进程池（应用退出时调用）"""
+    global _executor, _progress_queue, _cancel_flags
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _progress_queue = None
+        _cancel_flags = None
+
+
+def _init_worker(progress_queue, cancel_flags):
+    """工作进程初始化：保存进度队列和取消标志"""
+    global _worker_progress_queue, _worker_cancel_flags
+    _worker_progress_queue = progress_queue
+    _worker_cancel_flags = cancel_flags
+
+
+def _send_progress(analysis_id: str, fields: Dict[str, Any]):
+    """工作进程内：把进度事件放入进度队列（由队列的后台线程发送，不阻塞解析和检查）"""
+    _worker_progress_queue.put((analysis_id, fields))
+
+
+def _relay_progress(progress_queue):
+    """转发线程：把工作进程的进度事件发布到 progress_bus，所属进程池被替换或关闭后退出"""
+    # 只在 API 进程中导入（工作进程不需要任务存储）
+    from app.services.progress_bus import progress_bus
+    while _progress_queue is progress_queue:
+        try:
+            analysis_id, fields = progress_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        progress_bus.publish_threadsafe(analysis_id, fields)
+
+
+def kill_worker_pool(pool: ProcessPoolExecutor):
+    """
+    强制终止工作进程池的全部进程（任务超时或取消后未能协作退出时调用），下次使用时重建
+
+    ProcessPoolExecutor 无法终止单个任务，任一进程被终止后整个池都不可用，
+    池中其他任务会以 BrokenProcessPool 结束（由 run_analysis 在新池中重试）。
+    """
+    global _executor, _progress_queue, _cancel_flags
+    if _executor is pool:
+        _executor = None
+        _progress_queue = None
+        _cancel_flags = None
+    if hasattr(pool, "kill_workers"):
+        # Python 3.14+：公开接口，终止全部进程并关闭进程池
+        pool.kill_workers()
+        return
+    # 更早的版本没有终止工作进程的公开接口，只能读取内部属性 _processes（{pid: Process}）；
+    # 先取出进程再关闭进程池（shutdown 会清空该属性），然后逐个终止
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.kill()
+
+
+def run_pipeline(
+    file_path: str,
+    analysis_id: str,
+    standard: str,
+    aggregate: bool = False,
+    rules: Optional[List[str]] = None,
+    deadline_at: Optional[float] = None,
+    content_hash: Optional[str] = None,
+    slot: Optional[int] = None
+) -> ComplianceReport:
+    """
+    在工作进程中执行 解析 → 检查 流水线
+
+    Args:
+        file_path: DXF 文件路径
+        analysis_id: 分析任务ID
+        standard: 检查标准
+        aggregate: 是否合并同类违规项
+        rules: 只执行这些检查规则，None 表示全部
+        deadline_at: 截止时刻（time.time()），None 表示不限制
+        content_hash: DXF 内容 SHA-256（解析缓存的键），None 时启用解析缓存则现场计算
+        slot: 槽位编号，分析被取消时在检查点退出
+
+    Returns:
+        合规性报告；超过截止时间（或被取消）时为只含已完成规则的部分报告（partial=True）
+    """
+    cancelled = None
+    if slot is not None and _worker_cancel_flags is not None:
+        flags = _worker_cancel_flags
+        cancelled = lambda: flags[slot] != 0
+    deadline = Deadline.at(deadline_at, settings.analysis_timeout, cancelled)
+    progress = ProgressReporter(
+        analysis_id,
+        _send_progress if _worker_progress_queue is not None else None,
+        settings.progress_interval
+    )
+    checker = ComplianceCheckerService(standard, aggregate=aggregate, rules=rules)
+    progress.stage(AnalysisStage.PARSE, "正在读取 DXF 文件")
+    if content_hash is None and parse_cache.enabled:
+        content_hash = hash_file(file_path)
+    try:
+        # 解析器只提取启用规则需要的图元类型、列和数据段；同一内容已解析过时读取解析缓存
+        dxf_data = DXFParserService().parse_sync(
+            file_path, checker.projection(), deadline, progress.parse, content_hash
+        )
+    except AnalysisTimeout:
+        # 解析阶段超时：没有可检查的数据，返回不含任何规则结果的部分报告
+        return checker.partial_report(analysis_id, file_path)
+    progress.start_rules(len(checker.enabled_rules))
+    return checker.check_sync(dxf_data, analysis_id, file_path, deadline, progress.rule_done)
+
+
+async def run_analysis(
+    file_path: str,
+    analysis_id: str,
+    standard: str,
+    aggregate: bool = False,
+    rules: Optional[List[str]] = None,
+    content_hash: Optional[str] = None
+) -> ComplianceReport:
+    """
+    在工作进程池中执行分析，不阻塞事件循环
+
+    analysis_timeout 从分析占用工作进程时开始计算：到期后工作进程在下一个检查点退出并返回部分报告；
+    超过 analysis_kill_grace 宽限时间仍未返回（如卡在 ezdxf.readfile 中）时强制终止工作进程池，
+    避免单个异常文件长期占用工作进程。
+
+    调用方取消时通过槽位的取消标志通知工作进程在下一个检查点退出，并一直占用槽位到工作进程结束；
+    宽限时间内仍未结束时同样强制终止工作进程池。
+
+    Raises:
+        AnalysisTimeout: 工作进程未能按时退出而被强制终止
+    """
+    global _slots, _free_slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(_pool_size())
+        _free_slots = list(range(_pool_size()))
+    timeout = settings.analysis_timeout or None
+    
+    async with _slots:
+        slot = _free_slots.pop()
+        try:
+            # 因其他任务超时而被连带终止的任务在新池中重试一次
+            for attempt in range(2):
+                pool = get_worker_pool()
+                flags = _cancel_flags
+                deadline_at = time.time() + timeout if timeout else None
+                future = pool.submit(
+                    run_pipeline,
+                    file_path,
+                    analysis_id,
+                    standard,
+                    aggregate,
+                    rules,
+                    deadline_at,
+                    content_hash,
+                    slot
+                )
+                try:
+                    return await _await_worker(
+                        pool,
+                        future,
+                        flags,
+                        slot,
+                        timeout + settings.analysis_kill_grace if timeout else None
+                    )
+                except AnalysisTimeout:
+                    raise
+                except asyncio.TimeoutError:
+                    kill_worker_pool(pool)
+                    raise AnalysisTimeout("worker", timeout)
+                except BrokenProcessPool:
+                    if attempt:
+                        raise
+        finally:
+            _free_slots.append(slot)
+
+
+async def _await_worker(pool: ProcessPoolExecutor, future, flags, slot: int, timeout: Optional[float]):
+    """
+    等待工作进程返回；被取消时通知工作进程退出，等到其结束（或强制终止进程池）后再传播取消
+
+    Raises:
+        asyncio.TimeoutError: 超过 timeout 仍未返回
+    """
+    wrapped = asyncio.wrap_future(future)
+    try:
+        # shield：超时或取消时由这里处理工作进程，不让 wait_for 直接取消等待
+        return await asyncio.wait_for(asyncio.shield(wrapped), timeout)
+    except asyncio.CancelledError:
+        if not future.cancel():
+            # 已在工作进程中运行：设置取消标志，工作进程在下一个检查点返回部分报告
+            flags[slot] = 1
+            try:
+                await asyncio.wait({wrapped}, timeout=settings.analysis_kill_grace or None)
+            finally:
+                if not wrapped.done():
+                    kill_worker_pool(pool)
+        raise
+    finally:
+        flags[slot] = 0
+        # 超时或取消后不再使用的结果：取出异常，避免 "exception was never retrieved" 警告
+        wrapped.add_done_callback(_discard_result)
+
+
+def _discard_result(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
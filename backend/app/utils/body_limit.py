@@ -0,0 +1,83 @@
+"""
+请求体大小限制（ASGI 中间件）
+multipart 表单在进入路由函数之前就会被完整读取并缓存到临时文件，
+路由函数中的大小校验无法限制网络传输；本中间件在读取请求体时累计字节数，
+声明的 Content-Length 或实际接收的字节数超过上限时立即返回 413，不再继续接收。
+"""
+from typing import Iterable
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+
+# multipart 表单中文件内容之外的边界和字段头的余量
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def too_large_detail() -> str:
+    """上传文件过大的错误信息"""
+    return f"文件过大。最大允许大小: {settings.max_upload_size / (1024*1024):.1f}MB"
+
+
+class BodySizeLimitMiddleware:
+    """限制指定路径的请求体大小"""
+
+    def __init__(self, app: ASGIApp, max_body_size: int, paths: Iterable[str]):
+        """
+        Args:
+            app: 下层 ASGI 应用
+            max_body_size: 请求体最大字节数
+            paths: 需要限制的请求路径
+        """
+        self.app = app
+        self.max_body_size = max_body_size
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        rejected = False
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # 分块传输（没有 Content-Length）或声明的长度不实：返回 413，并让下层按客户端断开处理
+                    rejected = True
+                    if not started:
+                        await self._reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message):
+            nonlocal started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # 下层读取请求体时收到断开消息而抛出的异常（已返回 413）
+            if not rejected:
+                raise
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send):
+        response = JSONResponse({"detail": too_large_detail()}, status_code=413)
+        await response(scope, receive, send)
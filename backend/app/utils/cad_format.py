@@ -0,0 +1,63 @@
+"""
+CAD 文件格式识别工具
+"""
+import re
+from pathlib import Path
+from typing import Optional
+
+
+# 二进制 DXF 文件头
+BINARY_DXF_SENTINEL = b"AutoCAD Binary DXF\r\n\x1a\x00"
+
+# DWG 文件头版本标识，如 AC1015 / AC1032
+DWG_MAGIC = re.compile(rb"^AC1\d{3}")
+
+# 识别格式所需的文件头长度
+SNIFF_SIZE = 64
+
+# DWG 版本标识 -> AutoCAD 版本
+DWG_VERSIONS = {
+    "AC1012": "R13",
+    "AC1014": "R14",
+    "AC1015": "R2000",
+    "AC1018": "R2004",
+    "AC1021": "R2007",
+    "AC1024": "R2010",
+    "AC1027": "R2013",
+    "AC1032": "R2018",
+}
+
+
+def sniff_cad_format(head: bytes) -> Optional[str]:
+    """
+    根据文件头识别 CAD 文件格式
+
+    Args:
+        head: 文件开头的若干字节（至少 SNIFF_SIZE 字节，文件更短时为全部内容）
+
+    Returns:
+        "dxf" / "dwg"，无法识别时返回 None
+    """
+    if head.startswith(BINARY_DXF_SENTINEL):
+        return "dxf"
+    if DWG_MAGIC.match(head):
+        return "dwg"
+    # ASCII DXF 以组码 0（SECTION）或 999（注释）开头
+    text = head.lstrip(b"\xef\xbb\xbf").lstrip()
+    if text.startswith(b"0") or text.startswith(b"999"):
+        return "dxf"
+    return None
+
+
+def read_dwg_version(file_path: Path) -> Optional[str]:
+    """
+    读取 DWG 文件头中的版本标识
+
+    Returns:
+        版本标识（如 "AC1032"），不是 DWG 文件时返回 None
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(6)
+    if DWG_MAGIC.match(head):
+        return head.decode('ascii')
+    return None
@@ -0,0 +1,47 @@
+"""
+上传文件内容哈希工具
+"""
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+
+
+# 分块读取大小
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: Path) -> str:
+    """分块计算文件的 SHA-256"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def content_hash_path(file_id: str) -> Path:
+    """文件哈希的存放路径（与上传文件同目录）"""
+    return settings.upload_dir / f"{file_id}.sha256"
+
+
+def save_content_hash(file_id: str, digest: str):
+    """保存上传文件的内容哈希"""
+    content_hash_path(file_id).write_text(digest, encoding='utf-8')
+
+
+def load_content_hash(file_id: str, file_path: Path) -> Optional[str]:
+    """
+    读取上传文件的内容哈希
+
+    旧文件没有哈希记录时现场计算并补存
+    """
+    hash_path = content_hash_path(file_id)
+    if hash_path.exists():
+        return hash_path.read_text(encoding='utf-8').strip()
+    if not file_path.exists():
+        return None
+    digest = hash_file(file_path)
+    save_content_hash(file_id, digest)
+    return digest
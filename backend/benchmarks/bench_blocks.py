@@ -0,0 +1,107 @@
+"""
+块参照展开基准测试：缓存块图元表 + 仿射变换 vs 逐个块参照调用 virtual_entities()
+
+检测对象为前端检查器（frontend/checker）的 DXFParser。
+
+使用方法:
+python benchmarks/bench_blocks.py [--inserts 2000] [--block-entities 50] [--minsert 100]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加前端检查器路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "frontend"))
+
+import ezdxf
+
+from checker.parser import DXFParser
+
+
+def build_drawing(path: Path, inserts: int, block_entities: int, minsert: int, seed: int = 0):
+    """生成含嵌套块、普通块参照和 MINSERT 阵列的图纸"""
+    rng = random.Random(seed)
+    doc = ezdxf.new()
+    part = doc.blocks.new("PART")
+    for _ in range(block_entities):
+        x, y = rng.uniform(0, 20), rng.uniform(0, 20)
+        part.add_line((x, y), (x + rng.uniform(1, 5), y), dxfattribs={"layer": "0", "color": 0})
+    part.add_circle((10, 10), 3)
+    part.add_text("PART", height=3.5, dxfattribs={"insert": (0, 22)})
+    assembly = doc.blocks.new("ASSEMBLY")
+    for i in range(4):
+        assembly.add_blockref("PART", (i * 30, 0), dxfattribs={"rotation": i * 90})
+
+    msp = doc.modelspace()
+    for _ in range(inserts):
+        msp.add_blockref(
+            rng.choice(["PART", "ASSEMBLY"]),
+            (rng.uniform(0, 10000), rng.uniform(0, 10000)),
+            dxfattribs={"rotation": rng.uniform(0, 360), "xscale": 2, "yscale": 2}
+        )
+    if minsert:
+        msp.add_blockref("PART", (0, -1000)).grid(size=(minsert, minsert), spacing=(30, 30))
+    doc.saveas(path)
+
+
+def legacy_expand(file_path: Path) -> int:
+    """旧方式：逐个块参照递归调用 virtual_entities()，MINSERT 逐个阵列单元展开"""
+    doc = ezdxf.readfile(file_path)
+
+    def walk(insert) -> int:
+        count = 0
+        for entity in insert.virtual_entities():
+            if entity.dxftype() == "INSERT":
+                count += walk(entity)
+            else:
+                entity.dxf.layer, entity.dxf.color  # 读取检查所需属性
+                count += 1
+        return count
+
+    total = 0
+    for insert in doc.modelspace().query("INSERT"):
+        for cell in insert.multi_insert():
+            total += walk(cell)
+    return total
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="块参照展开基准测试")
+    arg_parser.add_argument("--inserts", type=int, default=2000, help="块参照数量")
+    arg_parser.add_argument("--block-entities", type=int, default=50, help="块内 LINE 数量")
+    arg_parser.add_argument("--minsert", type=int, default=100, help="MINSERT 阵列行列数（0 表示不生成）")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "blocks.dxf"
+        print(f"生成图纸: {args.inserts} 块参照, 块内 {args.block_entities} LINE, MINSERT {args.minsert}×{args.minsert} ...")
+        build_drawing(path, args.inserts, args.block_entities, args.minsert)
+
+        start = time.perf_counter()
+        baseline = DXFParser(max_block_depth=0).parse(str(path))
+        unexpanded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data = DXFParser().parse(str(path))
+        expanded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        legacy_count = legacy_expand(path)
+        legacy = time.perf_counter() - start
+
+    entity_count = sum(len(items) for items in data["entities"].values())
+    baseline_count = sum(len(items) for items in baseline["entities"].values())
+    print("=" * 60)
+    print(f"展开后图元数:       {entity_count}（不展开 {baseline_count}）")
+    print(f"virtual_entities 图元数: {legacy_count}")
+    print(f"不展开解析:         {unexpanded:.3f}s")
+    print(f"块图元表展开解析:   {expanded:.3f}s")
+    print(f"virtual_entities:   {legacy:.3f}s（含读取文件）")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+合规检查基准测试：向量化的线宽/颜色/字高检查 vs 旧的逐图元循环
+
+使用方法:
+python benchmarks/bench_checker.py [--entities 500000] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import Violation, ViolationType, SeverityLevel
+from app.services.check_rules import RuleContext
+from app.services.compliance_checker import ComplianceCheckerService, check_rules
+from app.services.violation_records import ViolationRecordFactory
+from app.services.entity_table import EntityTableBuilder, LINEAR_TYPES
+
+# 线宽取值（1/100 mm）：标准值（含 ByLayer/ByBlock）与非标准值
+STANDARD_LINEWEIGHTS = [-1, -2, 25, 35, 50]
+NON_STANDARD_LINEWEIGHTS = [13, 18, 70, 100, 140]
+STANDARD_HEIGHTS = [2.5, 3.5, 5.0, 7.0]
+NON_STANDARD_HEIGHTS = [1.0, 1.5, 25.0, 30.0]
+
+
+def build_table(lines: int, texts: int, violation_ratio: float, seed: int = 0):
+    """直接构建列式图元表（不经过 ezdxf，便于生成大规模数据）"""
+    rng = random.Random(seed)
+    builder = EntityTableBuilder()
+    handle = 0x100
+    for _ in range(lines):
+        handle += 1
+        weights = NON_STANDARD_LINEWEIGHTS if rng.random() < violation_ratio else STANDARD_LINEWEIGHTS
+        builder.add(
+            "LINE", format(handle, 'X'), f"LAYER_{rng.randrange(50)}",
+            rng.choice([256, 256, 256, 1, 3, 7]), "Continuous", rng.choice(weights),
+            x0=0.0, y0=0.0, x1=rng.uniform(0, 1000), y1=rng.uniform(0, 1000)
+        )
+    for _ in range(texts):
+        handle += 1
+        heights = NON_STANDARD_HEIGHTS if rng.random() < violation_ratio else STANDARD_HEIGHTS
+        builder.add(
+            "TEXT", format(handle, 'X'), "TEXT", 256, "Continuous", -1,
+            x0=rng.uniform(0, 1000), y0=rng.uniform(0, 1000),
+            size=rng.choice(heights), text="A"
+        )
+    return builder.build()
+
+
+def legacy_checks(rules: dict, entities: dict, texts: list) -> list:
+    """旧实现：逐个图元字典计算，违规项的构建方式与向量化版本相同"""
+    violations = []
+    lw_rules = rules['lineweights']
+    tolerance = lw_rules['tolerance']
+    standard_weights = [lw_rules['thick_line'], lw_rules['medium_line'], lw_rules['thin_line']]
+    for entity_type in LINEAR_TYPES:
+        for entity in entities.get(entity_type, []):
+            lineweight = entity.get('lineweight', -1)
+            if lineweight < 0:
+                continue
+            lineweight_mm = lineweight / 100.0
+            if not any(abs(lineweight_mm - std) <= tolerance for std in standard_weights):
+                recommended = min(standard_weights, key=lambda x: abs(x - lineweight_mm))
+                violations.append(Violation(
+                    id=str(uuid.uuid4()),
+                    type=ViolationType.LINEWEIGHT,
+                    severity=SeverityLevel.WARNING,
+                    rule="GB/T 14665-2012 表1 - 线宽规则",
+                    description=f"线宽 {lineweight_mm:.2f}mm 不符合标准",
+                    entity_handle=entity['handle'],
+                    layer=entity['layer'],
+                    entity_details={"entity_type": entity_type, "recommended_lineweight": recommended},
+                    suggestion=f"使用标准线宽: {recommended}mm"
+                ))
+
+    default_color = rules['colors']['default']
+    non_standard_colors = []
+    for entity_list in entities.values():
+        for entity in entity_list:
+            color = entity.get('color', default_color)
+            if color not in [default_color, 256, 0] and 1 <= color <= 255:
+                non_standard_colors.append((entity, color))
+
+    fonts = rules['fonts']
+    for text in texts:
+        height = text['height']
+        if height < fonts['min_height'] or height > fonts['max_height']:
+            violations.append(Violation(
+                id=str(uuid.uuid4()),
+                type=ViolationType.FONT,
+                severity=SeverityLevel.WARNING,
+                rule="GB/T 14665-2012 表3 - 字体规则",
+                description=f"文字高度 {height:.1f}mm 不符合要求",
+                entity_handle=text['handle'],
+                layer=text['layer'],
+                suggestion="调整文字高度"
+            ))
+    return violations
+
+
+def vectorized_checks(checker: ComplianceCheckerService, dxf_data: dict) -> int:
+    """新实现：ComplianceCheckerService 的向量化检查"""
+    make_violation = ViolationRecordFactory()
+    count = 0
+    for name in ("lineweights", "colors", "fonts"):
+        ctx = RuleContext(name)
+        check_rules.get(name).check(checker, dxf_data, ctx)
+        count += len(ctx.build(make_violation))
+    return count
+
+
+def best_of(func, repeat: int) -> float:
+    """多次运行取最短耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="合规检查基准测试")
+    arg_parser.add_argument("--entities", type=int, default=500000, help="LINE 图元数量")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    arg_parser.add_argument("--violation-ratio", type=float, default=0.01, help="非标准线宽/字高的比例")
+    args = arg_parser.parse_args()
+
+    print(f"生成列式图元表: {args.entities} LINE ...")
+    table = build_table(args.entities, args.entities // 20, args.violation_ratio)
+
+    # 旧版数据结构：每个图元一个字典
+    entities = {name: list(view) for name, view in table.items()}
+    texts = entities["TEXT"]
+    dxf_data = {"entities": table, "texts": texts}
+
+    checker = ComplianceCheckerService()
+    legacy = best_of(lambda: legacy_checks(checker.rules, entities, texts), args.repeat)
+    vectorized = best_of(lambda: vectorized_checks(checker, dxf_data), args.repeat)
+
+    print("=" * 60)
+    print(f"图元总数:           {table.row_count}")
+    print(f"违规项数:           {vectorized_checks(checker, dxf_data)}")
+    print(f"逐图元循环:         {legacy:.3f}s")
+    print(f"向量化检查:         {vectorized:.3f}s")
+    print(f"检查阶段加速比:     {legacy / vectorized:.2f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
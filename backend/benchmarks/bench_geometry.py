@@ -0,0 +1,127 @@
+"""
+几何关系基准测试：STRtree 批量查询的尺寸线-文字相交检测 vs 旧的逐对 intersects 循环，
+以及排序扫描的尺寸文字对齐分组
+
+检测对象为前端检查器（frontend/checker）的 GeometryEngine。
+
+使用方法:
+python benchmarks/bench_geometry.py [--dimensions 2000] [--texts 2000] [--repeat 3]
+python benchmarks/bench_geometry.py --dimensions 20000 --texts 20000 --skip-legacy
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# 添加前端检查器路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "frontend"))
+
+from checker.geometry import GeometryEngine
+from checker.models import Violation, ViolationType, SeverityLevel
+
+
+def build_data(dimensions: int, texts: int, extent: float, seed: int = 0):
+    """生成随机分布的线性尺寸和文字（与解析器输出的字典结构相同）"""
+    rng = random.Random(seed)
+    dims = []
+    for i in range(dimensions):
+        x, y = rng.uniform(0, extent), rng.uniform(0, extent)
+        length = rng.uniform(5, 50)
+        horizontal = rng.random() < 0.5
+        dims.append({
+            "handle": format(0x100 + i, 'X'),
+            "layer": "DIM",
+            "dimension_kind": 0,
+            "angle": 0.0 if horizontal else 90.0,
+            "geometry": True,
+            "defpoint": (x, y),
+            "defpoint2": (x, y - 5) if horizontal else (x - 5, y),
+            "defpoint3": (x + length, y - 5) if horizontal else (x - 5, y + length),
+            "text_position": (x + length / 2, y + 1) if horizontal else (x - 1, y + length / 2),
+        })
+    txts = []
+    for i in range(texts):
+        txts.append({
+            "handle": format(0x100 + dimensions + i, 'X'),
+            "layer": "TEXT",
+            "text": "A" * rng.randint(1, 8),
+            "height": rng.choice([2.5, 3.5, 5.0]),
+            "position": (rng.uniform(0, extent), rng.uniform(0, extent)),
+        })
+    return dims, txts
+
+
+def legacy_overlap(engine: GeometryEngine, dimensions: list, texts: list) -> list:
+    """旧实现：每个尺寸与每个文字逐对计算，文字框在内层循环中重复构造"""
+    violations = []
+    for dim in dimensions:
+        dim_line = engine._create_dimension_line(dim)
+        if not dim_line:
+            continue
+        for text in texts:
+            if 'position' not in text or 'height' not in text:
+                continue
+            if dim_line.intersects(engine._create_text_bbox(text)):
+                violations.append(Violation(
+                    id=str(uuid.uuid4()),
+                    type=ViolationType.GEOMETRY,
+                    severity=SeverityLevel.WARNING,
+                    rule="GB/T 14665-2012 - 尺寸线与文字不应相交",
+                    description=f"尺寸线与文字 '{text.get('text', '')[:20]}...' 发生相交",
+                    entity_handle=dim.get('handle'),
+                    layer=dim.get('layer'),
+                    suggestion="调整尺寸线或文字位置，避免遮挡"
+                ))
+    return violations
+
+
+def best_of(func, repeat: int) -> float:
+    """多次运行取最短耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="几何关系基准测试")
+    arg_parser.add_argument("--dimensions", type=int, default=2000, help="尺寸标注数量")
+    arg_parser.add_argument("--texts", type=int, default=2000, help="文字数量")
+    arg_parser.add_argument("--extent", type=float, default=5000.0, help="图纸范围（mm）")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    arg_parser.add_argument("--skip-legacy", action="store_true", help="跳过逐对循环（规模很大时）")
+    args = arg_parser.parse_args()
+
+    print(f"生成数据: {args.dimensions} 尺寸, {args.texts} 文字 ...")
+    dims, texts = build_data(args.dimensions, args.texts, args.extent)
+    engine = GeometryEngine()
+
+    indexed_violations = engine.check_dimension_text_overlap(dims, texts)
+    indexed = best_of(lambda: engine.check_dimension_text_overlap(dims, texts), args.repeat)
+    alignment_violations = engine.check_dimension_alignment(dims)
+    alignment = best_of(lambda: engine.check_dimension_alignment(dims), args.repeat)
+
+    print("=" * 60)
+    print(f"相交对数:           {len(indexed_violations)}")
+    print(f"STRtree 批量查询:   {indexed:.3f}s")
+    print(f"未对齐尺寸组:       {len(alignment_violations)}")
+    print(f"排序扫描对齐分组:   {alignment:.3f}s")
+    if not args.skip_legacy:
+        # 逐对循环很慢，只运行一次
+        start = time.perf_counter()
+        legacy_violations = legacy_overlap(engine, dims, texts)
+        legacy = time.perf_counter() - start
+        same = [(v.entity_handle, v.description) for v in legacy_violations] == \
+            [(v.entity_handle, v.description) for v in indexed_violations]
+        print(f"逐对循环:           {legacy:.3f}s")
+        print(f"结果一致:           {same}")
+        print(f"加速比:             {legacy / indexed:.2f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+图层规则基准测试：预编译图层匹配器 vs 旧的逐图元子串扫描
+
+使用方法:
+python benchmarks/bench_layers.py [--entities 300000] [--layers 2000] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.check_rules import RuleContext
+from app.services.compliance_checker import ComplianceCheckerService, DIMENSION_TEXT_LAYER
+from app.services.entity_table import EntityTableBuilder
+
+# 图层名前缀：多数命中规则中的 expected_names，少量不命中
+MATCHING_PREFIXES = ["DIM", "DIMENSION", "尺寸", "TEXT", "NOTE", "文字"]
+OTHER_PREFIXES = ["PART", "ASSY", "图框", "LAYER"]
+
+
+def build_table(entities: int, layers: int, violation_ratio: float, seed: int = 0):
+    """生成只含 DIMENSION 和 TEXT 的列式图元表，图层名从大量图层中随机选取"""
+    rng = random.Random(seed)
+    layer_names = []
+    for i in range(layers):
+        prefixes = OTHER_PREFIXES if rng.random() < violation_ratio else MATCHING_PREFIXES
+        layer_names.append(f"{rng.choice(prefixes)}_{i:05d}_{rng.choice(['a', 'b', 'c'])}")
+
+    builder = EntityTableBuilder()
+    for i in range(entities):
+        entity_type = "DIMENSION" if i % 3 == 0 else "TEXT"
+        builder.add(
+            entity_type, format(0x100 + i, 'X'), rng.choice(layer_names), 256, "Continuous", -1,
+            x0=0.0, y0=0.0, size=3.5, text="A" if entity_type == "TEXT" else None
+        )
+    return builder.build()
+
+
+def legacy_classify(rules: dict, table) -> tuple:
+    """旧实现：每个图元都对所有 expected_names 做一次 upper() + 子串扫描"""
+    expected_dim_layers = rules['尺寸层']['expected_names']
+    expected_text_layers = rules['文字层']['expected_names']
+    flagged_dims = []
+    for row in table.rows('DIMENSION').tolist():
+        layer = table.layer_name(row)
+        if not any(exp_name.upper() in layer.upper() for exp_name in expected_dim_layers):
+            flagged_dims.append(row)
+    flagged_texts = []
+    for row in table.rows('TEXT', 'MTEXT').tolist():
+        layer = table.layer_name(row)
+        if 'DIM' in layer.upper() or '尺寸' in layer:
+            continue
+        if not any(exp_name.upper() in layer.upper() for exp_name in expected_text_layers):
+            flagged_texts.append(row)
+    return flagged_dims, flagged_texts
+
+
+def matcher_classify(checker: ComplianceCheckerService, table) -> tuple:
+    """新实现：每个不同图层名分类一次，图元按图层编号查表"""
+    layers = table.layers
+    dim_ok = checker.layer_matcher.mask(layers, '尺寸层')
+    text_ok = checker.layer_matcher.mask(layers, '文字层') | np.fromiter(
+        (DIMENSION_TEXT_LAYER.search(name.upper()) is not None for name in layers),
+        dtype=bool,
+        count=len(layers)
+    )
+    dim_rows = table.rows('DIMENSION')
+    text_rows = table.rows('TEXT', 'MTEXT')
+    flagged_dims = dim_rows[~dim_ok[table.layer_id[dim_rows]]].tolist()
+    flagged_texts = text_rows[~text_ok[table.layer_id[text_rows]]].tolist()
+    return flagged_dims, flagged_texts
+
+
+def best_of(func, repeat: int) -> float:
+    """多次运行取最短耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="图层规则基准测试")
+    arg_parser.add_argument("--entities", type=int, default=300000, help="DIMENSION + TEXT 图元数量")
+    arg_parser.add_argument("--layers", type=int, default=2000, help="不同图层名数量")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    arg_parser.add_argument("--violation-ratio", type=float, default=0.01, help="不符合规则的图层比例")
+    args = arg_parser.parse_args()
+
+    print(f"生成列式图元表: {args.entities} 图元, {args.layers} 图层 ...")
+    table = build_table(args.entities, args.layers, args.violation_ratio)
+    checker = ComplianceCheckerService()
+    rules = checker.rules['layers']
+
+    assert legacy_classify(rules, table) == matcher_classify(checker, table)
+
+    def fresh_matcher():
+        # 每轮重新构建匹配器，计入按图层名分类的开销
+        checker.layer_matcher = type(checker.layer_matcher)(rules)
+        return matcher_classify(checker, table)
+
+    legacy = best_of(lambda: legacy_classify(rules, table), args.repeat)
+    matcher = best_of(fresh_matcher, args.repeat)
+
+    def full_check():
+        ctx = RuleContext("layers")
+        checker._check_layers({"entities": table}, ctx)
+        return ctx
+
+    full = best_of(full_check, args.repeat)
+
+    print("=" * 60)
+    print(f"图元总数:           {table.row_count}")
+    print(f"不同图层名:         {len(table.layers)}")
+    print(f"违规项数:           {len(full_check().violations)}")
+    print(f"逐图元子串扫描:     {legacy:.3f}s")
+    print(f"预编译匹配器:       {matcher:.3f}s")
+    print(f"分类阶段加速比:     {legacy / matcher:.2f}x")
+    print(f"完整图层检查:       {full:.3f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+解析缓存基准测试：ezdxf 解析 vs 从 .npz 解析缓存内存映射读取，
+模拟同一图纸按第二个标准重新检查
+
+使用方法:
+python benchmarks/bench_parse_cache.py [--entities 50000] [--file existing.dxf]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import build_drawing
+
+from app.services.compliance_checker import ComplianceCheckerService
+from app.services.dxf_parser import DXFParserService
+from app.services.parse_cache import ParseCache
+from app.utils.file_hash import hash_file
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="解析缓存基准测试")
+    arg_parser.add_argument("--entities", type=int, default=50000, help="LINE 数量（生成合成图纸时）")
+    arg_parser.add_argument("--file", type=str, default=None, help="使用已有的 DXF 文件")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.file:
+            path = Path(args.file)
+        else:
+            path = Path(temp_dir) / "drawing.dxf"
+            print(f"生成合成图纸: {args.entities} LINE ...")
+            build_drawing(
+                path,
+                lines=args.entities,
+                circles=args.entities // 10,
+                texts=args.entities // 10,
+                dimensions=args.entities // 100
+            )
+        cache = ParseCache(Path(temp_dir) / "parse_cache", 1024 * 1024 * 1024)
+        parser = DXFParserService(cache=cache)
+        checker = ComplianceCheckerService()
+        projection = checker.projection()
+
+        start = time.perf_counter()
+        content_hash = hash_file(path)
+        hashing = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parsed = parser.parse_sync(str(path), projection)
+        parse_time = time.perf_counter() - start
+
+        # 第一次检查：解析并写入缓存
+        start = time.perf_counter()
+        parser.parse_sync(str(path), projection, content_hash=content_hash)
+        miss = time.perf_counter() - start
+
+        # 第二次检查：读取缓存
+        start = time.perf_counter()
+        cached = parser.parse_sync(str(path), projection, content_hash=content_hash)
+        hit = time.perf_counter() - start
+
+        report = checker.check_sync(parsed, "bench", str(path))
+        cached_report = ComplianceCheckerService().check_sync(cached, "bench", str(path))
+        cache_size = sum(item.stat().st_size for item in cache.cache_dir.glob("*.npz"))
+        file_size = path.stat().st_size
+
+    print("=" * 60)
+    print(f"文件大小:           {file_size / 1024 / 1024:.1f} MB")
+    print(f"缓存文件大小:       {cache_size / 1024 / 1024:.1f} MB")
+    print(f"违规项数:           {report.total_violations} / {cached_report.total_violations}")
+    print(f"内容哈希:           {hashing:.3f}s")
+    print(f"ezdxf 解析:         {parse_time:.3f}s")
+    print(f"解析并写入缓存:     {miss:.3f}s")
+    print(f"读取缓存:           {hit:.3f}s")
+    print(f"加速比:             {parse_time / (hit + hashing):.1f}x（含内容哈希）")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
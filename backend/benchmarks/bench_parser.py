@@ -0,0 +1,126 @@
+"""
+DXF 解析基准测试：单次遍历访问器 vs 旧的多次遍历提取
+
+使用方法:
+python benchmarks/bench_parser.py [--entities 200000] [--repeat 3]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import ezdxf
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.dxf_parser import DXFParserService
+from synthetic import build_drawing
+
+
+def multi_pass_extract(doc) -> dict:
+    """旧实现：entities / DIMENSION / TEXT MTEXT / 计数各遍历一次模型空间"""
+    msp = doc.modelspace()
+    entities = {"LINE": [], "CIRCLE": [], "TEXT": [], "MTEXT": [], "DIMENSION": [], "OTHER": []}
+    for entity in msp:
+        entity_type = entity.dxftype()
+        data = {
+            "handle": entity.dxf.handle,
+            "layer": entity.dxf.layer,
+            "color": entity.dxf.color,
+            "linetype": entity.dxf.linetype,
+            "lineweight": getattr(entity.dxf, 'lineweight', -1)
+        }
+        if entity_type == "LINE":
+            data.update({"start": (entity.dxf.start.x, entity.dxf.start.y), "end": (entity.dxf.end.x, entity.dxf.end.y)})
+        elif entity_type == "CIRCLE":
+            data.update({"center": (entity.dxf.center.x, entity.dxf.center.y), "radius": entity.dxf.radius})
+        elif entity_type in ["TEXT", "MTEXT"]:
+            height = entity.dxf.height if entity_type == "TEXT" else getattr(entity.dxf, 'char_height', 2.5)
+            text = entity.dxf.text if entity_type == "TEXT" else entity.text
+            data.update({"text": text, "height": height, "position": (entity.dxf.insert.x, entity.dxf.insert.y)})
+        entities.get(entity_type, entities["OTHER"]).append(data)
+    
+    dimensions = []
+    for dim in msp.query('DIMENSION'):
+        dim_data = {"handle": dim.dxf.handle, "layer": dim.dxf.layer, "text_height": getattr(dim.dxf, 'dimtxt', 0)}
+        try:
+            dim_data["measurement"] = dim.get_measurement()
+        except Exception:
+            pass
+        dimensions.append(dim_data)
+    
+    texts = []
+    for text_entity in msp.query('TEXT MTEXT'):
+        if text_entity.dxftype() == "TEXT":
+            height, text = text_entity.dxf.height, text_entity.dxf.text
+        else:
+            height, text = getattr(text_entity.dxf, 'char_height', 2.5), text_entity.text
+        texts.append({
+            "handle": text_entity.dxf.handle,
+            "layer": text_entity.dxf.layer,
+            "text": text,
+            "height": height,
+            "position": (text_entity.dxf.insert.x, text_entity.dxf.insert.y),
+            "rotation": getattr(text_entity.dxf, 'rotation', 0),
+            "style": getattr(text_entity.dxf, 'style', 'Standard')
+        })
+    
+    return {"entities": entities, "dimensions": dimensions, "texts": texts, "entity_count": len(list(msp))}
+
+
+def single_pass_extract(doc) -> dict:
+    """新实现：DXFParserService 的单次遍历访问器"""
+    parser = DXFParserService()
+    parser.doc = doc
+    parser.modelspace = doc.modelspace()
+    return parser._walk_modelspace()
+
+
+def best_of(func, doc, repeat: int) -> float:
+    """多次运行取最短耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(doc)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="DXF 解析基准测试")
+    arg_parser.add_argument("--entities", type=int, default=200000, help="LINE 图元数量")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = arg_parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.dxf"
+        print(f"生成合成图纸: {args.entities} LINE ...")
+        build_drawing(
+            path,
+            lines=args.entities,
+            circles=args.entities // 20,
+            texts=args.entities // 20,
+            dimensions=args.entities // 200
+        )
+        
+        start = time.perf_counter()
+        doc = ezdxf.readfile(path)
+        read_time = time.perf_counter() - start
+        
+        multi = best_of(multi_pass_extract, doc, args.repeat)
+        single = best_of(single_pass_extract, doc, args.repeat)
+        
+        print("=" * 60)
+        print(f"图元总数:           {len(doc.modelspace())}")
+        print(f"ezdxf.readfile:     {read_time:.3f}s")
+        print(f"多次遍历提取:       {multi:.3f}s")
+        print(f"单次遍历提取:       {single:.3f}s")
+        print(f"提取阶段加速比:     {multi / single:.2f}x")
+        print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+解析投影基准测试：完整提取 vs 按启用规则投影提取（默认只启用线宽规则）
+
+使用方法:
+python benchmarks/bench_projection.py [--entities 200000] [--rules lineweights] [--repeat 3]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import ezdxf
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.compliance_checker import ComplianceCheckerService
+from app.services.block_expander import DocumentBlocks
+from app.services.dxf_parser import DXFParserService
+from app.services.parse_projection import FULL_PROJECTION
+from synthetic import build_drawing
+
+
+def extract(doc, projection):
+    """只计时模型空间提取阶段（不含 ezdxf.readfile）"""
+    parser = DXFParserService()
+    parser.doc = doc
+    parser.modelspace = doc.modelspace()
+    return parser._walk_modelspace(
+        parser.modelspace, len(parser.modelspace), projection, blocks=DocumentBlocks(doc)
+    )
+
+
+def best_of(func, repeat: int) -> float:
+    """多次运行取最短耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="解析投影基准测试")
+    arg_parser.add_argument("--entities", type=int, default=200000, help="LINE 图元数量")
+    arg_parser.add_argument("--rules", default="lineweights", help="启用的检查规则（逗号分隔）")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = arg_parser.parse_args()
+
+    checker = ComplianceCheckerService(rules=args.rules.split(","))
+    projection = checker.projection()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.dxf"
+        print(f"生成合成图纸: {args.entities} LINE ...")
+        build_drawing(
+            path,
+            lines=args.entities,
+            circles=args.entities // 20,
+            texts=args.entities // 5,
+            dimensions=args.entities // 20
+        )
+
+        # 投影提取的检查结果应与完整提取一致
+        full_data = DXFParserService().parse_sync(str(path))
+        projected_data = DXFParserService().parse_sync(str(path), projection)
+        exclude = {'analysis_time', 'rule_timings'}
+        assert checker.check_sync(full_data, "bench", str(path)).model_dump(exclude=exclude) == \
+            checker.check_sync(projected_data, "bench", str(path)).model_dump(exclude=exclude)
+
+        doc = ezdxf.readfile(path)
+        full_extract = best_of(lambda: extract(doc, FULL_PROJECTION), args.repeat)
+        projected_extract = best_of(lambda: extract(doc, projection), args.repeat)
+        full_parse = best_of(lambda: DXFParserService().parse_sync(str(path)), args.repeat)
+        projected_parse = best_of(lambda: DXFParserService().parse_sync(str(path), projection), args.repeat)
+
+        print("=" * 60)
+        print(f"图元总数:           {len(doc.modelspace())}")
+        print(f"启用规则:           {args.rules}")
+        print(f"投影:               {projection.describe()}")
+        print(f"提取阶段 完整:      {full_extract:.3f}s")
+        print(f"提取阶段 投影:      {projected_extract:.3f}s  ({full_extract / projected_extract:.2f}x)")
+        print(f"完整解析 完整:      {full_parse:.3f}s")
+        print(f"完整解析 投影:      {projected_parse:.3f}s  ({full_parse / projected_parse:.2f}x)")
+        print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+检查规则执行基准测试：顺序执行 vs 线程池并发执行，并输出各规则耗时
+
+使用方法:
+python benchmarks/bench_rules.py [--entities 500000] [--workers 4] [--repeat 3]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.services.compliance_checker import ComplianceCheckerService
+from bench_checker import build_table
+
+
+def best_of(func, repeat: int):
+    """多次运行取最短耗时，同时返回最后一次的结果"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="检查规则执行基准测试")
+    arg_parser.add_argument("--entities", type=int, default=500000, help="LINE 图元数量")
+    arg_parser.add_argument("--workers", type=int, default=4, help="并发线程数")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    arg_parser.add_argument("--violation-ratio", type=float, default=0.01, help="非标准线宽/字高的比例")
+    args = arg_parser.parse_args()
+
+    print(f"生成列式图元表: {args.entities} LINE ...")
+    table = build_table(args.entities, args.entities // 20, args.violation_ratio)
+    dxf_data = {"filename": "bench.dxf", "entities": table, "dimensions": [], "texts": []}
+
+    def run(workers: int):
+        settings.check_rule_workers = workers
+        return ComplianceCheckerService().check_sync(dxf_data, "bench", "bench.dxf")
+
+    sequential, report = best_of(lambda: run(1), args.repeat)
+    parallel, parallel_report = best_of(lambda: run(args.workers), args.repeat)
+
+    # 并发执行不应改变报告内容
+    exclude = {'analysis_time', 'rule_timings'}
+    assert report.model_dump(exclude=exclude) == parallel_report.model_dump(exclude=exclude)
+
+    print("=" * 60)
+    print(f"图元总数:           {table.row_count}")
+    print(f"违规项数:           {report.total_violations}")
+    print(f"顺序执行:           {sequential:.3f}s")
+    print(f"并发执行 ({args.workers} 线程):  {parallel:.3f}s")
+    print(f"加速比:             {sequential / parallel:.2f}x")
+    print("各规则耗时 (ms，顺序 / 并发):")
+    for name, elapsed in report.rule_timings.items():
+        print(f"  {name:<12} {elapsed:>10.3f} / {parallel_report.rule_timings[name]:.3f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
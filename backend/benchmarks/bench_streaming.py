@@ -0,0 +1,86 @@
+"""
+流式解析基准测试：ezdxf.readfile 全量解析 vs 流式解析的耗时和峰值内存
+
+每种模式在独立的子进程中运行，峰值内存取子进程的最大常驻内存（ru_maxrss）。
+
+使用方法:
+python benchmarks/bench_streaming.py [--entities 200000] [--file existing.dxf]
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import build_drawing
+
+
+def run_mode(file_path: str, streaming: bool, results):
+    """子进程：按指定模式解析并检查，回传耗时、峰值内存和违规数"""
+    from app.services.compliance_checker import ComplianceCheckerService
+    from app.services.dxf_parser import DXFParserService
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    checker = ComplianceCheckerService()
+    parser = DXFParserService(streaming_threshold=1 if streaming else 0)
+    start = time.perf_counter()
+    dxf_data = parser.parse_sync(file_path, checker.projection())
+    parse_time = time.perf_counter() - start
+    report = checker.check_sync(dxf_data, "bench", file_path)
+    # ru_maxrss 在 Linux 上以 KB 为单位
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((parse_time, peak / 1024, (peak - baseline) / 1024, report.total_violations))
+
+
+def measure(file_path: str, streaming: bool):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_mode, args=(file_path, streaming, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="流式解析基准测试")
+    arg_parser.add_argument("--entities", type=int, default=200000, help="LINE 数量（生成合成图纸时）")
+    arg_parser.add_argument("--file", type=str, default=None, help="使用已有的 DXF 文件")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.file:
+            path = Path(args.file)
+        else:
+            path = Path(temp_dir) / "large.dxf"
+            print(f"生成合成图纸: {args.entities} LINE ...")
+            build_drawing(
+                path,
+                lines=args.entities,
+                circles=args.entities // 10,
+                texts=args.entities // 10,
+                dimensions=args.entities // 100
+            )
+        size = path.stat().st_size / 1024 / 1024
+
+        full = measure(str(path), streaming=False)
+        streamed = measure(str(path), streaming=True)
+
+    print("=" * 60)
+    print(f"文件大小:           {size:.1f} MB")
+    print(f"违规项数:           {full[3]} / {streamed[3]}")
+    print(f"全量解析耗时:       {full[0]:.2f}s")
+    print(f"流式解析耗时:       {streamed[0]:.2f}s")
+    print(f"全量解析峰值内存:   {full[1]:.0f} MB（解析与检查增加 {full[2]:.0f} MB）")
+    print(f"流式解析峰值内存:   {streamed[1]:.0f} MB（解析与检查增加 {streamed[2]:.0f} MB）")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
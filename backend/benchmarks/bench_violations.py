@@ -0,0 +1,117 @@
+"""
+违规项构造基准测试：字典记录 + 批量校验 vs 逐条 Pydantic 校验
+
+使用方法:
+python benchmarks/bench_violations.py [--violations 100000] [--repeat 3]
+"""
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import ComplianceReport, Violation, ViolationType, SeverityLevel
+from app.services.violation_records import ViolationRecordFactory, to_models
+
+
+def make_fields(count: int) -> list:
+    """生成与线宽检查相同形状的违规字段"""
+    return [
+        dict(
+            type=ViolationType.LINEWEIGHT,
+            severity=SeverityLevel.WARNING,
+            rule="GB/T 14665-2012 线宽标准",
+            description=f"线宽 {i % 7 * 0.05:.2f}mm 不符合标准",
+            entity_handle=format(0x100 + i, 'X'),
+            layer="0",
+            location={"x": float(i), "y": 0.0},
+            entity_details={"lineweight": i % 7 * 0.05},
+            suggestion="建议使用 0.25mm"
+        )
+        for i in range(count)
+    ]
+
+
+def make_report(violations: list, construct: bool) -> ComplianceReport:
+    """构造报告；construct=True 时跳过校验"""
+    fields = dict(
+        analysis_id="bench",
+        file_id="bench",
+        filename="bench.dxf",
+        standard="GB/T 14665-2012",
+        analysis_time=datetime(2024, 1, 1),
+        total_violations=len(violations),
+        critical_count=0,
+        warning_count=len(violations),
+        info_count=0,
+        violations=violations,
+        is_compliant=False,
+        compliance_score=0.0
+    )
+    if construct:
+        return ComplianceReport.model_construct(**fields)
+    return ComplianceReport(**fields)
+
+
+def legacy_build(fields_list: list) -> ComplianceReport:
+    """旧实现：每条违规 uuid4 + Pydantic 校验，报告再整体校验一次"""
+    violations = [Violation(id=str(uuid.uuid4()), **fields) for fields in fields_list]
+    return make_report(violations, construct=False)
+
+
+def record_build(fields_list: list) -> ComplianceReport:
+    """新实现：热路径生成字典记录，报告边界一次批量校验"""
+    factory = ViolationRecordFactory()
+    records = [factory(**fields) for fields in fields_list]
+    return make_report(to_models(records), construct=True)
+
+
+def records_build(fields_list: list) -> list:
+    """仅生成记录（检查器热路径上的开销）"""
+    factory = ViolationRecordFactory()
+    return [factory(**fields) for fields in fields_list]
+
+
+def best_of(func, repeat: int) -> float:
+    """多次运行取最短耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="违规项构造基准测试")
+    arg_parser.add_argument("--violations", type=int, default=100000, help="违规项数量")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = arg_parser.parse_args()
+
+    fields_list = make_fields(args.violations)
+
+    # 两种方式生成的报告除 ID 外应完全一致
+    exclude = {'violations': {'__all__': {'id'}}}
+    assert legacy_build(fields_list).model_dump(exclude=exclude) == \
+        record_build(fields_list).model_dump(exclude=exclude)
+
+    legacy = best_of(lambda: legacy_build(fields_list), args.repeat)
+    record = best_of(lambda: record_build(fields_list), args.repeat)
+    records_only = best_of(lambda: records_build(fields_list), args.repeat)
+
+    per = 1e6 / args.violations
+    print("=" * 60)
+    print(f"违规项数:             {args.violations}")
+    print(f"Pydantic 逐条校验:    {legacy:.3f}s  ({legacy * per:.2f} µs/条)")
+    print(f"记录 + 批量校验:      {record:.3f}s  ({record * per:.2f} µs/条)")
+    print(f"  其中仅生成记录:     {records_only:.3f}s  ({records_only * per:.2f} µs/条)")
+    print(f"加速比:               {legacy / record:.2f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+基准测试用的合成图纸生成工具
+"""
+import random
+from pathlib import Path
+
+import ezdxf
+
+
+def build_drawing(
+    path: Path,
+    lines: int = 10000,
+    circles: int = 1000,
+    texts: int = 1000,
+    dimensions: int = 200,
+    layers: int = 20,
+    seed: int = 0
+) -> Path:
+    """
+    生成包含指定数量图元的 DXF 文件
+
+    Args:
+        path: 输出文件路径
+        lines: LINE 数量
+        circles: CIRCLE 数量
+        texts: TEXT/MTEXT 数量（各占一半）
+        dimensions: 线性尺寸标注数量
+        layers: 图层数量
+        seed: 随机种子，保证多次运行生成相同的图纸
+
+    Returns:
+        输出文件路径
+    """
+    rng = random.Random(seed)
+    doc = ezdxf.new('R2018', setup=True)
+    msp = doc.modelspace()
+    
+    layer_names = ["0"]
+    for i in range(layers):
+        name = rng.choice(["THICK", "THIN", "DIM", "TEXT", "PART", "图层"]) + f"_{i}"
+        doc.layers.add(name)
+        layer_names.append(name)
+    
+    # 混合标准与非标准线宽（1/100 mm）
+    lineweights = [-1, 25, 35, 50, 18, 70]
+    
+    for _ in range(lines):
+        x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        msp.add_line((x, y), (x + rng.uniform(1, 50), y + rng.uniform(1, 50)), dxfattribs={
+            "layer": rng.choice(layer_names),
+            "lineweight": rng.choice(lineweights),
+            "color": rng.choice([256, 256, 7, 1, 3])
+        })
+    
+    for _ in range(circles):
+        msp.add_circle((rng.uniform(0, 1000), rng.uniform(0, 1000)), rng.uniform(1, 20), dxfattribs={
+            "layer": rng.choice(layer_names),
+            "lineweight": rng.choice(lineweights)
+        })
+    
+    for i in range(texts):
+        attribs = {"layer": rng.choice(layer_names)}
+        insert = (rng.uniform(0, 1000), rng.uniform(0, 1000))
+        if i % 2:
+            msp.add_text(f"T{i}", height=rng.choice([1.8, 2.5, 3.5, 5.0, 12.0]), dxfattribs=attribs).set_placement(insert)
+        else:
+            mtext = msp.add_mtext(f"M{i}\\Pline", dxfattribs=attribs)
+            mtext.dxf.insert = insert
+            mtext.dxf.char_height = rng.choice([1.8, 2.5, 3.5, 5.0])
+    
+    for _ in range(dimensions):
+        x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        dim = msp.add_linear_dim(
+            base=(x, y + 10),
+            p1=(x, y),
+            p2=(x + rng.uniform(5, 100), y),
+            dxfattribs={"layer": rng.choice(layer_names)}
+        )
+        dim.render()
+    
+    doc.saveas(path)
+    return path
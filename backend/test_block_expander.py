@@ -0,0 +1,107 @@
+"""
+块参照展开单元测试（块变换、嵌套块、MINSERT、流式解析）
+"""
+import sys
+from pathlib import Path
+
+import ezdxf
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.block_expander import BlockExpander, DocumentBlocks
+from app.services.dxf_parser import DXFParserService
+from app.services.parse_cache import ParseCache
+
+
+@pytest.fixture
+def doc():
+    """PART 块（基点不在原点）被直接插入、嵌套插入和阵列插入"""
+    doc = ezdxf.new()
+    doc.layers.add("PARTS")
+    part = doc.blocks.new("PART", base_point=(5, 0))
+    part.add_line((5, 0), (15, 0), dxfattribs={"layer": "0", "color": 0, "lineweight": -2})
+    part.add_circle((10, 10), 2, dxfattribs={"layer": "OWN", "color": 3})
+    part.add_text("T", height=2.5, dxfattribs={"insert": (5, 5), "rotation": 10})
+    part.add_attdef("TAG", (0, 0))
+    assembly = doc.blocks.new("ASM")
+    assembly.add_blockref("PART", (100, 0), dxfattribs={"rotation": 90})
+
+    msp = doc.modelspace()
+    insert = msp.add_blockref("PART", (0, 0), dxfattribs={
+        "layer": "PARTS", "color": 5, "lineweight": 50, "xscale": 2, "yscale": 2
+    })
+    insert.add_attrib("TAG", "V1", (1, 1), dxfattribs={"height": 3})
+    msp.add_blockref("ASM", (0, 1000), dxfattribs={"layer": "PARTS"})
+    array = msp.add_blockref("PART", (0, 2000))
+    array.dxf.row_count = 10
+    array.dxf.column_count = 10
+    array.dxf.row_spacing = 30
+    array.dxf.column_spacing = 30
+    return doc
+
+
+def _rows_by_type(rows):
+    return {row["type"]: row for row in rows}
+
+
+def test_insert_transform_base_point_scale_and_byblock(doc):
+    """块基点、缩放和插入点换算到 WCS；0 图层和随块属性取块参照的值"""
+    insert = doc.modelspace().query("INSERT")[0]
+    rows = _rows_by_type(BlockExpander(DocumentBlocks(doc)).expand(insert))
+
+    line = rows["LINE"]
+    assert (line["x0"], line["y0"], line["x1"], line["y1"]) == pytest.approx((0, 0, 20, 0))
+    assert (line["layer"], line["color"], line["lineweight"]) == ("PARTS", 5, 50)
+    circle = rows["CIRCLE"]
+    assert (circle["x0"], circle["y0"], circle["size"]) == pytest.approx((10, 20, 4))
+    assert (circle["layer"], circle["color"]) == ("OWN", 3)
+    text = rows["TEXT"]
+    assert (text["x0"], text["y0"], text["size"], text["rotation"]) == pytest.approx((0, 10, 5, 10))
+    assert "ATTDEF" not in {row["type"] for row in rows.values()}
+
+
+def test_nested_insert_composes_rotation(doc):
+    """嵌套块的变换逐层叠加，文字旋转角叠加块参照的旋转"""
+    insert = doc.modelspace().query("INSERT")[1]
+    rows = BlockExpander(DocumentBlocks(doc)).expand(insert)
+    nested = _rows_by_type(row for row in rows if row["block"] == "ASM/PART")
+
+    line = nested["LINE"]
+    assert (line["x0"], line["y0"], line["x1"], line["y1"]) == pytest.approx((100, 1000, 100, 1010))
+    assert nested["TEXT"]["rotation"] == pytest.approx(100)
+    assert (nested["TEXT"]["x0"], nested["TEXT"]["y0"]) == pytest.approx((95, 1000))
+
+
+def test_minsert_expanded_once_and_depth_limit(doc):
+    """MINSERT 只按第一个阵列单元展开一次；展开层数为 0 时不展开"""
+    blocks = DocumentBlocks(doc)
+    array = doc.modelspace().query("INSERT")[2]
+    rows = BlockExpander(blocks).expand(array)
+    assert sorted(row["type"] for row in rows) == ["CIRCLE", "LINE", "TEXT"]
+    assert BlockExpander(blocks, max_depth=0).expand(array) == []
+
+    nested = BlockExpander(blocks, max_depth=1).expand(doc.modelspace().query("INSERT")[1])
+    assert [row["type"] for row in nested] == ["OTHER"]
+
+
+def test_stream_and_document_parses_match(doc, tmp_path):
+    """流式解析（块定义来自 BLOCKS 段）与 ezdxf 文档解析的展开结果一致，属性作为文字输出"""
+    path = tmp_path / "blocks.dxf"
+    doc.saveas(path)
+
+    results = []
+    for label, threshold in (("doc", 0), ("stream", 1)):
+        parser = DXFParserService(streaming_threshold=threshold, cache=ParseCache(tmp_path / label, 0))
+        data = parser.parse_sync(str(path))
+        table = data["entities"]
+        results.append((
+            [table.row(row) for row in range(table.row_count)],
+            [(text["text"], text.get("block")) for text in data["texts"]]
+        ))
+
+    assert results[0] == results[1]
+    rows, texts = results[0]
+    assert len(rows) == 14
+    assert texts == [("T", "PART"), ("V1", "PART"), ("T", "ASM/PART"), ("T", "PART")]
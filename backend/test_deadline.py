@@ -0,0 +1,105 @@
+"""
+截止时间与取消单元测试（部分报告）
+"""
+import sys
+import time
+from pathlib import Path
+
+import ezdxf
+import pytest
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.services import check_rules
+from app.services.compliance_checker import ComplianceCheckerService
+from app.services.deadline import AnalysisCancelled, AnalysisTimeout, Deadline
+from app.services.dxf_parser import DXFParserService
+from app.services.parse_cache import ParseCache
+
+
+@pytest.fixture
+def drawing(tmp_path):
+    """包含少量违规图元的 DXF 文件"""
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    for i in range(20):
+        msp.add_line((0, i), (10, i), dxfattribs={"layer": f"L{i % 3}", "lineweight": 13})
+        msp.add_text(f"T{i}", height=1.0, dxfattribs={"insert": (0, i)})
+    path = tmp_path / "drawing.dxf"
+    doc.saveas(path)
+    return str(path)
+
+
+def _parse(path: str, deadline: Deadline = Deadline()):
+    return DXFParserService(cache=ParseCache(Path(path).parent / "parse_cache", 0)).parse_sync(
+        path, deadline=deadline
+    )
+
+
+def test_deadline_expiry_and_cancel():
+    """到期抛出 AnalysisTimeout，取消抛出 AnalysisCancelled（也是 AnalysisTimeout）"""
+    assert not Deadline().expired()
+    assert Deadline(0).remaining() is None
+
+    expired = Deadline(1e-6)
+    time.sleep(0.01)
+    assert expired.expired()
+    with pytest.raises(AnalysisTimeout) as info:
+        expired.check("parse")
+    assert info.value.stage == "parse"
+
+    cancelled = Deadline(60, cancelled=lambda: True)
+    assert cancelled.expired()
+    with pytest.raises(AnalysisCancelled):
+        cancelled.check("check/layers")
+    assert issubclass(AnalysisCancelled, AnalysisTimeout)
+
+
+def test_parse_timeout_gives_empty_partial_report(drawing):
+    """解析阶段超时：报告不含任何规则结果，全部规则标记为未完成"""
+    with pytest.raises(AnalysisTimeout):
+        _parse(drawing, Deadline(60, cancelled=lambda: True))
+
+    checker = ComplianceCheckerService()
+    report = checker.partial_report("a", drawing)
+    assert report.partial
+    assert not report.is_compliant
+    assert report.total_violations == 0
+    assert report.unfinished_rules == [rule.name for rule in checker.enabled_rules]
+
+
+def test_cancel_during_check_keeps_finished_rules(drawing, monkeypatch):
+    """检查阶段被取消：已完成规则的结果保留，其余规则标记为未完成"""
+    monkeypatch.setattr(settings, "check_rule_workers", 1)
+    data = _parse(drawing)
+    full = ComplianceCheckerService().check_sync(data, "a", drawing, Deadline(60))
+    assert not full.partial
+
+    state = {"cancelled": False}
+
+    def cancel_after_first(rule, elapsed):
+        state["cancelled"] = True
+
+    checker = ComplianceCheckerService()
+    report = checker.check_sync(
+        data, "a", drawing, Deadline(60, cancelled=lambda: state["cancelled"]), cancel_after_first
+    )
+    first = checker.enabled_rules[0].name
+    assert report.partial
+    assert list(report.rule_timings) == [first]
+    assert report.unfinished_rules == [rule.name for rule in checker.enabled_rules[1:]]
+    only_first = ComplianceCheckerService(rules=[first]).check_sync(data, "a", drawing, Deadline(60))
+    assert report.total_violations == only_first.total_violations
+
+
+def test_unrelated_timeout_error_propagates():
+    """规则内部与截止时间无关的 TimeoutError 照常抛出，不当作超时吞掉"""
+    def failing(checker, dxf_data, ctx):
+        raise TimeoutError("socket timeout")
+
+    rule = check_rules.CheckRule("failing", failing, frozenset(), frozenset(), check_rules.CostClass.CHEAP)
+    ctx = check_rules.RuleContext(rule.name, None, Deadline(60))
+    with pytest.raises(TimeoutError):
+        check_rules._timed(rule, None, {}, ctx)
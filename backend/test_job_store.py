@@ -0,0 +1,88 @@
+"""
+任务存储单元测试（TTL、LRU 清理、执行者心跳）
+"""
+import sys
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models import AnalysisProgress, AnalysisStatus
+from app.services.job_store import MemoryJobStore, SQLiteJobStore
+
+
+def _sqlite_store(tmp_path: Path, ttl: int = 0, max_entries: int = 0, instance_id: str = "A") -> SQLiteJobStore:
+    return SQLiteJobStore(tmp_path / "jobs.db", ttl, max_entries, cache_size=0, owner_timeout=1, instance_id=instance_id)
+
+
+def _age(store: SQLiteJobStore, analysis_id: str, seconds: float):
+    """把任务的最近访问时间往前推"""
+    store._conn.execute(
+        "UPDATE jobs SET accessed_at = accessed_at - ? WHERE analysis_id = ?",
+        (seconds, analysis_id)
+    )
+
+
+def test_sqlite_ttl_expires_and_purges(tmp_path):
+    """超过 TTL 未访问的任务读不到，并由 purge_expired 删除"""
+    store = _sqlite_store(tmp_path, ttl=60)
+    store.create("old", "f", "p", "GB/T 14665-2012")
+    store.create("new", "f", "p", "GB/T 14665-2012")
+    _age(store, "old", 120)
+
+    assert store.get("old") is None
+    assert store.get("new")["status"] == AnalysisStatus.PENDING
+    assert store.purge_expired() == 1
+    assert store._conn.execute("SELECT analysis_id FROM jobs").fetchall() == [("new",)]
+
+
+def test_sqlite_purge_keeps_most_recent(tmp_path):
+    """超过 max_entries 时按最近访问时间淘汰"""
+    store = _sqlite_store(tmp_path, max_entries=2)
+    for i, analysis_id in enumerate(("a", "b", "c")):
+        store.create(analysis_id, "f", "p", "GB/T 14665-2012")
+        _age(store, analysis_id, 10 - i)
+    store.create("d", "f", "p", "GB/T 14665-2012")
+
+    remaining = {row[0] for row in store._conn.execute("SELECT analysis_id FROM jobs")}
+    assert remaining == {"c", "d"}
+
+
+def test_memory_ttl_and_purge():
+    """进程内存储同样按 TTL 过期、按 max_entries 淘汰"""
+    store = MemoryJobStore(ttl=60, max_entries=2)
+    store.create("old", "f", "p", "GB/T 14665-2012")
+    store._jobs["old"]["accessed_at"] = time.time() - 120
+    assert store.get("old") is None
+
+    for analysis_id in ("a", "b", "c"):
+        store.create(analysis_id, "f", "p", "GB/T 14665-2012")
+    assert list(store._jobs) == ["b", "c"]
+
+
+def test_fail_unfinished_only_for_stopped_owners(tmp_path):
+    """只结束执行者已停止心跳的未结束任务，共享存储的其他实例的任务不受影响"""
+    owner = _sqlite_store(tmp_path, instance_id="A")
+    peer = _sqlite_store(tmp_path, instance_id="B")
+    owner.create("a1", "f", "p", "GB/T 14665-2012")
+    owner.update_progress("a1", AnalysisProgress(
+        analysis_id="a1", seq=5, status=AnalysisStatus.PROCESSING, percent=30
+    ))
+    peer.create("b1", "f", "p", "GB/T 14665-2012")
+    peer.create("b2", "f", "p", "GB/T 14665-2012")
+    peer.update_status("b2", AnalysisStatus.COMPLETED)
+
+    restarted = _sqlite_store(tmp_path, instance_id="C")
+    assert restarted.fail_unfinished("服务重启") == 0
+
+    time.sleep(1.1)
+    peer.heartbeat()
+    assert restarted.fail_unfinished("服务重启") == 1
+
+    failed = restarted.get("a1")
+    assert failed["status"] == AnalysisStatus.FAILED
+    assert failed["error"] == "服务重启"
+    assert failed["progress"].seq == 6
+    assert restarted.get("b1")["status"] == AnalysisStatus.PENDING
+    assert restarted.get("b2")["status"] == AnalysisStatus.COMPLETED
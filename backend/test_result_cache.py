@@ -0,0 +1,69 @@
+"""
+结果缓存单元测试（缓存键版本）
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models import ComplianceReport
+from app.services.compliance_checker import ANALYSIS_CODE_TAG
+from app.services.dxf_parser import PARSER_TAG, parser_tag
+from app.services.result_cache import ResultCache
+from app.services.rule_set import compile_rule_set
+
+
+RULES_FILE = Path(__file__).parent / "config" / "rules_gbt14665.yaml"
+HASH = "0" * 64
+
+
+def _report() -> ComplianceReport:
+    return ComplianceReport(
+        analysis_id="a",
+        file_id="f",
+        filename="f.dxf",
+        standard="GB/T 14665-2012",
+        analysis_time=datetime.now(),
+        total_violations=0,
+        is_compliant=True,
+        compliance_score=100.0
+    )
+
+
+def test_key_changes_with_every_version_component():
+    """内容、标准、规则版本、代码版本和检查选项任一变化都得到不同的键"""
+    base = ("h", "GB/T 14665-2012", "r1", "c1", "full")
+    keys = {ResultCache.make_key(*base)}
+    for position, value in enumerate(("h2", "ISO", "r2", "c2", "agg20-10")):
+        changed = list(base)
+        changed[position] = value
+        keys.add(ResultCache.make_key(*changed))
+    assert len(keys) == 6
+
+
+def test_code_tag_tracks_parser_version_and_block_depth():
+    """解析器版本和块展开层数是代码版本标识的一部分"""
+    assert PARSER_TAG in ANALYSIS_CODE_TAG
+    assert parser_tag(4) != parser_tag(0)
+
+
+def test_rule_file_edit_changes_version():
+    """规则文件内容变化后规则版本随之变化"""
+    content = RULES_FILE.read_bytes()
+    original = compile_rule_set(RULES_FILE, content)
+    edited = compile_rule_set(RULES_FILE, content + b"\n# edited\n")
+    assert original.version != edited.version
+
+
+def test_stale_version_misses(tmp_path):
+    """规则或代码版本变化后，旧版本缓存的报告不再命中"""
+    cache = ResultCache(tmp_path / "results.db", max_bytes=1 << 20)
+    key = ResultCache.make_key(HASH, "GB/T 14665-2012", "r1", ANALYSIS_CODE_TAG, "full")
+    cache.put(key, _report())
+
+    assert cache.get(key).analysis_id == "a"
+    assert cache.get(ResultCache.make_key(HASH, "GB/T 14665-2012", "r2", ANALYSIS_CODE_TAG, "full")) is None
+    assert cache.get(ResultCache.make_key(HASH, "GB/T 14665-2012", "r1", "parser-v1.checker-v1", "full")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,44 @@
+"""
+违规项聚合单元测试（句柄压缩编码）
+"""
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.violation_groups import ViolationGrouper, pack_handles, unpack_handles
+
+
+def test_pack_unpack_round_trip():
+    """压缩后展开得到升序、去重的大写十六进制句柄"""
+    handles = ["1F", "a", "1f", "2", "FFFFFFFFFFFF", "10"]
+    assert unpack_handles(pack_handles(handles)) == ["2", "A", "10", "1F", "FFFFFFFFFFFF"]
+
+
+def test_pack_consecutive_handles_compresses():
+    """连续句柄差分后压缩率很高"""
+    handles = [format(value, "X") for value in range(0x100, 0x100 + 10000)]
+    packed = pack_handles(handles)
+    assert unpack_handles(packed) == handles
+    assert len(packed) < len("".join(handles)) // 10
+
+
+def test_pack_empty():
+    """空列表可以压缩和展开"""
+    assert unpack_handles(pack_handles([])) == []
+
+
+def test_grouper_packs_all_handles():
+    """达到阈值的组合并为一条，完整句柄列表可以展开"""
+    grouper = ViolationGrouper(min_size=3, sample_size=2)
+    base = {"rule": "r", "type": "layer", "severity": "warning", "layer": "L", "description": "d"}
+    for handle in ("3", "1", "2"):
+        grouper.add(dict(base, entity_handle=handle), key="k")
+    grouper.add(dict(base, entity_handle="9"), key="other")
+
+    merged, single = grouper.build(dict)
+    assert merged["count"] == 3
+    assert merged["sample_handles"] == ["3", "1"]
+    assert unpack_handles(merged["packed_handles"]) == ["1", "2", "3"]
+    assert single["entity_handle"] == "9" and "count" not in single
@@ -9,6 +9,7 @@ from .models import (
     ComplianceReport
 )
 from .parser import DXFParser
+from .entity_table import EntityTable
 from .checker import ComplianceChecker
 
 __all__ = [
@@ -18,5 +19,6 @@ __all__ = [
     'AnalysisStatus',
     'ComplianceReport',
     'DXFParser',
+    'EntityTable',
     'ComplianceChecker'
 ]
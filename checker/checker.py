@@ -1,35 +1,54 @@
 """
 CAD 合规性检查器
 """
-import yaml
+import re
 import uuid
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any
 from collections import Counter
 
+import numpy as np
+
 from .models import (
     ComplianceReport,
     Violation,
     ViolationType,
     SeverityLevel
 )
+from .check_rules import CheckRuleRegistry, CostClass, RuleContext, run_rules
+from .entity_table import COLUMNS, LINEAR_TYPES
+from .rule_set import get_rule_set
+
+
+# 尺寸标注图层（其上的文字不参与文字图层检查）
+DIMENSION_TEXT_LAYER = re.compile("DIM|尺寸")
+
+# 默认并发执行检查规则的线程数
+DEFAULT_RULE_WORKERS = 4
+
+# 检查规则注册表：规则函数签名为 check(checker, dxf_data, ctx)
+check_rules = CheckRuleRegistry(COLUMNS)
+
+
+def _make_violation(**fields) -> Violation:
+    """由规则记录的字段构造违规项"""
+    return Violation(id=str(uuid.uuid4()), **fields)
 
 
 class ComplianceChecker:
     """合规性检查器"""
     
-    def __init__(self, standard: str = "GB/T 14665-2012"):
+    def __init__(self, standard: str = "GB/T 14665-2012", rule_workers: int = DEFAULT_RULE_WORKERS):
         self.standard = standard
-        self.rules = self._load_rules()
+        # 规则集在进程内缓存，规则文件变化时自动重新加载
+        self.rule_set = get_rule_set(standard)
+        self.rules = self.rule_set.rules
+        self.layer_matcher = self.rule_set.layer_matcher
+        self.rule_workers = rule_workers
         self.violations: List[Violation] = []
+        self.rule_timings: Dict[str, float] = {}
         
-    def _load_rules(self) -> Dict[str, Any]:
-        """加载规则配置"""
-        config_file = Path(__file__).parent.parent / "config" / "rules_gbt14665.yaml"
-        with open(config_file, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    
     def check(
         self,
         dxf_data: Dict[str, Any],
@@ -47,61 +66,81 @@ class ComplianceChecker:
         Returns:
             合规性报告
         """
-        self.violations = []
+        # 执行当前标准启用的检查规则（互不依赖的规则并发执行）
+        results = run_rules(
+            check_rules.enabled_for(self.rule_set),
+            self,
+            dxf_data,
+            lambda rule: RuleContext(rule.name),
+            self.rule_workers
+        )
         
-        # 执行各项检查
-        self._check_layers(dxf_data)
-        self._check_lineweights(dxf_data)
-        self._check_colors(dxf_data)
-        self._check_fonts(dxf_data)
-        self._check_dimensions(dxf_data)
+        # 按注册顺序合并各规则的违规项
+        self.violations = []
+        self.rule_timings = {}
+        for rule, ctx, elapsed in results:
+            self.violations.extend(ctx.build(_make_violation))
+            self.rule_timings[rule.name] = round(elapsed * 1000, 3)
         
         # 生成报告
         report = self._generate_report(dxf_data, analysis_id, file_id)
         return report
     
-    def _check_layers(self, dxf_data: Dict[str, Any]):
+    @check_rules.register("layers", columns=("entity_type", "handle", "layer_id"), cost=CostClass.MODERATE)
+    def _check_layers(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查图层规范"""
         rules = self.rules['layers']
-        entities = dxf_data['entities']
+        table = dxf_data['entities']
+        layers = table.layers
         
-        # 检查尺寸标注是否在正确图层
+        # 检查尺寸标注是否在正确图层（每个不同图层名只匹配一次，图元按图层编号查表）
         expected_dim_layers = rules['尺寸层']['expected_names']
-        for dim in entities.get('DIMENSION', []):
-            layer = dim['layer']
-            if not any(exp_name.upper() in layer.upper() for exp_name in expected_dim_layers):
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
-                    type=ViolationType.LAYER,
-                    severity=SeverityLevel.WARNING,
-                    rule="GB/T 14665-2012 表6 - 图层规则",
-                    description=f"尺寸标注应位于专用图层（如：{', '.join(expected_dim_layers)}），当前位于: {layer}",
-                    entity_handle=dim['handle'],
-                    layer=layer,
-                    suggestion=f"将尺寸标注移至 {expected_dim_layers[0]} 图层"
-                ))
+        dim_layer_ok = self.layer_matcher.mask(layers, '尺寸层')
+        dim_rows = table.rows('DIMENSION')
+        dim_layer_ids = table.layer_id[dim_rows]
+        for i in np.flatnonzero(~dim_layer_ok[dim_layer_ids]).tolist():
+            row = int(dim_rows[i])
+            layer = layers[dim_layer_ids[i]]
+            ctx.add(
+                type=ViolationType.LAYER,
+                severity=SeverityLevel.WARNING,
+                rule="GB/T 14665-2012 表6 - 图层规则",
+                description=f"尺寸标注应位于专用图层（如：{', '.join(expected_dim_layers)}），当前位于: {layer}",
+                entity_handle=table.handle_str(row),
+                layer=layer,
+                suggestion=f"将尺寸标注移至 {expected_dim_layers[0]} 图层"
+            )
         
         # 检查文字是否在正确图层
         expected_text_layers = rules['文字层']['expected_names']
-        for text in entities.get('TEXT', []) + entities.get('MTEXT', []):
-            layer = text['layer']
-            # 跳过尺寸标注的文字
-            if 'DIM' in layer.upper() or '尺寸' in layer:
-                continue
-            if not any(exp_name.upper() in layer.upper() for exp_name in expected_text_layers):
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
-                    type=ViolationType.LAYER,
-                    severity=SeverityLevel.INFO,
-                    rule="GB/T 14665-2012 表6 - 图层规则",
-                    description=f"文字应位于专用图层（如：{', '.join(expected_text_layers)}），当前位于: {layer}",
-                    entity_handle=text['handle'],
-                    layer=layer,
-                    suggestion=f"将文字移至 {expected_text_layers[0]} 图层"
-                ))
+        # 跳过尺寸标注图层上的文字
+        text_layer_ok = self.layer_matcher.mask(layers, '文字层') | np.fromiter(
+            (DIMENSION_TEXT_LAYER.search(name.upper()) is not None for name in layers),
+            dtype=bool,
+            count=len(layers)
+        )
+        text_rows = table.rows('TEXT', 'MTEXT')
+        text_layer_ids = table.layer_id[text_rows]
+        for i in np.flatnonzero(~text_layer_ok[text_layer_ids]).tolist():
+            row = int(text_rows[i])
+            layer = layers[text_layer_ids[i]]
+            ctx.add(
+                type=ViolationType.LAYER,
+                severity=SeverityLevel.INFO,
+                rule="GB/T 14665-2012 表6 - 图层规则",
+                description=f"文字应位于专用图层（如：{', '.join(expected_text_layers)}），当前位于: {layer}",
+                entity_handle=table.handle_str(row),
+                layer=layer,
+                suggestion=f"将文字移至 {expected_text_layers[0]} 图层"
+            )
     
-    def _check_lineweights(self, dxf_data: Dict[str, Any]):
-        """检查线宽规范"""
+    @check_rules.register(
+        "lineweights",
+        columns=("entity_type", "handle", "layer_id", "lineweight"),
+        cost=CostClass.MODERATE
+    )
+    def _check_lineweights(self, dxf_data: Dict[str, Any], ctx: RuleContext):
+        """检查线宽规范（按列向量化计算，仅为违规行构建违规项）"""
         rules = self.rules['lineweights']
         tolerance = rules['tolerance']
         
@@ -111,99 +150,106 @@ class ComplianceChecker:
             rules['medium_line'],
             rules['thin_line']
         ]
+        standard = np.asarray(standard_weights, dtype=np.float64)
         
         # 检查所有线条实体
-        for entity_type in ['LINE', 'CIRCLE', 'ARC', 'POLYLINE']:
-            for entity in dxf_data['entities'].get(entity_type, []):
-                lineweight = entity.get('lineweight', -1)
-                
-                # -1 表示使用默认值（ByLayer），-2 表示 ByBlock
-                if lineweight < 0:
-                    continue
-                
-                # 转换为 mm（DXF 中线宽单位是 1/100 mm）
-                lineweight_mm = lineweight / 100.0
-                
-                # 检查是否符合标准线宽
-                is_standard = any(
-                    abs(lineweight_mm - std) <= tolerance
-                    for std in standard_weights
+        table = dxf_data['entities']
+        for entity_type in LINEAR_TYPES:
+            rows = table.rows(entity_type)
+            lineweights = table.lineweight[rows]
+            
+            # 转换为 mm（DXF 中线宽单位是 1/100 mm），与每个标准线宽求差 (n, 3)
+            lineweights_mm = lineweights / 100.0
+            deviation = np.abs(lineweights_mm[:, None] - standard[None, :])
+            
+            # -1 表示使用默认值（ByLayer），-2 表示 ByBlock，不参与检查
+            flagged = (lineweights >= 0) & ~(deviation <= tolerance).any(axis=1)
+            if not flagged.any():
+                continue
+            recommended_index = deviation.argmin(axis=1)
+            
+            for i in np.flatnonzero(flagged).tolist():
+                row = int(rows[i])
+                lineweight_mm = float(lineweights_mm[i])
+                ctx.add(
+                    type=ViolationType.LINEWEIGHT,
+                    severity=SeverityLevel.WARNING,
+                    rule="GB/T 14665-2012 表1 - 线宽规则",
+                    description=f"线宽 {lineweight_mm:.2f}mm 不符合标准。标准线宽: {standard_weights}",
+                    entity_handle=table.handle_str(row),
+                    layer=table.layer_name(row),
+                    suggestion=f"使用标准线宽: {standard_weights[recommended_index[i]]}mm"
                 )
-                
-                if not is_standard:
-                    self.violations.append(Violation(
-                        id=str(uuid.uuid4()),
-                        type=ViolationType.LINEWEIGHT,
-                        severity=SeverityLevel.WARNING,
-                        rule="GB/T 14665-2012 表1 - 线宽规则",
-                        description=f"线宽 {lineweight_mm:.2f}mm 不符合标准。标准线宽: {standard_weights}",
-                        entity_handle=entity['handle'],
-                        layer=entity['layer'],
-                        suggestion=f"使用标准线宽: {min(standard_weights, key=lambda x: abs(x-lineweight_mm))}mm"
-                    ))
     
-    def _check_colors(self, dxf_data: Dict[str, Any]):
+    @check_rules.register("colors", columns=("color",), cost=CostClass.CHEAP)
+    def _check_colors(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查颜色规范"""
         rules = self.rules['colors']
         default_color = rules['default']
         
-        # 统计非标准颜色使用
-        non_standard_colors = []
-        
-        for entity_type, entities in dxf_data['entities'].items():
-            for entity in entities:
-                color = entity.get('color', default_color)
-                
-                # 检查是否使用了过于花哨的颜色
-                if color not in [default_color, 256, 0] and 1 <= color <= 255:
-                    non_standard_colors.append((entity, color))
+        # 统计非标准颜色使用：1-255 之间且不是默认色（0 = ByBlock，256 = ByLayer）
+        colors = dxf_data['entities'].color
+        non_standard_count = int(np.count_nonzero(
+            (colors >= 1) & (colors <= 255) & (colors != default_color)
+        ))
         
         # 如果使用过多颜色，给出提示
-        if len(non_standard_colors) > 10:
-            self.violations.append(Violation(
-                id=str(uuid.uuid4()),
+        if non_standard_count > 10:
+            ctx.add(
                 type=ViolationType.COLOR,
                 severity=SeverityLevel.INFO,
                 rule="GB/T 14665-2012 表2 - 颜色规则",
-                description=f"检测到 {len(non_standard_colors)} 个实体使用了非标准颜色。建议统一使用随层或默认颜色",
+                description=f"检测到 {non_standard_count} 个实体使用了非标准颜色。建议统一使用随层或默认颜色",
                 suggestion="将实体颜色设置为 ByLayer（随层）以便统一管理"
-            ))
+            )
     
-    def _check_fonts(self, dxf_data: Dict[str, Any]):
-        """检查字体规范"""
+    @check_rules.register(
+        "fonts",
+        columns=("entity_type", "handle", "layer_id", "size"),
+        cost=CostClass.MODERATE
+    )
+    def _check_fonts(self, dxf_data: Dict[str, Any], ctx: RuleContext):
+        """检查字体规范（按字高列向量化筛选）"""
         rules = self.rules['fonts']
         min_height = rules['min_height']
         max_height = rules['max_height']
         
+        # TEXT/MTEXT 行按图纸顺序排列，与 texts 列表一一对应
+        table = dxf_data['entities']
+        rows = np.flatnonzero(table.mask('TEXT', 'MTEXT'))
+        heights = table.size[rows]
+        too_small = heights < min_height
+        too_large = heights > max_height
+        
         # 检查所有文字高度
-        for text in dxf_data['texts']:
-            height = text['height']
+        for i in np.flatnonzero(too_small | too_large).tolist():
+            row = int(rows[i])
+            height = float(heights[i])
             
-            if height < min_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+            if too_small[i]:
+                ctx.add(
                     type=ViolationType.FONT,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 表3 - 字体规则",
                     description=f"文字高度 {height:.1f}mm 过小，最小允许: {min_height}mm",
-                    entity_handle=text['handle'],
-                    layer=text['layer'],
+                    entity_handle=table.handle_str(row),
+                    layer=table.layer_name(row),
                     suggestion=f"将文字高度调整至 {min_height}mm 以上"
-                ))
+                )
             
-            elif height > max_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+            else:
+                ctx.add(
                     type=ViolationType.FONT,
                     severity=SeverityLevel.INFO,
                     rule="GB/T 14665-2012 表3 - 字体规则",
                     description=f"文字高度 {height:.1f}mm 过大，建议不超过: {max_height}mm",
-                    entity_handle=text['handle'],
-                    layer=text['layer'],
+                    entity_handle=table.handle_str(row),
+                    layer=table.layer_name(row),
                     suggestion=f"将文字高度调整至 {max_height}mm 以内"
-                ))
+                )
     
-    def _check_dimensions(self, dxf_data: Dict[str, Any]):
+    @check_rules.register("dimensions", sections=("dimensions",), cost=CostClass.MODERATE)
+    def _check_dimensions(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查尺寸标注规范"""
         dimensions = dxf_data['dimensions']
         
@@ -225,21 +271,19 @@ class ComplianceChecker:
             consistency = count / len(arrow_sizes)
             
             if consistency < consistency_threshold:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.DIMENSION,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 6.3节 - 尺寸终端一致性",
                     description=f"尺寸终端类型一致性仅为 {consistency*100:.1f}%，建议达到 {consistency_threshold*100:.0f}%",
                     suggestion=f"统一使用相同的尺寸终端样式（当前主要使用箭头大小: {most_common_size:.1f}mm）"
-                ))
+                )
         
         # 检查尺寸文字高度
         for dim in dimensions:
             text_height = dim['text_height']
             if text_height > 0 and text_height < min_text_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.DIMENSION,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 - 尺寸文字高度",
@@ -247,7 +291,7 @@ class ComplianceChecker:
                     entity_handle=dim['handle'],
                     layer=dim['layer'],
                     suggestion=f"将尺寸文字高度调整至 {min_text_height}mm 以上"
-                ))
+                )
     
     def _generate_report(
         self,
@@ -284,5 +328,6 @@ class ComplianceChecker:
             info_count=info_count,
             violations=self.violations,
             is_compliant=is_compliant,
-            compliance_score=score
+            compliance_score=score,
+            rule_timings=self.rule_timings
         )
@@ -0,0 +1,257 @@
+"""
+列式图元存储
+用 NumPy 数组按列保存图元属性，图层名/线型名驻留为编号，
+仅在需要时（如生成违规项）才为单个图元构建字典视图
+
+同步维护：本模块在 backend/app/services/、checker/ 各有一份副本；
+后端服务与独立部署的检查包之间没有可共享的导入路径，修改时需同步全部副本。
+"""
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, List, Any, Optional, Iterator
+
+import numpy as np
+
+
+# 图元分类（与旧版 entities 字典的键一致）
+ENTITY_TYPES = ("LINE", "CIRCLE", "ARC", "POLYLINE", "TEXT", "MTEXT", "DIMENSION", "OTHER")
+TYPE_CODES = {name: code for code, name in enumerate(ENTITY_TYPES)}
+
+# 参与线宽检查的图元类型
+LINEAR_TYPES = ("LINE", "CIRCLE", "ARC", "POLYLINE")
+
+# EntityTable 的全部数组列
+COLUMNS = (
+    "entity_type", "handle", "layer_id", "linetype_id", "color", "lineweight",
+    "x0", "y0", "x1", "y1", "size", "text_id"
+)
+
+NAN = float("nan")
+
+
+class StringPool:
+    """字符串驻留表：相同字符串只保存一份，列中存放其编号"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        index = self._ids.get(value)
+        if index is None:
+            index = len(self.values)
+            self._ids[value] = index
+            self.values.append(value)
+        return index
+
+
+class EntityTableBuilder:
+    """逐个追加图元，最后一次性生成 EntityTable"""
+
+    def __init__(self):
+        self.layers = StringPool()
+        self.linetypes = StringPool()
+        self.texts: List[str] = []
+        self._type = array('b')
+        self._handle = array('Q')
+        self._layer = array('i')
+        self._linetype = array('i')
+        self._color = array('h')
+        self._lineweight = array('h')
+        self._x0 = array('d')
+        self._y0 = array('d')
+        self._x1 = array('d')
+        self._y1 = array('d')
+        self._size = array('d')
+        self._text = array('i')
+
+    def add(
+        self,
+        entity_type: str,
+        handle: Optional[str],
+        layer: str,
+        color: int,
+        linetype: str,
+        lineweight: int,
+        x0: float = NAN,
+        y0: float = NAN,
+        x1: float = NAN,
+        y1: float = NAN,
+        size: float = NAN,
+        text: Optional[str] = None
+    ):
+        """
+        追加一个图元
+
+        Args:
+            entity_type: 图元分类（ENTITY_TYPES 之一）
+            handle: 十六进制句柄
+            x0, y0: 起点 / 圆心 / 插入点
+            x1, y1: 终点
+            size: 半径（CIRCLE）或字高（TEXT/MTEXT）
+            text: 文字内容
+        """
+        self._type.append(TYPE_CODES[entity_type])
+        self._handle.append(int(handle, 16) if handle else 0)
+        self._layer.append(self.layers.intern(layer))
+        self._linetype.append(self.linetypes.intern(linetype))
+        self._color.append(color)
+        self._lineweight.append(lineweight)
+        self._x0.append(x0)
+        self._y0.append(y0)
+        self._x1.append(x1)
+        self._y1.append(y1)
+        self._size.append(size)
+        if text is None:
+            self._text.append(-1)
+        else:
+            self._text.append(len(self.texts))
+            self.texts.append(text)
+
+    def build(self) -> "EntityTable":
+        return EntityTable(
+            entity_type=np.frombuffer(self._type, dtype=np.int8),
+            handle=np.frombuffer(self._handle, dtype=np.uint64),
+            layer_id=np.frombuffer(self._layer, dtype=np.int32),
+            linetype_id=np.frombuffer(self._linetype, dtype=np.int32),
+            color=np.frombuffer(self._color, dtype=np.int16),
+            lineweight=np.frombuffer(self._lineweight, dtype=np.int16),
+            x0=np.frombuffer(self._x0, dtype=np.float64),
+            y0=np.frombuffer(self._y0, dtype=np.float64),
+            x1=np.frombuffer(self._x1, dtype=np.float64),
+            y1=np.frombuffer(self._y1, dtype=np.float64),
+            size=np.frombuffer(self._size, dtype=np.float64),
+            text_id=np.frombuffer(self._text, dtype=np.int32),
+            layers=self.layers.values,
+            linetypes=self.linetypes.values,
+            texts=self.texts
+        )
+
+
+class EntityTable(Mapping):
+    """
+    列式图元表
+
+    检查器直接读取列数组；同时按旧版 entities 字典的接口提供
+    图元类型 -> 图元序列 的只读映射，序列元素在访问时才构建为字典。
+    """
+
+    def __init__(
+        self,
+        entity_type: np.ndarray,
+        handle: np.ndarray,
+        layer_id: np.ndarray,
+        linetype_id: np.ndarray,
+        color: np.ndarray,
+        lineweight: np.ndarray,
+        x0: np.ndarray,
+        y0: np.ndarray,
+        x1: np.ndarray,
+        y1: np.ndarray,
+        size: np.ndarray,
+        text_id: np.ndarray,
+        layers: List[str],
+        linetypes: List[str],
+        texts: List[str]
+    ):
+        self.entity_type = entity_type
+        self.handle = handle
+        self.layer_id = layer_id
+        self.linetype_id = linetype_id
+        self.color = color
+        self.lineweight = lineweight
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.size = size
+        self.text_id = text_id
+        self.layers = layers
+        self.linetypes = linetypes
+        self.texts = texts
+        self._type_rows: Dict[int, np.ndarray] = {}
+
+    @property
+    def row_count(self) -> int:
+        """图元总数"""
+        return len(self.entity_type)
+
+    def rows(self, *entity_types: str) -> np.ndarray:
+        """指定类型图元的行号（按类型顺序拼接，同类型内保持图纸顺序）"""
+        parts = []
+        for name in entity_types:
+            code = TYPE_CODES[name]
+            if code not in self._type_rows:
+                self._type_rows[code] = np.flatnonzero(self.entity_type == code)
+            parts.append(self._type_rows[code])
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    def mask(self, *entity_types: str) -> np.ndarray:
+        """指定类型图元的布尔掩码"""
+        codes = [TYPE_CODES[name] for name in entity_types]
+        return np.isin(self.entity_type, codes)
+
+    def handle_str(self, row: int) -> str:
+        """行对应的十六进制句柄"""
+        return format(int(self.handle[row]), 'X')
+
+    def layer_name(self, row: int) -> str:
+        return self.layers[self.layer_id[row]]
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """构建单个图元的字典视图（与旧版 entities 中的字典格式一致）"""
+        row = int(row)
+        entity_type = ENTITY_TYPES[self.entity_type[row]]
+        data = {
+            "handle": self.handle_str(row),
+            "layer": self.layers[self.layer_id[row]],
+            "color": int(self.color[row]),
+            "linetype": self.linetypes[self.linetype_id[row]],
+            "lineweight": int(self.lineweight[row])
+        }
+        if entity_type == "LINE":
+            data["start"] = (float(self.x0[row]), float(self.y0[row]))
+            data["end"] = (float(self.x1[row]), float(self.y1[row]))
+        elif entity_type == "CIRCLE":
+            data["center"] = (float(self.x0[row]), float(self.y0[row]))
+            data["radius"] = float(self.size[row])
+        elif entity_type in ("TEXT", "MTEXT"):
+            text_id = self.text_id[row]
+            data["text"] = self.texts[text_id] if text_id >= 0 else ""
+            data["height"] = float(self.size[row])
+            data["position"] = (float(self.x0[row]), float(self.y0[row]))
+        return data
+
+    # Mapping 接口：图元类型 -> 惰性图元序列
+
+    def __getitem__(self, entity_type: str) -> "EntityView":
+        if entity_type not in TYPE_CODES:
+            raise KeyError(entity_type)
+        return EntityView(self, self.rows(entity_type))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ENTITY_TYPES)
+
+    def __len__(self) -> int:
+        return len(ENTITY_TYPES)
+
+
+class EntityView(Sequence):
+    """一组图元行的只读序列，元素在访问时才构建为字典"""
+
+    def __init__(self, table: EntityTable, rows: np.ndarray):
+        self.table = table
+        self.row_ids = rows
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.table.row(row) for row in self.row_ids[index]]
+        return self.table.row(self.row_ids[index])
+
+    def __add__(self, other) -> List[Dict[str, Any]]:
+        return list(self) + list(other)
@@ -2,7 +2,7 @@
 数据模型定义
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -66,3 +66,6 @@ class ComplianceReport(BaseModel):
     # 整体评估
     is_compliant: bool = Field(..., description="是否合规")
     compliance_score: float = Field(..., ge=0, le=100, description="合规得分")
+    
+    # 执行统计
+    rule_timings: Dict[str, float] = Field(default_factory=dict, description="各检查规则耗时（毫秒）")
@@ -1,17 +1,28 @@
 """
 DXF 文件解析器
 """
+import math
 import ezdxf
 from pathlib import Path
 from typing import Dict, List, Any
 
+from .block_expander import BlockExpander, DocumentBlocks, DEFAULT_BLOCK_DEPTH
+from .entity_table import EntityTable, EntityTableBuilder
+
 
 class DXFParser:
     """DXF 文件解析器"""
     
-    def __init__(self):
+    def __init__(self, max_block_depth: int = DEFAULT_BLOCK_DEPTH):
+        """
+        Args:
+            max_block_depth: 块参照最多展开的嵌套层数，0 表示不展开块参照
+        """
         self.doc = None
         self.modelspace = None
+        self.max_block_depth = max_block_depth
+        # 块参照展开得到的文字（由 _extract_entities 收集，并入 texts）
+        self._block_texts: List[Dict[str, Any]] = []
         
     def parse(self, file_path: str) -> Dict[str, Any]:
         """
@@ -27,6 +38,7 @@ class DXFParser:
             # 读取 DXF 文件
             self.doc = ezdxf.readfile(file_path)
             self.modelspace = self.doc.modelspace()
+            self._block_texts = []
             
             # 提取关键信息
             data = {
@@ -61,67 +73,92 @@ class DXFParser:
             })
         return layers
     
-    def _extract_entities(self) -> Dict[str, List[Dict[str, Any]]]:
-        """提取所有图元信息"""
-        entities = {
-            "LINE": [],
-            "CIRCLE": [],
-            "ARC": [],
-            "POLYLINE": [],
-            "TEXT": [],
-            "MTEXT": [],
-            "DIMENSION": [],
-            "OTHER": []
-        }
+    def _extract_entities(self) -> EntityTable:
+        """提取所有图元信息（写入列式表，不为每个图元构建字典），块参照内的图元以块参照的句柄写入"""
+        builder = EntityTableBuilder()
+        expander = BlockExpander(DocumentBlocks(self.doc), self.max_block_depth)
         
         for entity in self.modelspace:
             entity_type = entity.dxftype()
-            entity_data = {
-                "handle": entity.dxf.handle,
-                "layer": entity.dxf.layer,
-                "color": entity.dxf.color,
-                "linetype": entity.dxf.linetype,
-                "lineweight": getattr(entity.dxf, 'lineweight', -1)
-            }
+            dxf = entity.dxf
+            base = (
+                dxf.handle,
+                dxf.layer,
+                dxf.color,
+                dxf.linetype,
+                getattr(dxf, 'lineweight', -1)
+            )
             
             # 根据类型提取特定信息
             if entity_type == "LINE":
-                entity_data.update({
-                    "start": (entity.dxf.start.x, entity.dxf.start.y),
-                    "end": (entity.dxf.end.x, entity.dxf.end.y)
-                })
-                entities["LINE"].append(entity_data)
+                builder.add(
+                    "LINE", *base,
+                    x0=dxf.start.x, y0=dxf.start.y, x1=dxf.end.x, y1=dxf.end.y
+                )
                 
             elif entity_type == "CIRCLE":
-                entity_data.update({
-                    "center": (entity.dxf.center.x, entity.dxf.center.y),
-                    "radius": entity.dxf.radius
-                })
-                entities["CIRCLE"].append(entity_data)
+                builder.add("CIRCLE", *base, x0=dxf.center.x, y0=dxf.center.y, size=dxf.radius)
                 
             elif entity_type in ["TEXT", "MTEXT"]:
                 # TEXT 和 MTEXT 的高度属性不同
                 if entity_type == "TEXT":
-                    height = entity.dxf.height
-                    text_content = entity.dxf.text
+                    height = dxf.height
+                    text_content = dxf.text
                 else:  # MTEXT
-                    height = getattr(entity.dxf, 'char_height', 2.5)
+                    height = getattr(dxf, 'char_height', 2.5)
                     text_content = entity.text
                 
-                entity_data.update({
-                    "text": text_content,
-                    "height": height,
-                    "position": (entity.dxf.insert.x, entity.dxf.insert.y)
-                })
-                entities["TEXT" if entity_type == "TEXT" else "MTEXT"].append(entity_data)
+                builder.add(
+                    entity_type, *base,
+                    x0=dxf.insert.x, y0=dxf.insert.y, size=height, text=text_content
+                )
                 
             elif entity_type.startswith("DIMENSION"):
-                entities["DIMENSION"].append(entity_data)
+                builder.add("DIMENSION", *base)
                 
             else:
-                entities["OTHER"].append(entity_data)
+                builder.add("OTHER", *base)
+                if entity_type == "INSERT" and self.max_block_depth > 0:
+                    self._add_block_entities(entity, expander, builder)
         
-        return entities
+        return builder.build()
+    
+    def _add_block_entities(self, insert, expander: BlockExpander, builder: EntityTableBuilder):
+        """展开块参照：块内图元和块参照的属性（ATTRIB）写入列式表，文字同时并入 texts"""
+        handle = insert.dxf.handle
+        rows = expander.expand(insert)
+        for attrib in insert.attribs:
+            dxf = attrib.dxf
+            rows.append({
+                "type": "TEXT",
+                "block": insert.dxf.name,
+                "layer": dxf.layer,
+                "color": dxf.color,
+                "linetype": dxf.linetype,
+                "lineweight": getattr(dxf, 'lineweight', -1),
+                "text": dxf.text,
+                "style": getattr(dxf, 'style', 'Standard'),
+                "x0": dxf.insert.x,
+                "y0": dxf.insert.y,
+                "size": dxf.height
+            })
+        for row in rows:
+            builder.add(
+                row["type"], handle, row["layer"], row["color"], row["linetype"], row["lineweight"],
+                x0=row["x0"], y0=row["y0"], x1=row.get("x1", math.nan), y1=row.get("y1", math.nan),
+                size=row["size"], text=row["text"]
+            )
+            if row["type"] in ("TEXT", "MTEXT"):
+                self._block_texts.append({
+                    "handle": handle,
+                    "type": row["type"],
+                    "layer": row["layer"],
+                    "text": row["text"],
+                    "height": row["size"],
+                    "style": row["style"],
+                    "color": row["color"],
+                    "block": row["block"]
+                })
     
     def _extract_dimensions(self) -> List[Dict[str, Any]]:
         """提取尺寸标注信息"""
@@ -174,7 +211,7 @@ class DXFParser:
             }
             texts.append(text_data)
         
-        return texts
+        return texts + self._block_texts
     
     def _extract_blocks(self) -> List[str]:
         """提取块定义信息"""
@@ -185,7 +222,7 @@ class DXFParser:
         header = self.doc.header
         metadata = {
             "dxf_version": self.doc.dxfversion,
-            "units": getattr(header, '$INSUNITS', 0),
+            "units": header.get('$INSUNITS', 0),
             "layer_count": len(list(self.doc.layers)),
             "entity_count": len(list(self.modelspace))
         }
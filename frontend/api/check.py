@@ -8,6 +8,7 @@ import sys
 from pathlib import Path
 from datetime import datetime
 import tempfile
+from urllib.parse import urlparse, parse_qs
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -62,6 +63,14 @@ class handler(BaseHTTPRequestHandler):
             if file_ext not in ['.dxf', '.dwg']:
                 return self._json(400, {"error": f"不支持的文件格式: {file_ext}"})
             
+            # 检查标准通过查询参数指定（规则集在进程内缓存，热启动时不再重复加载）
+            query = parse_qs(urlparse(self.path).query)
+            standard = query.get('standard', ['GB/T 14665-2012'])[0]
+            try:
+                checker = ComplianceChecker(standard=standard)
+            except ValueError as e:
+                return self._json(400, {"error": str(e)})
+            
             # 写入临时文件
             with tempfile.NamedTemporaryFile(mode='wb', suffix=file_ext, delete=False) as tmp:
                 tmp.write(file_data)
@@ -75,7 +84,6 @@ class handler(BaseHTTPRequestHandler):
                 parser = DXFParser()
                 dxf_data = parser.parse(temp_path)
                 
-                checker = ComplianceChecker(standard='GB/T 14665-2012')
                 report = checker.check(dxf_data, analysis_id, file_id)
                 
                 # 清理临时文件
@@ -0,0 +1,42 @@
+import { NextRequest, NextResponse } from 'next/server'
+
+const BACKEND_URL = process.env.BACKEND_URL || 'http://103.109.20.169:10437'
+
+// 事件流需要逐条转发，不能缓存或静态化
+export const dynamic = 'force-dynamic'
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params
+    const after = request.nextUrl.searchParams.get('after') || '0'
+    const lastEventId = request.headers.get('last-event-id')
+
+    const response = await fetch(`${BACKEND_URL}/api/v1/analyze/${id}/events?after=${after}`, {
+      headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+      signal: request.signal
+    })
+
+    if (!response.ok || !response.body) {
+      const error = await response.json()
+      return NextResponse.json(error, { status: response.status })
+    }
+
+    // 直接转发后端的 SSE 响应体
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+      }
+    })
+  } catch (error: any) {
+    console.error('Analysis events proxy error:', error)
+    return NextResponse.json(
+      { detail: error.message || 'Failed to stream events' },
+      { status: 500 }
+    )
+  }
+}
@@ -0,0 +1,33 @@
+import { NextRequest, NextResponse } from 'next/server'
+
+const BACKEND_URL = process.env.BACKEND_URL || 'http://103.109.20.169:10437'
+
+export const dynamic = 'force-dynamic'
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params
+    const query = request.nextUrl.searchParams.toString()
+
+    const response = await fetch(`${BACKEND_URL}/api/v1/analyze/${id}/progress?${query}`, {
+      signal: request.signal
+    })
+
+    if (!response.ok) {
+      const error = await response.json()
+      return NextResponse.json(error, { status: response.status })
+    }
+
+    const data = await response.json()
+    return NextResponse.json(data)
+  } catch (error: any) {
+    console.error('Analysis progress proxy error:', error)
+    return NextResponse.json(
+      { detail: error.message || 'Failed to get progress' },
+      { status: 500 }
+    )
+  }
+}
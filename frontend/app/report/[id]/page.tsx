@@ -2,8 +2,8 @@
 
 import { useEffect, useState } from 'react'
 import { useParams, useRouter } from 'next/navigation'
-import { getReport, getAnalysisStatus, exportReport } from '@/lib/api'
-import { ComplianceReport, AnalysisStatus } from '@/types'
+import { getReport, getAnalysisStatus, exportReport, subscribeAnalysisEvents } from '@/lib/api'
+import { ComplianceReport, AnalysisStatus, AnalysisProgress } from '@/types'
 
 export default function ReportPage() {
   const params = useParams()
@@ -13,24 +13,53 @@ export default function ReportPage() {
   const [status, setStatus] = useState<AnalysisStatus>('pending')
   const [report, setReport] = useState<ComplianceReport | null>(null)
   const [error, setError] = useState<string | null>(null)
-  const [polling, setPolling] = useState(true)
+  const [progress, setProgress] = useState<AnalysisProgress | null>(null)
+  // 进度事件流不可用时回退到状态轮询
+  const [polling, setPolling] = useState(false)
 
+  // 分析结束：完成时获取报告，失败时显示错误，超时时有部分报告则展示部分报告
+  const handleFinished = async (finalStatus: AnalysisStatus, message?: string) => {
+    if (finalStatus === 'completed') {
+      setReport(await getReport(analysisId))
+    } else if (finalStatus === 'failed') {
+      setError(message || '分析失败，请重试')
+    } else if (finalStatus === 'timed_out') {
+      try {
+        setReport(await getReport(analysisId))
+      } catch (err) {
+        setError(message || '分析超时，请重试')
+      }
+    }
+  }
+
+  // 订阅进度事件流
   useEffect(() => {
     if (!analysisId) return
 
+    return subscribeAnalysisEvents(
+      analysisId,
+      (event) => {
+        setProgress(event)
+        setStatus(event.status)
+        handleFinished(event.status, event.message).catch((err) => {
+          console.error('Error loading report:', err)
+          setPolling(true)
+        })
+      },
+      () => setPolling(true)
+    )
+  }, [analysisId])
+
+  useEffect(() => {
+    if (!analysisId || !polling) return
+
     const checkStatus = async () => {
       try {
         const statusResponse = await getAnalysisStatus(analysisId)
         setStatus(statusResponse.status)
 
-        if (statusResponse.status === 'completed') {
-          // 分析完成，获取报告
-          const reportData = await getReport(analysisId)
-          setReport(reportData)
-          setPolling(false)
-        } else if (statusResponse.status === 'failed') {
-          // 获取详细错误信息
-          setError(statusResponse.message || '分析失败，请重试')
+        if (statusResponse.status !== 'pending' && statusResponse.status !== 'processing') {
+          await handleFinished(statusResponse.status, statusResponse.message)
           setPolling(false)
         }
       } catch (err: any) {
@@ -43,10 +72,10 @@ export default function ReportPage() {
     checkStatus()
 
     // 如果还在处理中，每2秒轮询一次
-    const interval = polling ? setInterval(checkStatus, 2000) : null
+    const interval = setInterval(checkStatus, 2000)
 
     return () => {
-      if (interval) clearInterval(interval)
+      clearInterval(interval)
     }
   }, [analysisId, polling])
 
@@ -121,7 +150,21 @@ export default function ReportPage() {
             {status === 'pending' && '分析排队中...'}
             {status === 'processing' && '正在分析图纸...'}
           </h2>
-          <p className="text-gray-600">请稍候，通常需要 10-30 秒</p>
+          {progress ? (
+            <div className="w-80 mx-auto">
+              <div className="w-full bg-gray-200 rounded-full h-2 mb-2">
+                <div
+                  className="bg-blue-600 h-2 rounded-full transition-all"
+                  style={{ width: `${progress.percent}%` }}
+                ></div>
+              </div>
+              <p className="text-gray-600 text-sm">
+                {progress.message} · {progress.percent.toFixed(0)}%
+              </p>
+            </div>
+          ) : (
+            <p className="text-gray-600">请稍候，通常需要 10-30 秒</p>
+          )}
         </div>
       </div>
     )
@@ -146,6 +189,17 @@ export default function ReportPage() {
           </p>
         </div>
 
+        {/* 超时的部分报告提示 */}
+        {report.partial && (
+          <div className="bg-yellow-50 border border-yellow-200 rounded-lg p-4 mb-8">
+            <p className="text-sm text-yellow-800">
+              ⚠️ 分析超时，报告仅包含已完成的检查规则
+              {report.unfinished_rules && report.unfinished_rules.length > 0 &&
+                `（未完成：${report.unfinished_rules.join('、')}）`}
+            </p>
+          </div>
+        )}
+
         {/* 总结卡片 */}
         <div className={`rounded-xl p-8 mb-8 ${
           report.is_compliant 
@@ -0,0 +1,258 @@
+"""
+块参照（INSERT）展开
+每个块定义只遍历一次，提取为块坐标下的图元表（嵌套块按深度展开后并入）；
+块参照的图元由 INSERT 变换矩阵对坐标数组做一次仿射变换得到，不逐个调用 virtual_entities()。
+"""
+import math
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+
+# 默认展开的块嵌套层数（模型空间 INSERT 为第 1 层）
+DEFAULT_BLOCK_DEPTH = 4
+
+# 各图元类型的坐标字段（依次对应坐标数组中的点）和尺寸字段（随缩放比例缩放）
+POINT_FIELDS = {
+    "LINE": ("start", "end"),
+    "CIRCLE": ("center",),
+    "TEXT": ("position",),
+    "MTEXT": ("position",),
+}
+SIZE_FIELDS = {
+    "CIRCLE": "radius",
+    "TEXT": "height",
+    "MTEXT": "height",
+}
+# 块定义中不作为图元检查的类型（属性定义只是属性的模板）
+SKIPPED_TYPES = {"ATTDEF"}
+
+# 颜色/线宽/线型的“随块”取值
+COLOR_BYBLOCK = 0
+LINEWEIGHT_BYBLOCK = -2
+LINETYPE_BYBLOCK = "BYBLOCK"
+
+
+class BlockTable:
+    """块定义在块坐标下的图元表（已展开嵌套块）"""
+
+    __slots__ = ('records', 'starts', 'points', 'sizes')
+
+    def __init__(self, records: List[Dict[str, Any]], starts: List[int], points: np.ndarray, sizes: np.ndarray):
+        """
+        Args:
+            records: 图元字段模板（不含坐标和尺寸字段）
+            starts: 各图元在坐标数组中的起始行
+            points: 全部图元的坐标 (P, 2)
+            sizes: 各图元的半径/字高，无尺寸字段时为 NaN
+        """
+        self.records = records
+        self.starts = starts
+        self.points = points
+        self.sizes = sizes
+
+
+def insert_transform(insert) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    INSERT 在 XY 平面上的仿射变换（含块基点、缩放、旋转和插入点）
+
+    Returns:
+        (线性部分 A (2×2), 平移 t, 尺寸缩放比例)，块坐标 p 变换为 p @ A + t
+    """
+    rows = np.array(list(insert.matrix44().rows()), dtype=np.float64)
+    linear = rows[:2, :2]
+    return linear, rows[3, :2], math.sqrt(abs(np.linalg.det(linear)))
+
+
+def _array_count(insert) -> int:
+    """MINSERT 的阵列单元数（普通 INSERT 为 1）"""
+    return max(insert.dxf.get('row_count', 1), 1) * max(insert.dxf.get('column_count', 1), 1)
+
+
+def _resolve(record: Dict[str, Any], layer: str, color: int, linetype: str, lineweight: int, layer_state: Dict[str, bool]):
+    """
+    按块参照的属性解析图元的 0 图层和随块属性，并合并块参照所在图层的隐藏状态（原地修改）
+
+    块参照所在图层关闭时只隐藏随之解析到该图层的 0 图层图元，位于自身图层上的图元仍按自身图层显示；
+    块参照所在图层冻结时块内全部图元都不显示。
+    """
+    if record["layer"] == "0":
+        record["layer"] = layer
+        record["layer_off"] = record["layer_off"] or layer_state.get('is_off', False)
+    if record["color"] == COLOR_BYBLOCK:
+        record["color"] = color
+    if record["linetype"].upper() == LINETYPE_BYBLOCK:
+        record["linetype"] = linetype
+    if record["lineweight"] == LINEWEIGHT_BYBLOCK:
+        record["lineweight"] = lineweight
+    record["layer_frozen"] = record["layer_frozen"] or layer_state.get('is_frozen', False)
+
+
+class BlockExpander:
+    """块参照展开器（每次解析一个实例，块定义表在实例内缓存）"""
+
+    def __init__(self, doc, layer_states: Dict[str, Dict[str, bool]], max_depth: int = DEFAULT_BLOCK_DEPTH):
+        """
+        Args:
+            doc: ezdxf 文档
+            layer_states: 图层名 -> {is_off, is_frozen, ...}
+            max_depth: 最多展开的嵌套层数，0 表示不展开
+        """
+        self.doc = doc
+        self.layer_states = layer_states
+        self.max_depth = max_depth
+        # (块名, 剩余展开层数) -> 图元表；正在构建的块为 None（防止循环引用）
+        self._tables: Dict[Tuple[str, int], Optional[BlockTable]] = {}
+
+    def expand(self, insert) -> List[Dict[str, Any]]:
+        """
+        展开模型空间的块参照
+
+        图元的 handle 为块参照的句柄（便于在图纸中定位），block_handle 为块定义中图元的句柄，
+        block 为嵌套块名路径。MINSERT 的阵列单元属性完全相同，只按第一个单元输出一次并记录 array_count，
+        解析开销不随阵列规模增长。
+
+        Returns:
+            展开后的图元字典（含 type 字段）
+        """
+        if self.max_depth <= 0:
+            return []
+        table = self._table(insert.dxf.name, self.max_depth - 1)
+        if table is None or not table.records:
+            return []
+
+        linear, translation, scale = insert_transform(insert)
+        points = (table.points @ linear + translation).tolist()
+        sizes = (table.sizes * scale).tolist()
+
+        handle = insert.dxf.handle
+        layer = insert.dxf.layer
+        color = insert.dxf.color
+        linetype = insert.dxf.linetype
+        lineweight = insert.dxf.lineweight
+        layer_state = self.layer_states.get(layer, {})
+        count = _array_count(insert)
+
+        entities = []
+        for record, start, size in zip(table.records, table.starts, sizes):
+            entity = dict(record)
+            entity["handle"] = handle
+            _resolve(entity, layer, color, linetype, lineweight, layer_state)
+            entity["is_visible"] = not (entity["layer_off"] or entity["layer_frozen"])
+            entity["array_count"] *= count
+            for offset, name in enumerate(POINT_FIELDS.get(entity["type"], ())):
+                entity[name] = tuple(points[start + offset])
+            size_name = SIZE_FIELDS.get(entity["type"])
+            if size_name:
+                entity[size_name] = size
+            entities.append(entity)
+        return entities
+
+    def _table(self, name: str, depth: int) -> Optional[BlockTable]:
+        """块定义的图元表（按块名和剩余展开层数缓存），块不存在或循环引用时返回 None"""
+        key = (name, depth)
+        if key in self._tables:
+            return self._tables[key]
+        self._tables[key] = None
+        block = self.doc.blocks.get(name)
+        if block is not None:
+            self._tables[key] = self._build(block, depth)
+        return self._tables[key]
+
+    def _build(self, block, depth: int) -> BlockTable:
+        """遍历块定义，嵌套块参照按其变换并入（剩余层数为 0 时只记录 INSERT 本身）"""
+        records: List[Dict[str, Any]] = []
+        starts: List[int] = []
+        point_chunks: List[np.ndarray] = []
+        size_chunks: List[np.ndarray] = []
+        total = 0
+
+        for entity in block:
+            entity_type = entity.dxftype()
+            if entity_type in SKIPPED_TYPES:
+                continue
+
+            record = self._record(entity, block.name)
+            records.append(record)
+            starts.append(total)
+            coords, size = self._geometry(entity, record["type"])
+            point_chunks.append(coords)
+            size_chunks.append(np.array([size]))
+            total += len(coords)
+
+            if entity_type != "INSERT" or depth <= 0:
+                continue
+            child = self._table(entity.dxf.name, depth - 1)
+            if child is None or not child.records:
+                continue
+
+            # 嵌套块：子块图元表变换到本块坐标后并入
+            linear, translation, scale = insert_transform(entity)
+            layer_state = self.layer_states.get(entity.dxf.layer, {}) if entity.dxf.layer != "0" else {}
+            count = _array_count(entity)
+            for child_record, child_start in zip(child.records, child.starts):
+                nested = dict(child_record)
+                _resolve(nested, entity.dxf.layer, entity.dxf.color, entity.dxf.linetype, entity.dxf.lineweight, layer_state)
+                nested["array_count"] *= count
+                nested["block"] = f"{block.name}/{child_record['block']}"
+                records.append(nested)
+                starts.append(total + child_start)
+            point_chunks.append(child.points @ linear + translation)
+            size_chunks.append(child.sizes * scale)
+            total += len(child.points)
+
+        points = np.concatenate(point_chunks) if point_chunks else np.empty((0, 2))
+        sizes = np.concatenate(size_chunks) if size_chunks else np.empty(0)
+        return BlockTable(records, starts, points.reshape(-1, 2), sizes)
+
+    def _record(self, entity, block_name: str) -> Dict[str, Any]:
+        """图元字段模板（与模型空间图元的字典字段一致）"""
+        entity_type = entity.dxftype()
+        if entity_type not in POINT_FIELDS and not entity_type.startswith("DIMENSION"):
+            record_type = "OTHER"
+        elif entity_type.startswith("DIMENSION"):
+            record_type = "DIMENSION"
+        else:
+            record_type = entity_type
+
+        layer = entity.dxf.layer
+        # 0 图层上的图元随块参照的图层，隐藏状态在展开时确定
+        layer_state = self.layer_states.get(layer, {}) if layer != "0" else {}
+        record = {
+            "type": record_type,
+            "handle": entity.dxf.handle,
+            "block_handle": entity.dxf.handle,
+            "block": block_name,
+            "layer": layer,
+            "color": entity.dxf.color,
+            "linetype": entity.dxf.linetype,
+            "lineweight": getattr(entity.dxf, 'lineweight', -1),
+            "is_invisible": getattr(entity.dxf, 'invisible', 0) == 1,
+            "layer_off": layer_state.get('is_off', False),
+            "layer_frozen": layer_state.get('is_frozen', False),
+            "array_count": 1
+        }
+        if record_type == "TEXT":
+            record["text"] = entity.dxf.text
+            record["style"] = getattr(entity.dxf, 'style', 'Standard')
+        elif record_type == "MTEXT":
+            record["text"] = entity.text
+            record["style"] = getattr(entity.dxf, 'style', 'Standard')
+        return record
+
+    @staticmethod
+    def _geometry(entity, record_type: str) -> Tuple[np.ndarray, float]:
+        """图元在块坐标下的坐标点 (k, 2) 和尺寸（半径/字高，没有时为 NaN）"""
+        if record_type == "LINE":
+            start, end = entity.dxf.start, entity.dxf.end
+            return np.array([[start.x, start.y], [end.x, end.y]]), math.nan
+        if record_type == "CIRCLE":
+            center = entity.dxf.center
+            return np.array([[center.x, center.y]]), entity.dxf.radius
+        if record_type == "TEXT":
+            insert = entity.dxf.insert
+            return np.array([[insert.x, insert.y]]), entity.dxf.height
+        if record_type == "MTEXT":
+            insert = entity.dxf.insert
+            return np.array([[insert.x, insert.y]]), getattr(entity.dxf, 'char_height', 2.5)
+        return np.empty((0, 2)), math.nan
@@ -0,0 +1,304 @@
+"""
+检查规则注册表
+每条检查规则声明读取的图元类型、图元列和数据段、适用的检查标准和开销等级；
+引擎按规则集筛选出启用的规则，在线程池中并发执行互不依赖的规则，
+并记录每条规则的耗时。解析器可按启用规则的声明只提取需要的数据。
+传入截止时间时，规则在记录违规项的过程中定期检查，超时的规则不计入结果。
+
+同步维护：本模块在 backend/app/services/、checker/、frontend/checker/ 各有一份副本；
+后端服务与独立部署的检查包之间没有可共享的导入路径，修改时需同步全部副本。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Any, Callable, Hashable, Iterable, Optional, FrozenSet, Tuple
+
+
+class CostClass(str, Enum):
+    """规则开销等级（决定调度方式）"""
+    CHEAP = "cheap"            # 少量整列运算，在调用线程中直接执行
+    MODERATE = "moderate"      # 逐违规行或逐项遍历
+    EXPENSIVE = "expensive"    # 几何计算等，优先提交到线程池
+
+
+# 开销高的规则先提交，缩短整体耗时
+_COST_ORDER = {CostClass.EXPENSIVE: 0, CostClass.MODERATE: 1, CostClass.CHEAP: 2}
+
+# 规则每记录多少条违规检查一次截止时间
+CHECKPOINT_INTERVAL = 256
+
+
+class RuleContext:
+    """
+    单条规则的执行上下文
+
+    规则只通过上下文输出违规项，规则之间不共享可变状态，可以并发执行；
+    所有规则结束后按注册顺序合并结果，保证报告内容与执行顺序无关。
+    """
+
+    __slots__ = ('rule', 'violations', 'grouper', 'deadline', '_countdown')
+
+    def __init__(self, rule: str = "", grouper=None, deadline=None):
+        """
+        Args:
+            rule: 规则名
+            grouper: 聚合模式下的 ViolationGrouper，为 None 时逐条记录
+            deadline: 截止时间（提供 check(stage) 方法，超时抛出 TimeoutError），None 表示不限制
+        """
+        self.rule = rule
+        self.violations: List[Dict[str, Any]] = []
+        self.grouper = grouper
+        self.deadline = deadline
+        self._countdown = CHECKPOINT_INTERVAL
+
+    def checkpoint(self):
+        """检查截止时间（长循环中不产生违规项的规则可直接调用）"""
+        if self.deadline is not None:
+            self.deadline.check(f"check/{self.rule}")
+
+    def add(self, key: Hashable = None, **fields):
+        """
+        记录一条违规
+
+        Args:
+            key: 聚合模式下的关键属性（如线宽值），同规则/图层/关键属性的违规合并为一条
+            **fields: Violation 字段（不含 id）
+        """
+        if self.deadline is not None:
+            self._countdown -= 1
+            if not self._countdown:
+                self._countdown = CHECKPOINT_INTERVAL
+                self.checkpoint()
+        if self.grouper is None:
+            self.violations.append(fields)
+        else:
+            self.grouper.add(fields, key)
+
+    def build(self, make_violation: Callable[..., Any]) -> List[Any]:
+        """按记录顺序构造违规项"""
+        if self.grouper is not None:
+            return self.grouper.build(make_violation)
+        return [make_violation(**fields) for fields in self.violations]
+
+
+@dataclass(frozen=True)
+class CheckRule:
+    """检查规则声明"""
+    name: str
+    check: Callable[[Any, Dict[str, Any], RuleContext], None]
+    columns: FrozenSet[str]
+    sections: FrozenSet[str]
+    cost: CostClass
+    entity_types: Optional[FrozenSet[str]] = None  # 读取 columns 的图元类型，None 表示全部
+    standards: Optional[FrozenSet[str]] = None  # None 表示适用于所有标准
+    description: str = ""
+
+    def enabled_for(self, rule_set) -> bool:
+        """
+        规则是否对该规则集启用
+
+        规则声明了 standards 时只对其中的标准启用；
+        规则文件可用 disabled_checks 列表关闭指定规则。
+        """
+        if self.standards is not None and rule_set.standard not in self.standards:
+            return False
+        return self.name not in rule_set.rules.get('disabled_checks', ())
+
+
+class CheckRuleRegistry:
+    """检查规则注册表（按注册顺序保存）"""
+
+    def __init__(self, known_columns: Optional[Iterable[str]] = None):
+        """
+        Args:
+            known_columns: 合法的图元列名，为 None 时不校验
+        """
+        self.known_columns = frozenset(known_columns) if known_columns is not None else None
+        self._rules: Dict[str, CheckRule] = {}
+
+    def register(
+        self,
+        name: str,
+        columns: Iterable[str] = (),
+        sections: Iterable[str] = (),
+        cost: CostClass = CostClass.MODERATE,
+        entity_types: Optional[Iterable[str]] = None,
+        standards: Optional[Iterable[str]] = None,
+        description: str = ""
+    ):
+        """
+        注册检查规则的装饰器
+
+        被装饰的函数签名为 check(checker, dxf_data, ctx)，检查器方法可直接使用。
+
+        Args:
+            name: 规则名（唯一）
+            columns: 读取的图元列（EntityTable 列名）
+            sections: 读取的其他数据段（如 dimensions、texts）；
+                "段名.字段组" 表示还需要该段中开销较大的可选字段（如 dimensions.measurement）
+            cost: 开销等级
+            entity_types: 读取 columns 的图元类型，None 表示全部类型
+            standards: 适用的检查标准，None 表示全部
+            description: 规则说明
+        """
+        columns = frozenset(columns)
+        if self.known_columns is not None:
+            unknown = columns - self.known_columns
+            if unknown:
+                raise ValueError(f"检查规则 {name} 声明了未知的图元列: {', '.join(sorted(unknown))}")
+        if name in self._rules:
+            raise ValueError(f"检查规则 {name} 重复注册")
+
+        def decorator(check: Callable) -> Callable:
+            self._rules[name] = CheckRule(
+                name=name,
+                check=check,
+                columns=columns,
+                sections=frozenset(sections),
+                cost=CostClass(cost),
+                entity_types=frozenset(entity_types) if entity_types is not None else None,
+                standards=frozenset(standards) if standards is not None else None,
+                # 未提供说明时取函数文档的第一行
+                description=description or (check.__doc__ or "").strip().split("\n")[0]
+            )
+            return check
+
+        return decorator
+
+    def unregister(self, name: str):
+        """移除检查规则"""
+        self._rules.pop(name, None)
+
+    def get(self, name: str) -> CheckRule:
+        return self._rules[name]
+
+    def all(self) -> List[CheckRule]:
+        """全部规则（注册顺序）"""
+        return list(self._rules.values())
+
+    def enabled_for(self, rule_set, names: Optional[Iterable[str]] = None) -> List[CheckRule]:
+        """
+        对该规则集启用的规则（注册顺序）
+
+        Args:
+            rule_set: 规则集
+            names: 只保留这些规则，None 表示全部
+
+        Raises:
+            ValueError: names 中包含未注册的规则
+        """
+        rules = [rule for rule in self._rules.values() if rule.enabled_for(rule_set)]
+        if names is None:
+            return rules
+        names = set(names)
+        unknown = names - set(self._rules)
+        if unknown:
+            available = ', '.join(self._rules)
+            raise ValueError(f"未知的检查规则: {', '.join(sorted(unknown))}（可用: {available}）")
+        return [rule for rule in rules if rule.name in names]
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_rule_pool(max_workers: int) -> ThreadPoolExecutor:
+    """
+    获取进程内共享的规则执行线程池（首次调用时创建，线程数变化时重建）
+
+    被替换的线程池不关闭：已取得它的调用方仍可提交并完成规则，不再被引用后其线程自动退出。
+
+    Raises:
+        ValueError: max_workers 小于 1
+    """
+    global _executor, _executor_workers
+    if max_workers < 1:
+        raise ValueError(f"规则执行线程数必须大于 0: {max_workers}")
+    with _executor_lock:
+        if _executor is None or _executor_workers != max_workers:
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="check-rule"
+            )
+            _executor_workers = max_workers
+        return _executor
+
+
+def _timed(
+    rule: CheckRule,
+    checker,
+    dxf_data: Dict[str, Any],
+    ctx: RuleContext,
+    on_rule: Optional[Callable[[CheckRule, Optional[float]], None]] = None
+) -> Optional[float]:
+    """执行规则并返回耗时；截止时间已过未开始或执行中超时的规则返回 None"""
+    elapsed = None
+    if ctx.deadline is None or not ctx.deadline.expired():
+        start = time.perf_counter()
+        try:
+            rule.check(checker, dxf_data, ctx)
+            elapsed = time.perf_counter() - start
+        except TimeoutError:
+            # 只吞掉截止时间到期（或被取消）引发的超时；规则内部其他来源的 TimeoutError（如 I/O 超时）照常抛出
+            if ctx.deadline is None or not ctx.deadline.expired():
+                raise
+    if on_rule is not None:
+        on_rule(rule, elapsed)
+    return elapsed
+
+
+def run_rules(
+    rules: List[CheckRule],
+    checker,
+    dxf_data: Dict[str, Any],
+    make_context: Callable[[CheckRule], RuleContext],
+    max_workers: int = 1,
+    on_rule: Optional[Callable[[CheckRule, Optional[float]], None]] = None
+) -> List[Tuple[CheckRule, RuleContext, float]]:
+    """
+    执行检查规则
+
+    max_workers > 1 时，非 CHEAP 规则按开销从高到低提交到线程池，
+    CHEAP 规则在调用线程中执行；规则只读共享的解析数据，违规项写入各自的上下文。
+    上下文带截止时间时，超时后未开始的规则不再执行，执行中的规则在下一个检查点退出。
+
+    Args:
+        rules: 要执行的规则
+        checker: 检查器实例（作为规则函数的第一个参数）
+        dxf_data: 解析后的 DXF 数据（只读）
+        make_context: 为每条规则创建上下文（可附带截止时间）
+        max_workers: 并发线程数，1 表示顺序执行
+        on_rule: 每条规则结束时的回调 (规则, 耗时秒数或 None)，并发执行时在线程池中调用
+
+    Returns:
+        按 rules 顺序排列的已完成规则的 (规则, 上下文, 耗时秒数)，超时未完成的规则不包含在内；
+        任一规则出错时抛出其异常
+    """
+    contexts = [make_context(rule) for rule in rules]
+    elapsed: List[Optional[float]] = [None] * len(rules)
+
+    pooled = [i for i, rule in enumerate(rules) if rule.cost != CostClass.CHEAP]
+    if max_workers <= 1 or len(pooled) <= 1:
+        for i, rule in enumerate(rules):
+            elapsed[i] = _timed(rule, checker, dxf_data, contexts[i], on_rule)
+    else:
+        pool = get_rule_pool(max_workers)
+        pooled.sort(key=lambda i: _COST_ORDER[rules[i].cost])
+        futures = {
+            i: pool.submit(_timed, rules[i], checker, dxf_data, contexts[i], on_rule)
+            for i in pooled
+        }
+        for i, rule in enumerate(rules):
+            if i not in futures:
+                elapsed[i] = _timed(rule, checker, dxf_data, contexts[i], on_rule)
+        for i, future in futures.items():
+            elapsed[i] = future.result()
+
+    return [
+        (rule, ctx, seconds)
+        for rule, ctx, seconds in zip(rules, contexts, elapsed)
+        if seconds is not None
+    ]
@@ -1,7 +1,6 @@
 """
 CAD 合规性检查器
 """
-import yaml
 import uuid
 from pathlib import Path
 from datetime import datetime
@@ -14,24 +13,38 @@ from .models import (
     ViolationType,
     SeverityLevel
 )
+from .check_rules import CheckRuleRegistry, CostClass, RuleContext, run_rules
 from .geometry import GeometryEngine
+from .rule_set import get_rule_set
+
+
+# 默认并发执行检查规则的线程数
+DEFAULT_RULE_WORKERS = 4
+
+# 检查规则注册表：规则函数签名为 check(checker, dxf_data, ctx)，
+# columns 为规则读取的图元字典字段
+check_rules = CheckRuleRegistry()
+
+
+def _make_violation(**fields) -> Violation:
+    """由规则记录的字段构造违规项"""
+    return Violation(id=str(uuid.uuid4()), **fields)
 
 
 class ComplianceChecker:
     """合规性检查器"""
     
-    def __init__(self, standard: str = "GB/T 14665-2012"):
+    def __init__(self, standard: str = "GB/T 14665-2012", rule_workers: int = DEFAULT_RULE_WORKERS):
         self.standard = standard
-        self.rules = self._load_rules()
+        # 规则集在进程内缓存，规则文件变化时自动重新加载
+        self.rule_set = get_rule_set(standard)
+        self.rules = self.rule_set.rules
+        self.layer_matcher = self.rule_set.layer_matcher
+        self.rule_workers = rule_workers
         self.violations: List[Violation] = []
+        self.rule_timings: Dict[str, float] = {}
         self.geometry_engine = GeometryEngine()  # Phase 2: 几何引擎
         
-    def _load_rules(self) -> Dict[str, Any]:
-        """加载规则配置"""
-        config_file = Path(__file__).parent.parent / "config" / "rules_gbt14665.yaml"
-        with open(config_file, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    
     def check(
         self,
         dxf_data: Dict[str, Any],
@@ -49,24 +62,33 @@ class ComplianceChecker:
         Returns:
             合规性报告
         """
-        self.violations = []
-        
-        # 执行各项检查
-        self._check_layers(dxf_data)
-        self._check_lineweights(dxf_data)
-        self._check_colors(dxf_data)
-        self._check_fonts(dxf_data)
-        self._check_dimensions(dxf_data)
-        self._check_hidden_entities(dxf_data)  # 检查隐藏/不可见图元
+        # 执行当前标准启用的检查规则（互不依赖的规则并发执行）
+        results = run_rules(
+            check_rules.enabled_for(self.rule_set),
+            self,
+            dxf_data,
+            lambda rule: RuleContext(rule.name),
+            self.rule_workers
+        )
         
-        # Phase 2: 几何关系检查
-        self._check_geometry_relations(dxf_data)
+        # 按注册顺序合并各规则的违规项
+        self.violations = []
+        self.rule_timings = {}
+        for rule, ctx, elapsed in results:
+            self.violations.extend(ctx.build(_make_violation))
+            self.rule_timings[rule.name] = round(elapsed * 1000, 3)
         
         # 生成报告
         report = self._generate_report(dxf_data, analysis_id, file_id)
         return report
     
-    def _check_layers(self, dxf_data: Dict[str, Any]):
+    @check_rules.register(
+        "layers",
+        columns=("handle", "layer", "text", "height", "position"),
+        sections=("entities",),
+        cost=CostClass.MODERATE
+    )
+    def _check_layers(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查图层规范"""
         rules = self.rules['layers']
         entities = dxf_data['entities']
@@ -75,7 +97,7 @@ class ComplianceChecker:
         expected_dim_layers = rules['尺寸层']['expected_names']
         for dim in entities.get('DIMENSION', []):
             layer = dim['layer']
-            if not any(exp_name.upper() in layer.upper() for exp_name in expected_dim_layers):
+            if not self.layer_matcher.matches(layer, '尺寸层'):
                 # 构建详细的实体信息
                 entity_details = {
                     "entity_type": "尺寸标注",
@@ -91,8 +113,7 @@ class ComplianceChecker:
                 if entity_details['display_text']:
                     detail_info += f", 显示文字: '{entity_details['display_text']}'"
                 
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.LAYER,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 表6 - 图层规则",
@@ -101,7 +122,7 @@ class ComplianceChecker:
                     layer=layer,
                     entity_details=entity_details,
                     suggestion=f"将尺寸标注移至 {expected_dim_layers[0]} 图层"
-                ))
+                )
         
         # 检查文字是否在正确图层
         expected_text_layers = rules['文字层']['expected_names']
@@ -110,7 +131,7 @@ class ComplianceChecker:
             # 跳过尺寸标注的文字
             if 'DIM' in layer.upper() or '尺寸' in layer:
                 continue
-            if not any(exp_name.upper() in layer.upper() for exp_name in expected_text_layers):
+            if not self.layer_matcher.matches(layer, '文字层'):
                 # 构建详细的实体信息
                 entity_details = {
                     "entity_type": "文字",
@@ -126,8 +147,7 @@ class ComplianceChecker:
                 if entity_details['position'] != '未知位置':
                     detail_info += f", 位置: ({entity_details['position'][0]:.2f}, {entity_details['position'][1]:.2f})"
                 
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.LAYER,
                     severity=SeverityLevel.INFO,
                     rule="GB/T 14665-2012 表6 - 图层规则",
@@ -136,9 +156,15 @@ class ComplianceChecker:
                     layer=layer,
                     entity_details=entity_details,
                     suggestion=f"将文字移至 {expected_text_layers[0]} 图层"
-                ))
+                )
     
-    def _check_lineweights(self, dxf_data: Dict[str, Any]):
+    @check_rules.register(
+        "lineweights",
+        columns=("handle", "layer", "lineweight"),
+        sections=("entities",),
+        cost=CostClass.MODERATE
+    )
+    def _check_lineweights(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查线宽规范"""
         rules = self.rules['lineweights']
         tolerance = rules['tolerance']
@@ -182,8 +208,7 @@ class ComplianceChecker:
                     # 构建更详细的描述
                     detail_info = f"当前线宽: {lineweight_mm:.2f}mm, 推荐: {recommended_weight:.2f}mm"
                     
-                    self.violations.append(Violation(
-                        id=str(uuid.uuid4()),
+                    ctx.add(
                         type=ViolationType.LINEWEIGHT,
                         severity=SeverityLevel.WARNING,
                         rule="GB/T 14665-2012 表1 - 线宽规则",
@@ -192,9 +217,10 @@ class ComplianceChecker:
                         layer=entity['layer'],
                         entity_details=entity_details,
                         suggestion=f"使用标准线宽: {recommended_weight}mm"
-                    ))
+                    )
     
-    def _check_colors(self, dxf_data: Dict[str, Any]):
+    @check_rules.register("colors", columns=("color",), sections=("entities",), cost=CostClass.MODERATE)
+    def _check_colors(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查颜色规范"""
         rules = self.rules['colors']
         default_color = rules['default']
@@ -212,16 +238,16 @@ class ComplianceChecker:
         
         # 如果使用过多颜色，给出提示
         if len(non_standard_colors) > 10:
-            self.violations.append(Violation(
-                id=str(uuid.uuid4()),
+            ctx.add(
                 type=ViolationType.COLOR,
                 severity=SeverityLevel.INFO,
                 rule="GB/T 14665-2012 表2 - 颜色规则",
                 description=f"检测到 {len(non_standard_colors)} 个实体使用了非标准颜色。建议统一使用随层或默认颜色",
                 suggestion="将实体颜色设置为 ByLayer（随层）以便统一管理"
-            ))
+            )
     
-    def _check_fonts(self, dxf_data: Dict[str, Any]):
+    @check_rules.register("fonts", sections=("texts",), cost=CostClass.MODERATE)
+    def _check_fonts(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查字体规范"""
         rules = self.rules['fonts']
         min_height = rules['min_height']
@@ -232,8 +258,7 @@ class ComplianceChecker:
             height = text['height']
             
             if height < min_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.FONT,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 表3 - 字体规则",
@@ -241,11 +266,10 @@ class ComplianceChecker:
                     entity_handle=text['handle'],
                     layer=text['layer'],
                     suggestion=f"将文字高度调整至 {min_height}mm 以上"
-                ))
+                )
             
             elif height > max_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.FONT,
                     severity=SeverityLevel.INFO,
                     rule="GB/T 14665-2012 表3 - 字体规则",
@@ -253,9 +277,10 @@ class ComplianceChecker:
                     entity_handle=text['handle'],
                     layer=text['layer'],
                     suggestion=f"将文字高度调整至 {max_height}mm 以内"
-                ))
+                )
     
-    def _check_dimensions(self, dxf_data: Dict[str, Any]):
+    @check_rules.register("dimensions", sections=("dimensions",), cost=CostClass.MODERATE)
+    def _check_dimensions(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查尺寸标注规范"""
         dimensions = dxf_data['dimensions']
         
@@ -277,21 +302,19 @@ class ComplianceChecker:
             consistency = count / len(arrow_sizes)
             
             if consistency < consistency_threshold:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.DIMENSION,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 6.3节 - 尺寸终端一致性",
                     description=f"尺寸终端类型一致性仅为 {consistency*100:.1f}%，建议达到 {consistency_threshold*100:.0f}%",
                     suggestion=f"统一使用相同的尺寸终端样式（当前主要使用箭头大小: {most_common_size:.1f}mm）"
-                ))
+                )
         
         # 检查尺寸文字高度
         for dim in dimensions:
             text_height = dim['text_height']
             if text_height > 0 and text_height < min_text_height:
-                self.violations.append(Violation(
-                    id=str(uuid.uuid4()),
+                ctx.add(
                     type=ViolationType.DIMENSION,
                     severity=SeverityLevel.WARNING,
                     rule="GB/T 14665-2012 - 尺寸文字高度",
@@ -299,9 +322,15 @@ class ComplianceChecker:
                     entity_handle=dim['handle'],
                     layer=dim['layer'],
                     suggestion=f"将尺寸文字高度调整至 {min_text_height}mm 以上"
-                ))
+                )
     
-    def _check_hidden_entities(self, dxf_data: Dict[str, Any]):
+    @check_rules.register(
+        "hidden_entities",
+        columns=("handle", "layer", "layer_off", "layer_frozen", "is_invisible"),
+        sections=("entities",),
+        cost=CostClass.MODERATE
+    )
+    def _check_hidden_entities(self, dxf_data: Dict[str, Any], ctx: RuleContext):
         """检查隐藏和不可见的图元"""
         entities = dxf_data.get('entities', {})
         
@@ -352,8 +381,7 @@ class ComplianceChecker:
             if layer_frozen_entities:
                 detail_info += f"\n- 图层冻结: {len(layer_frozen_entities)} 个，涉及图层: {', '.join(set(e['layer'] for e in layer_frozen_entities[:5]))}"
             
-            self.violations.append(Violation(
-                id=str(uuid.uuid4()),
+            ctx.add(
                 type=ViolationType.LAYER,
                 severity=SeverityLevel.WARNING,
                 rule="图元可见性检查",
@@ -368,12 +396,11 @@ class ComplianceChecker:
                     ))
                 },
                 suggestion="在 CAD 软件中打开所有图层，解冻冻结的图层，然后重新保存为 DXF"
-            ))
+            )
         
         # 如果有不可见属性的图元，生成提示
         if invisible_count > 0:
-            self.violations.append(Violation(
-                id=str(uuid.uuid4()),
+            ctx.add(
                 type=ViolationType.GEOMETRY,
                 severity=SeverityLevel.INFO,
                 rule="图元可见性检查",
@@ -383,29 +410,44 @@ class ComplianceChecker:
                     "entity_types": list(set(e['type'] for e in invisible_entities))
                 },
                 suggestion="检查是否有图元被意外设置为不可见状态"
-            ))
+            )
     
-    def _check_geometry_relations(self, dxf_data: Dict[str, Any]):
-        """
-        Phase 2: 检查几何关系（尺寸线-文字相交、对齐等）
-        """
+    # Phase 2: 几何关系检查（尺寸线-文字相交、对齐、尺寸界线间距）
+    
+    @check_rules.register(
+        "dimension_text_overlap",
+        sections=("dimensions", "texts"),
+        cost=CostClass.EXPENSIVE
+    )
+    def _check_dimension_text_overlap(self, dxf_data: Dict[str, Any], ctx: RuleContext):
+        """检查尺寸线与文字是否相交"""
         dimensions = dxf_data.get('dimensions', [])
         texts = dxf_data.get('texts', [])
-        
         if not dimensions or not texts:
             return
-        
-        # 尺寸线与文字相交检测
-        violations = self.geometry_engine.check_dimension_text_overlap(dimensions, texts)
-        self.violations.extend(violations)
-        
-        # 尺寸对齐检查
-        violations = self.geometry_engine.check_dimension_alignment(dimensions)
-        self.violations.extend(violations)
-        
-        # 尺寸界线间距检查
-        violations = self.geometry_engine.check_dimension_extension_line_gap(dimensions)
-        self.violations.extend(violations)
+        self._add_geometry_violations(ctx, self.geometry_engine.check_dimension_text_overlap(dimensions, texts))
+    
+    @check_rules.register("dimension_alignment", sections=("dimensions",), cost=CostClass.MODERATE)
+    def _check_dimension_alignment(self, dxf_data: Dict[str, Any], ctx: RuleContext):
+        """检查尺寸对齐"""
+        dimensions = dxf_data.get('dimensions', [])
+        if not dimensions:
+            return
+        self._add_geometry_violations(ctx, self.geometry_engine.check_dimension_alignment(dimensions))
+    
+    @check_rules.register("dimension_extension_gap", sections=("dimensions",), cost=CostClass.MODERATE)
+    def _check_dimension_extension_gap(self, dxf_data: Dict[str, Any], ctx: RuleContext):
+        """检查尺寸界线间距"""
+        dimensions = dxf_data.get('dimensions', [])
+        if not dimensions:
+            return
+        self._add_geometry_violations(ctx, self.geometry_engine.check_dimension_extension_line_gap(dimensions))
+    
+    @staticmethod
+    def _add_geometry_violations(ctx: RuleContext, violations: List[Violation]):
+        """几何引擎返回完整的 Violation，转为字段记录到规则上下文"""
+        for violation in violations:
+            ctx.add(**violation.model_dump(exclude={'id'}))
     
     def _generate_report(
         self,
@@ -442,5 +484,6 @@ class ComplianceChecker:
             info_count=info_count,
             violations=self.violations,
             is_compliant=is_compliant,
-            compliance_score=score
+            compliance_score=score,
+            rule_timings=self.rule_timings
         )
@@ -2,12 +2,35 @@
 几何关系引擎 - Phase 2
 使用 Shapely 进行二维几何关系计算
 """
+import math
 import uuid
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
 from shapely.geometry import LineString, box, Point
 from shapely import distance
 
 from .models import Violation, ViolationType, SeverityLevel
+from .parser import DIM_BLOCK_LINE, DIM_BLOCK_EXT1, DIM_BLOCK_EXT2
+
+
+# DIMENSION 实体的尺寸类型（dimtype 低 4 位）
+DIM_LINEAR = 0      # 线性（含旋转）
+DIM_ALIGNED = 1     # 对齐
+DIM_DIAMETER = 3    # 直径
+DIM_RADIUS = 4      # 半径
+DIM_ORDINATE = 6    # 坐标
+
+# 同一行/列尺寸的分组容差（mm）：组内文字坐标与组内最小坐标之差不超过该值
+ALIGNMENT_GROUP_TOLERANCE = 5.0
+# 同一行/列尺寸沿尺寸线方向的最大间隙（mm）：尺寸线范围重叠或相距不超过该值才归为一组
+ALIGNMENT_EXTENT_GAP = 5.0
+# 同组尺寸文字坐标的最大允许偏差（mm）
+TEXT_ALIGNMENT_TOLERANCE = 0.1
+# 尺寸线方向判定：分量之比不超过该值视为水平/竖直
+ORIENTATION_TOLERANCE = 1e-3
 
 
 class GeometryEngine:
@@ -20,38 +43,35 @@ class GeometryEngine:
         """
         检测尺寸线与文字边界框是否相交
         
+        尺寸线和文字边界框各构造一次几何数组，文字框建立 STRtree，
+        由批量 query(predicate='intersects') 直接得到相交的 (尺寸, 文字) 对，
+        避免逐对调用 intersects 的 O(D·T) 开销
+        
         P2-F01 验收标准 #1
         """
-        violations = []
+        dim_index, dim_lines = self._dimension_lines(dimensions)
+        text_index, text_boxes = self._text_bboxes(texts)
+        if not len(dim_lines) or not len(text_boxes):
+            return []
         
-        for dim in dimensions:
-            # 尝试获取尺寸线的几何信息
-            if 'geometry' not in dim:
-                continue
-            
-            dim_line = self._create_dimension_line(dim)
-            if not dim_line:
-                continue
-            
-            # 检查与所有文字的碰撞
-            for text in texts:
-                if 'position' not in text or 'height' not in text:
-                    continue
-                
-                # 创建文字边界框（估算宽度）
-                text_box = self._create_text_bbox(text)
-                
-                if dim_line.intersects(text_box):
-                    violations.append(Violation(
-                        id=str(uuid.uuid4()),
-                        type=ViolationType.GEOMETRY,
-                        severity=SeverityLevel.WARNING,
-                        rule="GB/T 14665-2012 - 尺寸线与文字不应相交",
-                        description=f"尺寸线与文字 '{text.get('text', '')[:20]}...' 发生相交",
-                        entity_handle=dim.get('handle'),
-                        layer=dim.get('layer'),
-                        suggestion="调整尺寸线或文字位置，避免遮挡"
-                    ))
+        tree = STRtree(text_boxes)
+        line_pos, box_pos = tree.query(dim_lines, predicate='intersects')
+        
+        # 按尺寸、文字的图纸顺序输出
+        violations = []
+        for i in np.lexsort((box_pos, line_pos)).tolist():
+            dim = dimensions[dim_index[line_pos[i]]]
+            text = texts[text_index[box_pos[i]]]
+            violations.append(Violation(
+                id=str(uuid.uuid4()),
+                type=ViolationType.GEOMETRY,
+                severity=SeverityLevel.WARNING,
+                rule="GB/T 14665-2012 - 尺寸线与文字不应相交",
+                description=f"尺寸线与文字 '{text.get('text', '')[:20]}...' 发生相交",
+                entity_handle=dim.get('handle'),
+                layer=dim.get('layer'),
+                suggestion="调整尺寸线或文字位置，避免遮挡"
+            ))
         
         return violations
     
@@ -64,15 +84,39 @@ class GeometryEngine:
         violations = []
         tolerance = 1.0  # 允许误差 1mm
         
-        for dim in dimensions:
-            if 'extension_lines' not in dim:
-                continue
-            
-            # 简化实现：检查尺寸线是否在界线之间
-            # 实际 DXF 尺寸实体结构复杂，此处为示例
-            
-            # TODO: 实现具体的界线-尺寸线距离计算
-            pass
+        # 解析器从尺寸几何块提取的坐标数组，一次性堆叠为 (n, 4, 4)
+        index = [i for i, dim in enumerate(dimensions) if dim.get('block_geometry') is not None]
+        if not index:
+            return violations
+        geometry = np.stack([dimensions[i]['block_geometry'] for i in index])
+        dim_lines = geometry[:, DIM_BLOCK_LINE]
+        
+        # 尺寸线与每条尺寸界线的最短距离（界线被抑制时为 NaN）
+        gaps = np.full((len(index), 2), np.nan)
+        for column, row in enumerate((DIM_BLOCK_EXT1, DIM_BLOCK_EXT2)):
+            ext_lines = geometry[:, row]
+            valid = np.isfinite(dim_lines).all(axis=1) & np.isfinite(ext_lines).all(axis=1)
+            if valid.any():
+                gaps[valid, column] = shapely.distance(
+                    shapely.linestrings(dim_lines[valid].reshape(-1, 2, 2)),
+                    shapely.linestrings(ext_lines[valid].reshape(-1, 2, 2))
+                )
+        
+        exceeded = np.where(np.isnan(gaps), -np.inf, gaps).max(axis=1) > tolerance
+        for position in np.flatnonzero(exceeded).tolist():
+            dim = dimensions[index[position]]
+            gap = float(np.nanmax(gaps[position]))
+            violations.append(Violation(
+                id=str(uuid.uuid4()),
+                type=ViolationType.GEOMETRY,
+                severity=SeverityLevel.WARNING,
+                rule="GB/T 14665-2012 - 尺寸线应与尺寸界线相接",
+                description=f"尺寸线与尺寸界线相距 {gap:.2f}mm",
+                entity_handle=dim.get('handle'),
+                layer=dim.get('layer'),
+                entity_details={"gap": round(gap, 3)},
+                suggestion="调整尺寸线或尺寸界线，使尺寸线端点落在尺寸界线上"
+            ))
         
         return violations
     
@@ -85,33 +129,105 @@ class GeometryEngine:
         violations = []
         
         # 分组：按接近的 Y 坐标（水平对齐）或 X 坐标（垂直对齐）
-        horizontal_groups = self._group_dimensions_by_alignment(dimensions, axis='horizontal')
-        vertical_groups = self._group_dimensions_by_alignment(dimensions, axis='vertical')
-        
-        # 检查每组内的文字对齐
-        for group in horizontal_groups + vertical_groups:
-            if len(group) < 2:
-                continue
+        for axis in ('horizontal', 'vertical'):
+            members, keys, starts = self._group_dimensions_by_alignment(dimensions, axis=axis)
             
-            misaligned = self._check_group_text_alignment(group)
-            if misaligned:
+            # 检查每组内的文字对齐
+            ends = np.append(starts[1:], len(members))
+            for group in self._check_group_text_alignment(keys, starts).tolist():
+                group_dims = [dimensions[i] for i in members[starts[group]:ends[group]].tolist()]
+                offset = float(keys[ends[group] - 1] - keys[starts[group]])
                 violations.append(Violation(
                     id=str(uuid.uuid4()),
                     type=ViolationType.GEOMETRY,
                     severity=SeverityLevel.INFO,
                     rule="GB/T 14665-2012 - 尺寸文字应对齐",
-                    description=f"检测到 {len(group)} 个尺寸标注未对齐",
+                    description=f"检测到 {len(group_dims)} 个尺寸标注未对齐",
+                    entity_handle=group_dims[0].get('handle'),
+                    layer=group_dims[0].get('layer'),
+                    entity_details={
+                        "axis": axis,
+                        "handles": [dim.get('handle') for dim in group_dims],
+                        "offset": round(offset, 3)
+                    },
                     suggestion="对齐同一行/列的尺寸文字，提高可读性"
                 ))
         
         return violations
     
-    def _create_dimension_line(self, dim: Dict) -> LineString:
-        """根据尺寸标注创建线段（简化实现）"""
-        # DXF 尺寸实体结构复杂，此处简化
-        # 实际应解析 DIMENSION 实体的几何块
+    def _create_dimension_line(self, dim: Dict) -> Optional[LineString]:
+        """根据尺寸标注的几何块或定义点创建尺寸线，无法确定时返回 None"""
+        endpoints = self._dimension_line_endpoints(dim)
+        return LineString(endpoints) if endpoints else None
+    
+    @staticmethod
+    def _dimension_line_endpoints(dim: Dict) -> Optional[Tuple[Tuple[float, float], Tuple[float, float]]]:
+        """
+        计算尺寸线的两个端点
+        
+        优先使用解析器从尺寸几何块中提取的实际尺寸线；没有几何块时由定义点计算。
+        线性/对齐尺寸：尺寸线经过 defpoint，端点为两个尺寸界线起点（defpoint2/3）
+        在尺寸线方向上的投影；线性尺寸的方向由 angle 给出，对齐尺寸平行于两个起点的连线。
+        直径/半径尺寸：defpoint 到 defpoint4；坐标尺寸：引线 defpoint2 到 defpoint3。
+        角度尺寸（圆弧）等其他类型返回 None。
+        """
+        block_geometry = dim.get('block_geometry')
+        if block_geometry is not None:
+            x0, y0, x1, y1 = block_geometry[DIM_BLOCK_LINE].tolist()
+            if not math.isnan(x0):
+                return (x0, y0), (x1, y1)
+        if not dim.get('geometry'):
+            return None
+        kind = dim.get('dimension_kind', DIM_LINEAR)
+        
+        if kind in (DIM_LINEAR, DIM_ALIGNED):
+            if 'defpoint' not in dim or 'defpoint2' not in dim or 'defpoint3' not in dim:
+                return None
+            px, py = dim['defpoint']
+            x2, y2 = dim['defpoint2']
+            x3, y3 = dim['defpoint3']
+            if kind == DIM_ALIGNED:
+                length = math.hypot(x3 - x2, y3 - y2)
+                if length == 0:
+                    return None
+                ux, uy = (x3 - x2) / length, (y3 - y2) / length
+            else:
+                angle = math.radians(dim.get('angle', 0.0))
+                ux, uy = math.cos(angle), math.sin(angle)
+            t2 = (x2 - px) * ux + (y2 - py) * uy
+            t3 = (x3 - px) * ux + (y3 - py) * uy
+            return (px + ux * t2, py + uy * t2), (px + ux * t3, py + uy * t3)
+        
+        if kind in (DIM_DIAMETER, DIM_RADIUS):
+            if 'defpoint' not in dim or 'defpoint4' not in dim:
+                return None
+            return dim['defpoint'], dim['defpoint4']
+        
+        if kind == DIM_ORDINATE:
+            if 'defpoint2' not in dim or 'defpoint3' not in dim:
+                return None
+            return dim['defpoint2'], dim['defpoint3']
+        
         return None
     
+    def _dimension_lines(self, dimensions: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        构造所有可确定尺寸线的尺寸标注的线段几何数组
+        
+        Returns:
+            (尺寸标注在 dimensions 中的下标, LineString 数组)
+        """
+        index = []
+        coords = []
+        for i, dim in enumerate(dimensions):
+            endpoints = self._dimension_line_endpoints(dim)
+            if endpoints:
+                index.append(i)
+                coords.append(endpoints)
+        if not coords:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=object)
+        return np.asarray(index, dtype=np.intp), shapely.linestrings(np.asarray(coords, dtype=np.float64))
+    
     def _create_text_bbox(self, text: Dict) -> box:
         """创建文字的边界框"""
         x, y = text['position']
@@ -122,21 +238,125 @@ class GeometryEngine:
         
         return box(x, y, x + width, y + height)
     
+    def _text_bboxes(self, texts: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次性构造所有文字的边界框几何数组（宽度估算同 _create_text_bbox）
+        
+        Returns:
+            (文字在 texts 中的下标, Polygon 数组)
+        """
+        index = []
+        values = []
+        for i, text in enumerate(texts):
+            if 'position' not in text or 'height' not in text:
+                continue
+            x, y = text['position']
+            index.append(i)
+            values.append((x, y, len(text.get('text', '')), text['height']))
+        if not values:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=object)
+        x, y, length, height = np.asarray(values, dtype=np.float64).T
+        return np.asarray(index, dtype=np.intp), shapely.box(x, y, x + length * height * 0.8, y + height)
+    
+    def _alignment_keys(self, dimensions: List[Dict], axis: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        取出指定方向的尺寸及其文字坐标
+        
+        horizontal：尺寸线水平的尺寸，取文字 Y 坐标和尺寸线的 X 范围；
+        vertical：尺寸线竖直的尺寸，取文字 X 坐标和尺寸线的 Y 范围。
+        没有文字位置或无法确定尺寸线的尺寸被跳过。
+        
+        Returns:
+            (尺寸标注在 dimensions 中的下标, 文字坐标, 尺寸线范围起点, 尺寸线范围终点)
+        """
+        index = []
+        values = []
+        for i, dim in enumerate(dimensions):
+            if 'text_position' not in dim:
+                continue
+            endpoints = self._dimension_line_endpoints(dim)
+            if not endpoints:
+                continue
+            (x0, y0), (x1, y1) = endpoints
+            dx, dy = abs(x1 - x0), abs(y1 - y0)
+            if axis == 'horizontal':
+                if dx > 0 and dy <= dx * ORIENTATION_TOLERANCE:
+                    index.append(i)
+                    values.append((dim['text_position'][1], min(x0, x1), max(x0, x1)))
+            elif dy > 0 and dx <= dy * ORIENTATION_TOLERANCE:
+                index.append(i)
+                values.append((dim['text_position'][0], min(y0, y1), max(y0, y1)))
+        keys, lows, highs = np.asarray(values, dtype=np.float64).reshape(-1, 3).T
+        return np.asarray(index, dtype=np.intp), keys, lows, highs
+    
     def _group_dimensions_by_alignment(
         self, 
         dimensions: List[Dict], 
         axis: str = 'horizontal'
-    ) -> List[List[Dict]]:
-        """将尺寸按对齐方式分组"""
-        groups = []
-        tolerance = 5.0  # 5mm 容差
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        将尺寸按对齐方式分组
+        
+        1. 按文字坐标排序后扫描一遍分带：坐标与当前带的第一个（最小）坐标之差超过
+           ALIGNMENT_GROUP_TOLERANCE 时开始新带，带宽不超过容差（不会像逐对比较那样链式延伸）；
+        2. 带内按尺寸线范围起点排序，范围与已扫过部分重叠或相距不超过 ALIGNMENT_EXTENT_GAP 时
+           归入同一组，同一高度上相距很远的两排尺寸不会被当作同一行。
+        总体 O(n log n)。
         
-        # TODO: 实现具体的分组逻辑
-        # 需要根据尺寸标注的位置信息分组
+        Returns:
+            (按组、组内按文字坐标排序的尺寸下标, 对应的文字坐标, 各组在排序结果中的起始位置)
+        """
+        index, keys, lows, highs = self._alignment_keys(dimensions, axis)
+        order = np.argsort(keys, kind='stable')
+        bands = np.empty(len(order), dtype=np.intp)
+        band = -1
+        band_start = -np.inf
+        for position, key in enumerate(keys[order].tolist()):
+            if key - band_start > ALIGNMENT_GROUP_TOLERANCE:
+                band += 1
+                band_start = key
+            bands[position] = band
+        
+        # 带内按范围起点排序，合并重叠或相近的范围
+        band_of = np.empty(len(order), dtype=np.intp)
+        band_of[order] = bands
+        order = np.lexsort((lows, band_of))
+        groups = np.empty(len(order), dtype=np.intp)
+        group = -1
+        previous_band = -1
+        reach = -np.inf
+        for position, (member_band, low, high) in enumerate(zip(
+            band_of[order].tolist(), lows[order].tolist(), highs[order].tolist()
+        )):
+            if member_band != previous_band or low - reach > ALIGNMENT_EXTENT_GAP:
+                group += 1
+                previous_band = member_band
+                reach = high
+            else:
+                reach = max(reach, high)
+            groups[position] = group
         
-        return groups
+        # 组内按文字坐标排序（组内偏差即首尾之差）
+        group_of = np.empty(len(order), dtype=np.intp)
+        group_of[order] = groups
+        order = np.lexsort((keys, group_of))
+        starts = np.flatnonzero(np.diff(group_of[order], prepend=-1) != 0)
+        return index[order], keys[order], starts
     
-    def _check_group_text_alignment(self, group: List[Dict]) -> bool:
-        """检查一组尺寸的文字是否对齐"""
-        # TODO: 检查文字位置、小数点对齐
-        return False
+    def _check_group_text_alignment(self, keys: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """
+        检查各组尺寸的文字是否对齐
+        
+        Args:
+            keys: 排序后的文字坐标
+            starts: 各组的起始位置
+        
+        Returns:
+            文字未对齐的组序号（组内至少两个尺寸，且文字坐标偏差超过 TEXT_ALIGNMENT_TOLERANCE）
+        """
+        if not len(starts):
+            return np.empty(0, dtype=np.intp)
+        ends = np.append(starts[1:], len(keys))
+        # 组内已排序，偏差即首尾之差
+        offsets = keys[ends - 1] - keys[starts]
+        return np.flatnonzero((ends - starts >= 2) & (offsets > TEXT_ALIGNMENT_TOLERANCE))
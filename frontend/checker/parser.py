@@ -1,17 +1,40 @@
 """
 DXF 文件解析器
 """
+import math
 import ezdxf
+import numpy as np
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+
+from .block_expander import BlockExpander, DEFAULT_BLOCK_DEPTH
+
+
+# 尺寸几何块坐标数组（4×4，float64）的行：尺寸线、两条尺寸界线为 (x0, y0, x1, y1)，
+# 文字框为 (xmin, ymin, xmax, ymax)；块中不存在的部分为 NaN
+DIM_BLOCK_LINE = 0
+DIM_BLOCK_EXT1 = 1
+DIM_BLOCK_EXT2 = 2
+DIM_BLOCK_TEXT = 3
+# 判断线段与尺寸线共线、尺寸界线经过定义点的相对容差
+DIM_BLOCK_TOLERANCE = 1e-6
 
 
 class DXFParser:
     """DXF 文件解析器"""
     
-    def __init__(self):
+    def __init__(self, max_block_depth: int = DEFAULT_BLOCK_DEPTH):
+        """
+        Args:
+            max_block_depth: 块参照最多展开的嵌套层数，0 表示不展开块参照
+        """
         self.doc = None
         self.modelspace = None
+        self.max_block_depth = max_block_depth
+        # 块参照展开得到的文字（由 _extract_entities 收集，并入 texts）
+        self._block_texts: List[Dict[str, Any]] = []
+        # 尺寸几何块名 -> 块坐标下的坐标数组（同一块只遍历一次）
+        self._dimension_blocks: Dict[str, Optional[np.ndarray]] = {}
         
     def parse(self, file_path: str) -> Dict[str, Any]:
         """
@@ -27,6 +50,8 @@ class DXFParser:
             # 读取 DXF 文件
             self.doc = ezdxf.readfile(file_path)
             self.modelspace = self.doc.modelspace()
+            self._dimension_blocks = {}
+            self._block_texts = []
             
             # 提取关键信息
             data = {
@@ -83,6 +108,7 @@ class DXFParser:
                 "is_frozen": layer.is_frozen(),
                 "is_locked": layer.is_locked()
             }
+        expander = BlockExpander(self.doc, layer_states, self.max_block_depth)
         
         for entity in self.modelspace:
             entity_type = entity.dxftype()
@@ -143,9 +169,61 @@ class DXFParser:
                 
             else:
                 entities["OTHER"].append(entity_data)
+                if entity_type == "INSERT" and self.max_block_depth > 0:
+                    self._add_block_entities(entity, expander, entities, layer_states)
         
         return entities
     
+    def _add_block_entities(
+        self,
+        insert,
+        expander: BlockExpander,
+        entities: Dict[str, List[Dict[str, Any]]],
+        layer_states: Dict[str, Dict[str, bool]]
+    ):
+        """展开块参照：块内图元和块参照的属性（ATTRIB）按类型并入图元列表，文字同时并入 texts"""
+        for block_entity in expander.expand(insert):
+            entity_type = block_entity.pop("type")
+            entities[entity_type].append(block_entity)
+            if entity_type in ("TEXT", "MTEXT"):
+                self._block_texts.append(self._text_data(block_entity, entity_type))
+        
+        for attrib in insert.attribs:
+            layer_state = layer_states.get(attrib.dxf.layer, {})
+            attrib_data = {
+                "handle": attrib.dxf.handle,
+                "layer": attrib.dxf.layer,
+                "color": attrib.dxf.color,
+                "linetype": attrib.dxf.linetype,
+                "lineweight": getattr(attrib.dxf, 'lineweight', -1),
+                "is_visible": not (layer_state.get('is_off', False) or layer_state.get('is_frozen', False)),
+                "is_invisible": attrib.is_invisible,
+                "layer_off": layer_state.get('is_off', False),
+                "layer_frozen": layer_state.get('is_frozen', False),
+                "block": insert.dxf.name,
+                "text": attrib.dxf.text,
+                "height": attrib.dxf.height,
+                "position": (attrib.dxf.insert.x, attrib.dxf.insert.y),
+                "style": getattr(attrib.dxf, 'style', 'Standard')
+            }
+            entities["TEXT"].append(attrib_data)
+            self._block_texts.append(self._text_data(attrib_data, "ATTRIB"))
+    
+    @staticmethod
+    def _text_data(entity: Dict[str, Any], entity_type: str) -> Dict[str, Any]:
+        """由展开的文字图元构造 texts 条目"""
+        return {
+            "handle": entity["handle"],
+            "type": entity_type,
+            "layer": entity["layer"],
+            "text": entity["text"],
+            "height": entity["height"],
+            "position": entity["position"],
+            "style": entity["style"],
+            "color": entity["color"],
+            "block": entity["block"]
+        }
+    
     def _extract_dimensions(self) -> List[Dict[str, Any]]:
         """提取尺寸标注信息（Phase 2: 增强几何信息）"""
         dimensions = []
@@ -155,6 +233,8 @@ class DXFParser:
                 "handle": dim.dxf.handle,
                 "layer": dim.dxf.layer,
                 "dimtype": dim.dxftype(),
+                "dimension_kind": dim.dimtype,  # 0 线性 1 对齐 2 角度 3 直径 4 半径 5 三点角度 6 坐标
+                "angle": getattr(dim.dxf, 'angle', 0.0),  # 线性尺寸的旋转角（度）
                 "text_override": getattr(dim.dxf, 'text', ''),
                 "text_height": getattr(dim.dxf, 'dimtxt', 0),
                 "arrow_size": getattr(dim.dxf, 'dimasz', 0),
@@ -178,6 +258,8 @@ class DXFParser:
                     dim_data['defpoint2'] = (dim.dxf.defpoint2.x, dim.dxf.defpoint2.y)
                 if hasattr(dim.dxf, 'defpoint3'):
                     dim_data['defpoint3'] = (dim.dxf.defpoint3.x, dim.dxf.defpoint3.y)
+                if dim.dxf.hasattr('defpoint4'):
+                    dim_data['defpoint4'] = (dim.dxf.defpoint4.x, dim.dxf.defpoint4.y)
                 if hasattr(dim.dxf, 'text_midpoint'):
                     dim_data['text_position'] = (dim.dxf.text_midpoint.x, dim.dxf.text_midpoint.y)
                 
@@ -186,10 +268,146 @@ class DXFParser:
             except:
                 dim_data['geometry'] = False
             
+            # 从尺寸几何块（*D 匿名块）提取实际绘制的尺寸线、尺寸界线和文字框
+            try:
+                block_geometry = self._dimension_block_geometry(dim, dim_data)
+            except Exception:
+                block_geometry = None
+            if block_geometry is not None:
+                dim_data['block_geometry'] = block_geometry
+            
             dimensions.append(dim_data)
         
         return dimensions
     
+    def _dimension_block_geometry(self, dim, dim_data: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        尺寸标注的几何块坐标数组（见 DIM_BLOCK_* 行定义），没有几何块时返回 None
+        
+        几何块按块名缓存，块坐标换算到 WCS 时加上尺寸标注的插入点偏移。
+        """
+        name = dim.dxf.get('geometry')
+        if not name:
+            return None
+        insert = dim.dxf.get('insert')
+        offset = (insert.x, insert.y) if insert is not None else (0.0, 0.0)
+        
+        if name not in self._dimension_blocks:
+            block = self.doc.blocks.get(name)
+            self._dimension_blocks[name] = (
+                self._read_dimension_block(block, dim_data, offset) if block is not None else None
+            )
+        geometry = self._dimension_blocks[name]
+        if geometry is None or offset == (0.0, 0.0):
+            return geometry
+        return geometry + np.array(offset * 2)
+    
+    @staticmethod
+    def _read_dimension_block(block, dim_data: Dict[str, Any], offset: Tuple[float, float]) -> np.ndarray:
+        """
+        遍历尺寸几何块，区分尺寸线和尺寸界线
+        
+        线性/对齐尺寸：与尺寸线方向平行的 LINE 中离 defpoint 最近的一条直线上的线段为尺寸线
+        （被文字断开时合并为一段），其余 LINE 中所在直线经过 defpoint2/defpoint3 的为两条尺寸界线；
+        其他类型只取最长的 LINE 作为尺寸线。文字框取块中第一个 MTEXT/TEXT 的估算包围盒。
+        """
+        geometry = np.full((4, 4), np.nan)
+        lines = []
+        for entity in block:
+            entity_type = entity.dxftype()
+            if entity_type == 'LINE':
+                start, end = entity.dxf.start, entity.dxf.end
+                lines.append((start.x, start.y, end.x, end.y))
+            elif entity_type in ('MTEXT', 'TEXT') and np.isnan(geometry[DIM_BLOCK_TEXT, 0]):
+                geometry[DIM_BLOCK_TEXT] = DXFParser._text_extents(entity)
+        if not lines:
+            return geometry
+        
+        segments = np.asarray(lines, dtype=np.float64)
+        starts, vectors = segments[:, :2], segments[:, 2:] - segments[:, :2]
+        kind = dim_data.get('dimension_kind', 0)
+        points = [dim_data.get(key) for key in ('defpoint', 'defpoint2', 'defpoint3')]
+        
+        if kind not in (0, 1) or any(point is None for point in points):
+            if kind not in (2, 5):
+                longest = np.argmax(np.hypot(vectors[:, 0], vectors[:, 1]))
+                geometry[DIM_BLOCK_LINE] = segments[longest]
+            return geometry
+        
+        # 定义点换算到块坐标
+        base, first, second = (np.asarray(point, dtype=np.float64) - offset for point in points)
+        if kind == 1:
+            direction = second - first
+            length = math.hypot(*direction)
+            if length == 0:
+                return geometry
+            direction = direction / length
+        else:
+            angle = math.radians(dim_data.get('angle', 0.0))
+            direction = np.array([math.cos(angle), math.sin(angle)])
+        normal = np.array([-direction[1], direction[0]])
+        tolerance = DIM_BLOCK_TOLERANCE * max(1.0, float(np.abs(segments).max()))
+        
+        # 尺寸线：与尺寸线方向平行、且与 defpoint 的法向偏移最小的一组共线线段
+        lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+        offsets = (starts - base) @ normal
+        parallel = (lengths > 0) & (np.abs(vectors @ normal) <= tolerance)
+        on_line = np.zeros(len(segments), dtype=bool)
+        if parallel.any():
+            shift = offsets[parallel][np.argmin(np.abs(offsets[parallel]))]
+            on_line = parallel & (np.abs(offsets - shift) <= tolerance)
+            t = np.concatenate(((starts[on_line] - base) @ direction, (segments[on_line, 2:] - base) @ direction))
+            origin = base + normal * shift
+            geometry[DIM_BLOCK_LINE] = np.concatenate((origin + direction * t.min(), origin + direction * t.max()))
+        
+        # 尺寸界线：所在直线经过 defpoint2 / defpoint3（界线与定义点之间有 dimexo 间隙）
+        candidates = np.flatnonzero(~on_line & (lengths > 0))
+        for row, point in ((DIM_BLOCK_EXT1, first), (DIM_BLOCK_EXT2, second)):
+            if not len(candidates):
+                break
+            relative = point - starts[candidates]
+            distances = np.abs(relative[:, 0] * vectors[candidates, 1] - relative[:, 1] * vectors[candidates, 0]) \
+                / lengths[candidates]
+            nearest = np.argmin(distances)
+            if distances[nearest] <= tolerance:
+                geometry[row] = segments[candidates[nearest]]
+        return geometry
+    
+    @staticmethod
+    def _text_extents(entity) -> Tuple[float, float, float, float]:
+        """
+        估算单行 MTEXT/TEXT 的包围盒 (xmin, ymin, xmax, ymax)
+        
+        宽度按字数 × 字高 × 0.8 估算（同几何引擎的文字框），按对齐点和旋转角放置；
+        不排版字体，避免为每个尺寸文字加载字体。
+        """
+        if entity.dxftype() == 'MTEXT':
+            content = entity.plain_text()
+            height = entity.dxf.char_height
+            rotation = entity.get_rotation()
+            # 对齐点 1-9：上/中/下 × 左/中/右
+            row, column = divmod(entity.dxf.attachment_point - 1, 3)
+            bottom = -height * (1 - row / 2)
+        else:
+            content = entity.dxf.text
+            height = entity.dxf.height
+            rotation = entity.dxf.rotation
+            row, column = 2, 0
+            bottom = 0.0
+        width = len(content) * height * 0.8
+        left = -width * column / 2
+        insert = entity.dxf.insert
+        
+        angle = math.radians(rotation)
+        cos, sin = math.cos(angle), math.sin(angle)
+        xs = []
+        ys = []
+        for x in (left, left + width):
+            for y in (bottom, bottom + height):
+                xs.append(insert.x + x * cos - y * sin)
+                ys.append(insert.y + x * sin + y * cos)
+        return min(xs), min(ys), max(xs), max(ys)
+    
     def _extract_texts(self) -> List[Dict[str, Any]]:
         """提取所有文字信息（Phase 2: 增强几何信息）"""
         texts = []
@@ -220,6 +438,8 @@ class DXFParser:
             }
             texts.append(text_data)
         
+        # 块参照中的文字和属性
+        texts.extend(self._block_texts)
         return texts
     
     def _extract_blocks(self) -> List[str]:
@@ -231,7 +451,7 @@ class DXFParser:
         header = self.doc.header
         metadata = {
             "dxf_version": self.doc.dxfversion,
-            "units": getattr(header, '$INSUNITS', 0),
+            "units": header.get('$INSUNITS', 0),
             "layer_count": len(list(self.doc.layers)),
             "entity_count": len(list(self.modelspace))
         }
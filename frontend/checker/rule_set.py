@@ -0,0 +1,211 @@
+"""
+规则集加载与缓存
+每个检查标准对应 config/ 下的一个 rules_*.yaml（以其中的 standard.name 为标准名）。
+规则文件在进程内只解析、校验、编译一次；文件修改时间或大小变化时重新读取，
+内容哈希也变化时才重新编译。
+
+同步维护：本模块在 backend/app/services/、checker/、frontend/checker/ 各有一份副本（各副本只有 LayerMatcher 的导入方式和 CONFIG_DIR 不同）；
+后端服务与独立部署的检查包之间没有可共享的导入路径，修改时需同步全部副本。
+"""
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+
+import yaml
+
+from .layer_matcher import LayerMatcher
+
+logger = logging.getLogger(__name__)
+
+
+# 规则配置目录
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+RULES_GLOB = "rules_*.yaml"
+
+# 默认检查标准
+DEFAULT_STANDARD = "GB/T 14665-2012"
+
+# 检查器依赖的规则项：段名 -> 必需的键
+REQUIRED_KEYS = {
+    "layers": (),
+    "lineweights": ("thick_line", "medium_line", "thin_line", "tolerance"),
+    "colors": ("default",),
+    "fonts": ("min_height", "max_height"),
+    "dimensions": ("min_text_height", "min_arrow_size", "consistency_threshold"),
+    "check_weights": ()
+}
+REQUIRED_LAYER_CLASSES = ("尺寸层", "文字层")
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """编译后的只读规则集"""
+    standard: str
+    version: str
+    source: Path
+    rules: Mapping[str, Any]
+    layer_matcher: LayerMatcher
+
+
+def _freeze(value: Any) -> Any:
+    """递归转换为只读结构：dict -> MappingProxyType，list -> tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _validate(rules: Any, source: Path):
+    """校验规则文件结构，缺项时抛出 ValueError"""
+    if not isinstance(rules, dict):
+        raise ValueError(f"规则文件格式错误: {source.name}")
+    for section, keys in REQUIRED_KEYS.items():
+        if not isinstance(rules.get(section), dict):
+            raise ValueError(f"规则文件 {source.name} 缺少 {section} 段")
+        missing = [key for key in keys if key not in rules[section]]
+        if missing:
+            raise ValueError(f"规则文件 {source.name} 的 {section} 段缺少: {', '.join(missing)}")
+    for layer_class in REQUIRED_LAYER_CLASSES:
+        names = rules['layers'].get(layer_class, {}).get('expected_names')
+        if not names:
+            raise ValueError(f"规则文件 {source.name} 缺少 {layer_class} 的 expected_names")
+
+
+def compile_rule_set(source: Path, content: bytes) -> RuleSet:
+    """
+    解析、校验并编译规则文件
+
+    Args:
+        source: 规则文件路径
+        content: 文件内容
+
+    Returns:
+        只读规则集
+    """
+    try:
+        rules = yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        raise ValueError(f"规则文件 {source.name} 解析失败: {str(e)}")
+    _validate(rules, source)
+    standard = (rules.get('standard') or {}).get('name') or source.stem
+    return RuleSet(
+        standard=standard,
+        version=hashlib.sha256(content).hexdigest()[:16],
+        source=source,
+        rules=_freeze(rules),
+        layer_matcher=LayerMatcher(rules['layers'])
+    )
+
+
+class _Entry:
+    """已加载的规则文件"""
+
+    def __init__(self, path: Path, stat_key: Tuple[int, int], rule_set: RuleSet):
+        self.path = path
+        self.stat_key = stat_key
+        self.rule_set = rule_set
+
+
+def _stat_key(path: Path) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class RuleSetRegistry:
+    """进程级规则集缓存，按标准名查找，规则文件变化时自动重新加载"""
+
+    def __init__(self, config_dir: Path):
+        self.config_dir = Path(config_dir)
+        self._by_path: Dict[Path, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, standard: str) -> RuleSet:
+        """
+        获取指定标准的规则集
+
+        Raises:
+            ValueError: 标准不存在或规则文件无效
+        """
+        with self._lock:
+            entry = self._find(standard)
+            if entry is not None:
+                entry = self._refresh(entry)
+            if entry is None or entry.rule_set.standard != standard:
+                # 新增的规则文件或标准名被修改：重新扫描配置目录
+                self._scan()
+                entry = self._find(standard)
+            if entry is None:
+                available = ', '.join(self._standards()) or '无'
+                raise ValueError(f"不支持的检查标准: {standard}（可用: {available}）")
+            return entry.rule_set
+
+    def standards(self) -> List[str]:
+        """所有可用的检查标准"""
+        with self._lock:
+            self._scan()
+            return self._standards()
+
+    def _standards(self) -> List[str]:
+        return sorted(entry.rule_set.standard for entry in self._by_path.values())
+
+    def _find(self, standard: str) -> Optional[_Entry]:
+        for entry in self._by_path.values():
+            if entry.rule_set.standard == standard:
+                return entry
+        return None
+
+    def _scan(self):
+        """扫描配置目录，加载新增或变化的规则文件（调用方持有锁）"""
+        paths = set(self.config_dir.glob(RULES_GLOB))
+        for path in list(self._by_path):
+            if path not in paths:
+                del self._by_path[path]
+        for path in sorted(paths):
+            entry = self._by_path.get(path)
+            if entry is not None:
+                self._refresh(entry)
+                continue
+            try:
+                stat_key = _stat_key(path)
+                self._by_path[path] = _Entry(path, stat_key, compile_rule_set(path, path.read_bytes()))
+            except (OSError, ValueError) as e:
+                logger.warning("跳过无效的规则文件 %s: %s", path.name, e)
+
+    def _refresh(self, entry: _Entry) -> Optional[_Entry]:
+        """
+        文件修改时间或大小变化时重新读取；内容哈希变化时才重新编译。
+        新内容无效时继续使用旧规则集。
+        """
+        try:
+            stat_key = _stat_key(entry.path)
+        except FileNotFoundError:
+            del self._by_path[entry.path]
+            return None
+        if stat_key == entry.stat_key:
+            return entry
+
+        content = entry.path.read_bytes()
+        entry.stat_key = stat_key
+        if hashlib.sha256(content).hexdigest()[:16] == entry.rule_set.version:
+            return entry
+        try:
+            entry.rule_set = compile_rule_set(entry.path, content)
+            logger.info("规则文件已重新加载: %s (%s)", entry.path.name, entry.rule_set.version)
+        except ValueError as e:
+            logger.warning("规则文件 %s 重新加载失败，继续使用旧版本: %s", entry.path.name, e)
+        return entry
+
+
+# 全局规则集缓存实例
+rule_sets = RuleSetRegistry(CONFIG_DIR)
+
+
+def get_rule_set(standard: str = DEFAULT_STANDARD) -> RuleSet:
+    """获取指定标准的规则集（进程内缓存）"""
+    return rule_sets.get(standard)
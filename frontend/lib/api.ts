@@ -1,6 +1,10 @@
+import { AnalysisProgress } from '@/types'
+
 // Use relative path to call Next.js API routes that proxy to backend
 const API_BASE_URL = ''
 
+const TERMINAL_STATUSES = ['completed', 'failed', 'timed_out']
+
 export async function uploadFile(file: File) {
   const formData = new FormData()
   formData.append('file', file)
@@ -49,6 +53,56 @@ export async function getAnalysisStatus(analysisId: string) {
   return await response.json()
 }
 
+/**
+ * 订阅分析进度事件流（SSE），返回取消订阅函数
+ * 连接无法建立时调用 onError（调用方可回退到轮询）
+ */
+export function subscribeAnalysisEvents(
+  analysisId: string,
+  onProgress: (progress: AnalysisProgress) => void,
+  onError: () => void
+): () => void {
+  const source = new EventSource(`${API_BASE_URL}/api/v1/analyze/${analysisId}/events`)
+
+  source.addEventListener('progress', (event) => {
+    const progress: AnalysisProgress = JSON.parse((event as MessageEvent).data)
+    // 分析结束后主动关闭，避免浏览器自动重连
+    if (TERMINAL_STATUSES.includes(progress.status)) {
+      source.close()
+    }
+    onProgress(progress)
+  })
+
+  source.onerror = () => {
+    // 连接中断时浏览器会带 Last-Event-ID 自动重连，只有连接被关闭时才回退
+    if (source.readyState === EventSource.CLOSED) {
+      onError()
+    }
+  }
+
+  return () => source.close()
+}
+
+/**
+ * 长轮询分析进度：有新事件（序号大于 after）时立即返回，否则最多等待 timeout 秒
+ */
+export async function waitAnalysisProgress(
+  analysisId: string,
+  after: number = 0,
+  timeout: number = 25
+): Promise<AnalysisProgress> {
+  const response = await fetch(
+    `${API_BASE_URL}/api/v1/analyze/${analysisId}/progress?after=${after}&timeout=${timeout}`
+  )
+
+  if (!response.ok) {
+    const error = await response.json()
+    throw new Error(error.detail || '获取进度失败')
+  }
+
+  return await response.json()
+}
+
 export async function getReport(analysisId: string) {
   const response = await fetch(`${API_BASE_URL}/api/v1/report/${analysisId}`)
 
@@ -1,4 +1,4 @@
-export type AnalysisStatus = 'pending' | 'processing' | 'completed' | 'failed'
+export type AnalysisStatus = 'pending' | 'processing' | 'completed' | 'failed' | 'timed_out'
 
 export type ViolationType = 
   | '图层错误'
@@ -25,6 +25,9 @@ export interface Violation {
   }
   entity_details?: Record<string, any>
   suggestion?: string
+  count?: number
+  sample_handles?: string[]
+  packed_handles?: string
 }
 
 export interface ComplianceReport {
@@ -40,16 +43,34 @@ export interface ComplianceReport {
   violations: Violation[]
   is_compliant: boolean
   compliance_score: number
+  rule_timings?: Record<string, number>
+  partial?: boolean
+  unfinished_rules?: string[]
 }
 
 export interface FileUploadResponse {
   file_id: string
   filename: string
   size: number
+  content_hash?: string
   upload_time: string
   message: string
 }
 
+export type AnalysisStage = 'upload' | 'convert' | 'parse' | 'check' | 'report'
+
+export interface AnalysisProgress {
+  analysis_id: string
+  seq: number
+  status: AnalysisStatus
+  stage?: AnalysisStage | null
+  percent: number
+  message: string
+  current?: number | null
+  total?: number | null
+  rule?: string | null
+}
+
 export interface AnalysisResponse {
   analysis_id: string
   file_id: string
@@ -0,0 +1,130 @@
+"""
+Streamlit 检查模块几何单元测试（尺寸几何块分类、尺寸对齐分组）
+"""
+import sys
+from pathlib import Path
+
+import ezdxf
+import numpy as np
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from frontend.checker.geometry import ALIGNMENT_GROUP_TOLERANCE, GeometryEngine
+from frontend.checker.parser import DIM_BLOCK_EXT1, DIM_BLOCK_EXT2, DIM_BLOCK_LINE, DXFParser
+
+
+def _parse_dimensions(tmp_path, build):
+    doc = ezdxf.new(setup=True)
+    build(doc.modelspace())
+    path = tmp_path / "dims.dxf"
+    doc.saveas(path)
+    return DXFParser().parse(str(path))['dimensions']
+
+
+def _passes_through(segment, point, tolerance=1e-6):
+    """线段所在直线经过该点"""
+    x0, y0, x1, y1 = segment
+    px, py = point
+    return abs((px - x0) * (y1 - y0) - (py - y0) * (x1 - x0)) <= tolerance * max(1.0, np.hypot(x1 - x0, y1 - y0))
+
+
+def test_linear_dimension_block_classification(tmp_path):
+    """*D 块中的尺寸线经过 defpoint，两条尺寸界线分别经过 defpoint2 / defpoint3"""
+    dims = _parse_dimensions(tmp_path, lambda msp: (
+        msp.add_linear_dim(base=(0, 20), p1=(0, 0), p2=(50, 0)).render(),
+        msp.add_linear_dim(base=(80, 30), p1=(70, 0), p2=(70, 60), angle=90).render()
+    ))
+    horizontal, vertical = dims
+
+    assert horizontal['block_geometry'][DIM_BLOCK_LINE] == pytest.approx([0, 20, 50, 20])
+    assert vertical['block_geometry'][DIM_BLOCK_LINE] == pytest.approx([80, 0, 80, 60])
+    for dim in dims:
+        geometry = dim['block_geometry']
+        assert _passes_through(geometry[DIM_BLOCK_EXT1], dim['defpoint2'])
+        assert _passes_through(geometry[DIM_BLOCK_EXT2], dim['defpoint3'])
+        # 尺寸界线与尺寸线垂直
+        line = geometry[DIM_BLOCK_LINE]
+        ext = geometry[DIM_BLOCK_EXT1]
+        assert np.dot(line[2:] - line[:2], ext[2:] - ext[:2]) == pytest.approx(0, abs=1e-9)
+
+
+def test_aligned_dimension_line_is_parallel_to_points(tmp_path):
+    """对齐尺寸的尺寸线平行于两个尺寸界线起点的连线"""
+    (dim,) = _parse_dimensions(tmp_path, lambda msp: msp.add_aligned_dim(p1=(0, 0), p2=(30, 40), distance=10).render())
+    x0, y0, x1, y1 = dim['block_geometry'][DIM_BLOCK_LINE]
+    assert (x1 - x0) * 40 - (y1 - y0) * 30 == pytest.approx(0, abs=1e-9)
+    assert _passes_through(dim['block_geometry'][DIM_BLOCK_EXT1], (0, 0))
+    assert _passes_through(dim['block_geometry'][DIM_BLOCK_EXT2], (30, 40))
+
+
+def test_split_dimension_line_merged_and_decoy_ignored():
+    """被文字断开的尺寸线合并为一段；离 defpoint 更远的平行线不作为尺寸线"""
+    doc = ezdxf.new()
+    block = doc.blocks.new("*D1")
+    block.add_line((0, 20), (20, 20))
+    block.add_line((30, 20), (50, 20))
+    block.add_line((0, 25), (50, 25))
+    block.add_line((0, 1), (0, 21))
+    block.add_line((50, 1), (50, 21))
+    dim_data = {'dimension_kind': 0, 'angle': 0.0, 'defpoint': (0, 20), 'defpoint2': (0, 0), 'defpoint3': (50, 0)}
+
+    geometry = DXFParser._read_dimension_block(block, dim_data, (0.0, 0.0))
+    assert geometry[DIM_BLOCK_LINE] == pytest.approx([0, 20, 50, 20])
+    assert geometry[DIM_BLOCK_EXT1] == pytest.approx([0, 1, 0, 21])
+    assert geometry[DIM_BLOCK_EXT2] == pytest.approx([50, 1, 50, 21])
+
+
+def _dim(handle, x0, x1, text_y, line_y=0.0):
+    """尺寸线水平的线性尺寸（没有几何块，尺寸线由定义点计算）"""
+    return {
+        'handle': handle,
+        'geometry': True,
+        'dimension_kind': 0,
+        'angle': 0.0,
+        'defpoint': (x0, line_y),
+        'defpoint2': (x0, line_y - 10),
+        'defpoint3': (x1, line_y - 10),
+        'text_position': ((x0 + x1) / 2, text_y)
+    }
+
+
+def _groups(dimensions):
+    members, keys, starts = GeometryEngine()._group_dimensions_by_alignment(dimensions)
+    ends = np.append(starts[1:], len(members))
+    return [[dimensions[i]['handle'] for i in members[start:end]] for start, end in zip(starts, ends)]
+
+
+def test_alignment_group_span_bounded_by_tolerance():
+    """文字坐标逐步错开时不会链式合并，组内跨度不超过容差"""
+    step = ALIGNMENT_GROUP_TOLERANCE * 0.8
+    dims = [_dim(str(i), i * 10, i * 10 + 10, i * step) for i in range(4)]
+    groups = _groups(dims)
+    assert groups == [['0', '1'], ['2', '3']]
+
+    members, keys, starts = GeometryEngine()._group_dimensions_by_alignment(dims)
+    ends = np.append(starts[1:], len(keys))
+    assert (keys[ends - 1] - keys[starts] <= ALIGNMENT_GROUP_TOLERANCE).all()
+
+
+def test_alignment_groups_require_nearby_dimension_lines():
+    """同一高度但尺寸线相距很远的尺寸不归为一组；首尾相接的一排尺寸归为一组"""
+    dims = [
+        _dim('a', 0, 10, 0.0),
+        _dim('b', 10, 20, 0.05),
+        _dim('far', 500, 510, 0.5),
+        _dim('c', 0, 10, 100.0, line_y=100),
+        _dim('d', 12, 20, 100.3, line_y=100)
+    ]
+    assert _groups(dims) == [['a', 'b'], ['far'], ['c', 'd']]
+
+    violations = GeometryEngine().check_dimension_alignment(dims)
+    assert [v.entity_details['handles'] for v in violations] == [['c', 'd']]
+    assert violations[0].entity_details['offset'] == pytest.approx(0.3)
+
+
+def test_alignment_grouping_empty():
+    """没有可分组的尺寸时返回空数组"""
+    members, keys, starts = GeometryEngine()._group_dimensions_by_alignment([])
+    assert len(members) == len(keys) == len(starts) == 0